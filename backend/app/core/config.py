@@ -1,5 +1,6 @@
 """Configuration management using Pydantic Settings."""
 import os
+from typing import Dict
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pathlib import Path
 
@@ -11,6 +12,105 @@ class Settings(BaseSettings):
     qdrant_url: str
     qdrant_api_key: str = ""  # Optional - empty string if not provided
     
+    # Retrieval: "similarity" (plain top-k) or "mmr" (diversity-aware)
+    retrieval_mode: str = "similarity"
+    mmr_lambda: float = 0.5  # 1.0 = pure relevance, lower = more diverse
+    mmr_fetch_k: int = 20  # Candidate pool size fetched (with vectors) before MMR selection
+    
+    # Adaptive k: keep up to `limit` chunks scoring at least the threshold and
+    # within `margin` of the best hit (0 disables either rule)
+    retrieval_score_threshold: float = 0.2
+    retrieval_score_margin: float = 0.15
+    # Skip the LLM and return an "insufficient evidence" section when nothing clears the threshold
+    evidence_gate_enabled: bool = True
+    # Answer the orchestrator's fixed queries from the precomputed retrieval bundle
+    # (data/bundles, rebuilt by ingest_data.py) while it matches the corpus and settings
+    retrieval_bundles_enabled: bool = True
+    
+    # Resilience: per-request deadline, per-call timeouts (seconds), retries and circuit breakers
+    request_deadline_seconds: float = 120.0
+    openai_timeout_seconds: float = 45.0  # Chat completions
+    embedding_timeout_seconds: float = 10.0
+    qdrant_timeout_seconds: float = 5.0
+    retry_max_attempts: int = 3
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 4.0
+    circuit_failure_threshold: int = 5
+    circuit_reset_seconds: float = 30.0
+    
+    # OpenAI rate governor shared by all workers on the host (SQLite at rate_governor_path,
+    # default data/rate_governor.sqlite). JSON object of per-model limits, e.g.
+    # {"gpt-4o": {"rpm": 5000, "tpm": 800000}, "text-embedding-3-small": {"rpm": 5000, "tpm": 5000000}};
+    # keys are exact model names (dated snapshots such as gpt-4o-2024-08-06 share their base
+    # model's limits). Calls queue for capacity until rate_governor_min_call_seconds before
+    # the request deadline (rate_governor_max_wait_seconds outside requests). Empty: not governed.
+    openai_rate_limits: Dict[str, Dict[str, int]] = {}
+    rate_governor_path: str = ""
+    rate_governor_max_wait_seconds: float = 120.0
+    rate_governor_min_call_seconds: float = 10.0
+    
+    # Cache for embeddings, retrievals and completions (app/services/cache.py):
+    # "memory" (an LRU per worker process), "sqlite" (one WAL database at cache_path,
+    # default data/cache.sqlite, shared by all workers on the host) or "none".
+    cache_backend: str = "memory"
+    cache_path: str = ""
+    cache_max_mb: float = 256.0
+    # Entry lifetimes (0 disables that cache); retrievals are also keyed on the index
+    # version ingest_data.py records in Qdrant next to the collection, so a re-index does
+    # not serve stale chunks even before they expire. Retrievals are not cached while
+    # that version is unknown (collection indexed before it was recorded, or mid re-index)
+    embedding_cache_ttl_seconds: float = 7 * 24 * 3600
+    retrieval_cache_ttl_seconds: float = 3600.0
+    # Completions are cached on their exact request (model, messages, temperature, ...).
+    # Off by default: a sampled answer would be repeated verbatim until it expires.
+    completion_cache_enabled: bool = False
+    completion_cache_ttl_seconds: float = 24 * 3600
+    
+    # Hedged LLM requests: duplicate a completion still running after the given
+    # latency percentile of its model and max_tokens (needs llm_hedge_min_samples
+    # observations of that route first)
+    llm_hedging_enabled: bool = False
+    llm_hedge_percentile: float = 95.0
+    llm_hedge_max_per_minute: int = 10
+    llm_hedge_min_samples: int = 20
+    
+    # Constrain completions to JSON schemas generated from the section models
+    # (OpenAI structured outputs); disable for models without json_schema support
+    structured_outputs_enabled: bool = True
+
+    # Section scheduling: retrieval-backed sections run concurrently (at most
+    # section_concurrency per memo); derived sections (executive summary, next steps)
+    # are written from the finished sections instead of their own retrieval
+    section_concurrency: int = 6
+    derived_sections_enabled: bool = True
+    # Write the small supporting sections (business profile, treaties, legal overview,
+    # budget, risks, appendix) in one batched completion; disabled: they are left out
+    batched_sections_enabled: bool = True
+
+    # Model routing per section and plan path (app/services/routing.py). MODEL_ROUTES is a
+    # JSON object overriding DEFAULT_ROUTES, e.g. {"implementation_timeline": "synthesis",
+    # "bv+tech:tax_considerations": "gpt-4o"}; values are a tier or a model name. Sections
+    # routed to the fast model are retried on the synthesis model when their output does not
+    # validate. Disabled: every section uses the synthesis model.
+    model_routing_enabled: bool = True
+    model_routes: Dict[str, str] = {}
+    synthesis_model: str = "gpt-4o"
+    fast_model: str = "gpt-4o-mini"
+
+    # Memo generation: "full" retrieves and writes every task (routed models); "template"
+    # personalizes the plan path's pre-generated sections (data/templates, built by
+    # `ingest_data.py --templates`) in one call and falls back to "full" without them.
+    # The personalization model must support structured outputs.
+    memo_generation_mode: str = "full"
+    personalization_model: str = "gpt-4o-mini"
+    
+    # Leave sections that were not planned out of /generate-memo responses instead
+    # of sending them as null (per request: ?omit_null_sections=true|false)
+    omit_null_sections: bool = False
+    
+    # Admin endpoints (/admin/*) require this key in the X-Admin-Key header when set
+    admin_api_key: str = ""
+    
     model_config = SettingsConfigDict(
         env_file=str(Path(__file__).parent.parent.parent / ".env"),
         env_file_encoding="utf-8",
@@ -1,308 +1,467 @@
 """Orchestrator that plans research tasks based on input."""
-from typing import List, Dict, Any, Optional
+import logging
+from dataclasses import asdict, dataclass
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Sequence, Tuple
 from app.models.request import TaxMemoRequest
 
 
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
 class TaskPlan:
-    """Represents a planned research task."""
-    def __init__(self, task_name: str, search_query: str, section_name: str, priority: int = 1):
-        self.task_name = task_name
-        self.search_query = search_query
-        self.section_name = section_name
-        self.priority = priority
-    
+    """Represents a planned research task (immutable, hashable)."""
+    task_name: str
+    search_query: str
+    section_name: str
+    priority: int = 1
+    # Batch tasks write several small sections in one completion; section_name then
+    # names the batch (for routing, usage and errors) and `sections` lists its sections
+    sections: Tuple[str, ...] = ()
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
+        return asdict(self)
+
+
+# ---------------------------------------------------------------------------
+# Feature rules
+# ---------------------------------------------------------------------------
+# Each feature is true when any of its clauses matches. A clause is a set of
+# (field, keyword) hits that must all be present, plus hits that must not be.
+# Fields are the lowercased request text:
+# - company_name, company_type, industry, timeline: the request fields
+# - goals: entry_goals joined with spaces
+# - tax: tax_considerations joined with spaces, then additional_context
+
+@dataclass(frozen=True)
+class Clause:
+    """All of `required` present and none of `excluded` present."""
+    required: Tuple[Tuple[str, str], ...]
+    excluded: Tuple[Tuple[str, str], ...] = ()
+
+
+FEATURE_RULES: Dict[str, Tuple[Clause, ...]] = {
+    # A. Holding Company Intent
+    # Triggers: Explicit type, specific tax goals (participation exemption), or "holding" in name
+    "holding": (
+        Clause((("company_type", "holding"),)),
+        Clause((("company_name", "holding"),)),
+        Clause((("tax", "participation exemption"),)),
+        Clause((("tax", "deelnemingsvrijstelling"),)),
+        Clause((("tax", "dividend"), ("tax", "holding"))),
+    ),
+    # B. "Must be B.V." Constraint (holding companies are forced to BV as well, see PlanFeatures)
+    # CRITICAL: Only force BV for EXPLICIT Dutch entity intent, not generic foreign terms.
+    # "LLC", "Corporation", "Limited Liability" are deliberately absent: they don't
+    # necessarily mean the user wants a Dutch BV, and speed should get a Branch Office.
+    "bv": (
+        Clause((("company_name", "b.v"),)),   # also covers "B.V." and a ".b.v" suffix
+        Clause((("company_name", "bv"),)),    # also covers a ".bv" suffix
+        Clause((("company_type", "besloten vennootschap"),)),
+    ),
+    # C. Tech/R&D Intent
+    # CRITICAL: Software/Technology must NOT be Financial Services (prevents ghost R&D credits)
+    "tech": (
+        Clause((("industry", "software"),), (("industry", "financial services"),)),
+        Clause((("industry", "technology"),), (("industry", "financial services"),)),
+        Clause((("industry", "biotech"),)),
+        Clause((("industry", "engineering"),)),
+        Clause((("goals", "r&d"),)),
+        Clause((("goals", "research"),)),
+    ),
+    # D. Speed Preference
+    "speed": tuple(
+        Clause((("timeline", keyword),))
+        for keyword in ("short", "fast", "urgent", "asap", "1 month")
+    ),
+    # E. Staffing
+    "hiring": (
+        Clause((("goals", "hire"),)),
+        Clause((("goals", "employees"),)),
+    ),
+}
+
+
+class RuleSet:
+    """
+    FEATURE_RULES compiled once into bitmasks.
+
+    Every distinct (field, keyword) term gets a bit. Evaluating a request is
+    one substring check per term against its own field (each field text is
+    built once); the clauses are then evaluated once per distinct bitmask.
+    """
+
+    def __init__(self, rules: Dict[str, Tuple[Clause, ...]]):
+        bits: Dict[Tuple[str, str], int] = {}
+        for clauses in rules.values():
+            for clause in clauses:
+                for term in clause.required + clause.excluded:
+                    bits.setdefault(term, 1 << len(bits))
+        by_field: Dict[str, List[Tuple[str, int]]] = {}
+        for (field, keyword), bit in bits.items():
+            by_field.setdefault(field, []).append((keyword, bit))
+        self._terms = {field: tuple(terms) for field, terms in by_field.items()}
+
+        def mask(terms: Tuple[Tuple[str, str], ...]) -> int:
+            value = 0
+            for term in terms:
+                value |= bits[term]
+            return value
+
+        self._features = {
+            name: tuple((mask(clause.required), mask(clause.excluded)) for clause in clauses)
+            for name, clauses in rules.items()
+        }
+
+    def match(self, fields: Dict[str, str]) -> int:
+        """Bitmask of the terms present in the field texts."""
+        hits = 0
+        for field, terms in self._terms.items():
+            text = fields.get(field)
+            if text:
+                for keyword, bit in terms:
+                    if keyword in text:
+                        hits |= bit
+        return hits
+
+    def evaluate(self, hits: int) -> Dict[str, bool]:
+        """Feature name -> whether any of its clauses is satisfied by the hits."""
         return {
-            "task_name": self.task_name,
-            "search_query": self.search_query,
-            "section_name": self.section_name,
-            "priority": self.priority
+            name: any(hits & required == required and not hits & excluded for required, excluded in clauses)
+            for name, clauses in self._features.items()
         }
 
 
+_RULES = RuleSet(FEATURE_RULES)
+
+
+@dataclass(frozen=True)
+class PlanFeatures:
+    """Detected intent of a request; the key that selects its plan."""
+    holding: bool = False
+    bv: bool = False
+    speed: bool = False
+    tech: bool = False
+    hiring: bool = False
+
+    @classmethod
+    def from_request(cls, request: TaxMemoRequest) -> "PlanFeatures":
+        """Detect all features from the compiled rules."""
+        tax_considerations = [str(tc).lower() for tc in (request.tax_considerations or [])]
+        return _features_for_hits(_RULES.match({
+            "company_name": (request.company_name or "").lower(),
+            "company_type": (request.company_type or "").lower(),
+            "industry": (request.industry or "").lower(),
+            "timeline": (request.timeline_preference or "").lower(),
+            "goals": " ".join(g.lower() for g in (request.entry_goals or [])),
+            "tax": " ".join(tax_considerations) + " " + (request.additional_context or "").lower(),
+        }))
+
+    @property
+    def path(self) -> str:
+        """Mutually exclusive plan path: holding, bv, speed or default."""
+        if self.holding:
+            return "holding"
+        if self.bv:
+            return "bv"
+        if self.speed:
+            return "speed"
+        return "default"
+
+    @property
+    def plan_key(self) -> Tuple[str, bool, bool]:
+        """(path, tech, hiring): the features that actually change the plan."""
+        if self.holding:
+            # Holding plans are strictly isolated from the operating add-ons
+            return ("holding", False, False)
+        return (self.path, self.tech, self.hiring)
+
+    @property
+    def plan_id(self) -> str:
+        """Stable string form of plan_key, e.g. "bv+tech+hiring"."""
+        return plan_id(self.plan_key)
+
+
+@lru_cache(maxsize=1024)
+def _features_for_hits(hits: int) -> PlanFeatures:
+    features = _RULES.evaluate(hits)
+    return PlanFeatures(
+        holding=features["holding"],
+        # Holding companies almost always require a BV structure for tax treaties
+        bv=features["holding"] or features["bv"],
+        speed=features["speed"],
+        tech=features["tech"],
+        hiring=features["hiring"],
+    )
+
+
+# ---------------------------------------------------------------------------
+# Plan catalog
+# ---------------------------------------------------------------------------
+
+PATH_TASKS: Dict[str, Tuple[TaskPlan, ...]] = {
+    # PATH 1: THE HOLDING COMPANY (Strict Isolation)
+    # No Innovation Box, Branch Office or other operating add-ons
+    "holding": (
+        TaskPlan(
+            task_name="Holding Company Executive Summary",
+            search_query="Netherlands holding company benefits executive summary participation exemption dividend withholding 2025",
+            section_name="executive_summary",
+            priority=1
+        ),
+        # Critical Tax Benefit: Participation Exemption
+        TaskPlan(
+            task_name="Participation Exemption Deep Dive",
+            search_query="Netherlands participation exemption deelnemingsvrijstelling requirements 5% ownership motive test dividends capital gains 2025",
+            section_name="tax_considerations",
+            priority=2
+        ),
+        # Entity Structure: FORCE B.V. (Ignore Branch)
+        TaskPlan(
+            task_name="Holding Structure (BV)",
+            search_query="Netherlands BV incorporation requirements for holding company notary deed timeline 2025",
+            section_name="business_structure",
+            priority=3
+        ),
+        TaskPlan(
+            task_name="Corporate Tax for Holding Companies",
+            search_query="Netherlands corporate income tax 2025 treaty network holding company tax benefits 2025",
+            section_name="tax_considerations",
+            priority=4
+        ),
+        TaskPlan(
+            task_name="Holding Company Compliance",
+            search_query="Netherlands holding company substance requirements compliance filing obligations 2025",
+            section_name="implementation_timeline",
+            priority=5
+        ),
+    ),
+    # PATH 2A: FORCE B.V. (name constraint wins over speed preference)
+    "bv": (
+        TaskPlan(
+            task_name="BV Executive Summary",
+            search_query="Netherlands BV private limited company benefits liability protection executive summary 2025",
+            section_name="executive_summary",
+            priority=1
+        ),
+        TaskPlan(
+            task_name="BV Incorporation Process",
+            search_query="Netherlands BV incorporation timeline notary requirements bank account opening KvK registration 2025",
+            section_name="business_structure",
+            priority=2
+        ),
+        TaskPlan(
+            task_name="BV Tax and Compliance",
+            search_query="Netherlands BV corporate income tax VAT registration obligations 2025",
+            section_name="tax_considerations",
+            priority=3
+        ),
+        TaskPlan(
+            task_name="BV Implementation Timeline",
+            search_query="Netherlands BV setup timeline notarization KvK registration bank account duration 2025",
+            section_name="implementation_timeline",
+            priority=4
+        ),
+    ),
+    # PATH 2B: SPEED / BRANCH (only if NOT forced to BV)
+    "speed": (
+        TaskPlan(
+            task_name="Branch Office Executive Summary",
+            search_query="Netherlands Branch Office market entry speed benefits vs BV quick setup 2025",
+            section_name="executive_summary",
+            priority=1
+        ),
+        # CRITICAL: Explicit "no notary" in query to prevent hallucination
+        TaskPlan(
+            task_name="Branch Registration (No Notary)",
+            search_query="Netherlands Branch Office registration Chamber of Commerce KvK no notary required timeline fast setup 2025",
+            section_name="business_structure",
+            priority=2
+        ),
+        TaskPlan(
+            task_name="Branch Tax and Compliance",
+            search_query="Netherlands Branch Office tax obligations VAT registration corporate income tax 2025",
+            section_name="tax_considerations",
+            priority=3
+        ),
+        TaskPlan(
+            task_name="Branch Implementation Timeline",
+            search_query="Netherlands Branch Office setup timeline KvK registration no notary fast entry 2025",
+            section_name="implementation_timeline",
+            priority=4
+        ),
+    ),
+    # PATH 2C: Default Comparison (if unclear)
+    "default": (
+        TaskPlan(
+            task_name="Market Entry Comparison",
+            search_query="Netherlands BV vs Branch Office comparison tax liability speed setup requirements 2025",
+            section_name="market_entry_options",
+            priority=1
+        ),
+        TaskPlan(
+            task_name="Executive Summary Research",
+            search_query="Netherlands market entry overview corporate tax business structure 2025",
+            section_name="executive_summary",
+            priority=2
+        ),
+        TaskPlan(
+            task_name="Tax Overview Research",
+            search_query="Netherlands corporate income tax rates VAT obligations tax overview 2025",
+            section_name="tax_considerations",
+            priority=3
+        ),
+        TaskPlan(
+            task_name="Implementation Timeline Research",
+            search_query="Netherlands company registration timeline BV branch office setup duration 2025",
+            section_name="implementation_timeline",
+            priority=4
+        ),
+    ),
+}
+
+# Operating add-ons (never for holding companies)
+# CRITICAL: Tech incentives only for Tech industries, to prevent "Ghost R&D Credits"
+TECH_TASK = TaskPlan(
+    task_name="R&D Incentives (WBSO & Innovation Box)",
+    search_query="Netherlands WBSO R&D tax credit requirements and Innovation Box 9% rate conditions software technology 2025",
+    section_name="tax_considerations",
+    priority=5
+)
+
+# General Corporate Tax for the default path only; the BV and Branch paths cover it already
+GENERAL_TAX_TASK = TaskPlan(
+    task_name="General Corporate Tax",
+    search_query="Netherlands corporate income tax rate 2025 VAT registration payroll tax obligations 2025",
+    section_name="tax_considerations",
+    priority=5
+)
+
+HIRING_TASK = TaskPlan(
+    task_name="30% Ruling & Payroll",
+    search_query="Netherlands 30% ruling for foreign employees payroll tax requirements employment contracts 2025",
+    section_name="legal_deep_dive",
+    priority=6
+)
+
+# The small sections no single task covers, written together from one shared
+# retrieval in a single completion (RAGEngine.generate_sections_batch)
+SUPPORTING_TASK = TaskPlan(
+    task_name="Supporting Sections",
+    search_query="Netherlands company setup costs budget tax treaties legal requirements compliance risks official sources 2025",
+    section_name="supporting_sections",
+    priority=6,
+    sections=(
+        "business_profile",
+        "jurisdictions_treaties",
+        "legal_topics_overview",
+        "resource_budget",
+        "risk_assessment",
+        "appendix",
+    )
+)
+
+# Closes every plan. With derived sections enabled, it is written from the finished
+# sections (like the executive summary) instead of from its own retrieval.
+NEXT_STEPS_TASK = TaskPlan(
+    task_name="Next Steps & Action Plan",
+    search_query="Netherlands market entry next steps action plan registration tax compliance checklist 2025",
+    section_name="next_steps",
+    priority=7
+)
+
+# Sections synthesized from the other sections' outputs (see RAGEngine.generate_memo_sections)
+DERIVED_SECTIONS = frozenset({"executive_summary", "next_steps"})
+
+
+@lru_cache(maxsize=None)
+def plan_for(plan_key: Tuple[str, bool, bool]) -> Tuple[TaskPlan, ...]:
+    """The (shared, immutable) task plan for a PlanFeatures.plan_key, sorted by priority."""
+    path, tech, hiring = plan_key
+    tasks = list(PATH_TASKS[path])
+    if path != "holding":
+        if tech:
+            tasks.append(TECH_TASK)
+        if path == "default":
+            tasks.append(GENERAL_TAX_TASK)
+        if hiring:
+            tasks.append(HIRING_TASK)
+    tasks.append(SUPPORTING_TASK)
+    tasks.append(NEXT_STEPS_TASK)
+    tasks.sort(key=lambda x: x.priority)
+    return tuple(tasks)
+
+
+def plan_id(plan_key: Tuple[str, bool, bool]) -> str:
+    """Stable string form of a plan key, e.g. "bv+tech+hiring"."""
+    path, tech, hiring = plan_key
+    return "+".join([path] + (["tech"] if tech else []) + (["hiring"] if hiring else []))
+
+
+def all_plan_keys() -> List[Tuple[str, bool, bool]]:
+    """Every reachable plan key (13: holding, plus 3 operating paths x tech x hiring)."""
+    keys = [("holding", False, False)]
+    for path in ("bv", "speed", "default"):
+        keys += [(path, tech, hiring) for tech in (False, True) for hiring in (False, True)]
+    return keys
+
+
+@lru_cache(maxsize=None)
+def _plan_ids() -> Dict[Tuple[TaskPlan, ...], str]:
+    return {plan_for(key): plan_id(key) for key in all_plan_keys()}
+
+
+def plan_id_of(tasks: Sequence[TaskPlan]) -> Optional[str]:
+    """plan_id of a plan returned by plan_tasks (None for any other task list)."""
+    return _plan_ids().get(tuple(tasks))
+
+
 class Orchestrator:
     """
-    Master Orchestrator that enforces strict logic paths to prevent 
+    Master Orchestrator that enforces strict logic paths to prevent
     hallucinations and context conflicts.
-    
+
     Key Features:
     - Prevents "B.V." name trap: Forces BV if name contains "B.V."
     - Prevents "Holding" conflict: Strict isolation for holding companies
     - Prevents "Notary" hallucination: Explicit "no notary" in Branch queries
     - Prevents "Ghost" tax credits: Only searches Innovation Box/WBSO for Tech
+
+    Detection rules live in FEATURE_RULES and plans in PATH_TASKS; both are
+    data, so adding a keyword or task does not touch the control flow.
     """
-    
+
     # V1: Hardcode to Netherlands
     DEFAULT_JURISDICTION = "Netherlands"
-    
+
     def __init__(self):
         self.jurisdiction = self.DEFAULT_JURISDICTION
-    
-    def plan_tasks(self, request: TaxMemoRequest) -> List[TaskPlan]:
+
+    def detect_features(self, request: TaxMemoRequest) -> PlanFeatures:
+        """Classify the request with the compiled FEATURE_RULES."""
+        return PlanFeatures.from_request(request)
+
+    def plan_tasks(self, request: TaxMemoRequest) -> Tuple[TaskPlan, ...]:
         """
-        Generate a list of research tasks based on the input.
-        
+        Generate the research tasks for the input.
+
         Uses strict mutually exclusive paths to prevent context bleed-over:
         - PATH 1: Holding Company (strict isolation, no R&D/Branch)
         - PATH 2: Operating Company with sub-paths:
           - 2A: Force BV (if name contains "B.V." or explicit BV request)
           - 2B: Speed/Branch (only if NOT forced to BV)
           - 2C: Default comparison
+
+        Returns:
+            The memoized plan for the detected features; the same tuple is
+            returned for every request on the same path, so it can be used
+            as a cache key.
         """
-        tasks: List[TaskPlan] = []
-        
-        # 1. ANALYZE & CLASSIFY THE INPUT
-        # ---------------------------------------------------------
-        company_name = (request.company_name or "").lower()
-        industry = (request.industry or "").lower()
-        company_type = (request.company_type or "").lower()
-        goals = [g.lower() for g in (request.entry_goals or [])]
-        tax_considerations = [str(tc).lower() for tc in (request.tax_considerations or [])]
-        timeline = (request.timeline_preference or "").lower()
-        additional_context = (request.additional_context or "").lower()
-        
-        # Combine all tax-related text for detection
-        all_tax_text = " ".join(tax_considerations) + " " + additional_context
-        
-        # A. Detect Holding Company Intent
-        # Triggers: Explicit type, specific tax goals (participation exemption), or "holding" in name
-        # CRITICAL: Must be checked BEFORE must_be_bv to ensure proper isolation
-        is_holding = (
-            (company_type and "holding" in company_type) or 
-            (company_name and "holding" in company_name) or
-            "participation exemption" in all_tax_text or
-            "deelnemingsvrijstelling" in all_tax_text or
-            ("dividend" in all_tax_text and "holding" in all_tax_text)
-        )
-        
-        # B. Detect "Must be B.V." Constraint
-        # CRITICAL: Only force BV for EXPLICIT Dutch entity intent, not generic foreign terms
-        # Triggers: User explicitly named it "B.V." or explicitly selected Dutch entity type, or it is a Holding
-        must_be_bv = (
-            # Only force BV if they explicitly name the DUTCH entity "B.V."
-            "b.v" in company_name or 
-            "bv" in company_name or 
-            "b.v." in company_name or
-            company_name.endswith(".bv") or
-            company_name.endswith(".b.v") or
-            company_name.endswith(".b.v.") or
-            # Or if they explicitly ask for the specific Dutch entity type
-            "besloten vennootschap" in company_type or
-            # Or if it is a Holding (which usually needs BV for treaties)
-            is_holding  # Holding companies almost always require a BV structure for tax treaties
-        )
-        # NOTE: "LLC", "Corporation", "Limited Liability" are REMOVED
-        # These are foreign terms and don't necessarily mean the user wants a Dutch BV.
-        # If user wants speed, they should get Branch Office, not forced BV.
-        
-        # C. Detect Tech/R&D Intent
-        # Triggers: Software, Technology, BioTech, Engineering, etc.
-        # CRITICAL: Must NOT be Financial Services (to prevent ghost R&D credits)
-        is_tech = (
-            ("software" in industry or "technology" in industry) and
-            "financial services" not in industry
-        ) or (
-            "biotech" in industry or 
-            "engineering" in industry or
-            "r&d" in " ".join(goals) or
-            "research" in " ".join(goals)
-        )
-        
-        # D. Detect Speed Preference
-        prioritizes_speed = (
-            "short" in timeline or 
-            "fast" in timeline or 
-            "urgent" in timeline or
-            "asap" in timeline or
-            "1 month" in timeline
+        features = self.detect_features(request)
+        logger.info(
+            f"Orchestrator Detection - is_holding: {features.holding}, must_be_bv: {features.bv}, "
+            f"is_tech: {features.tech}, prioritizes_speed: {features.speed}, plan: {features.plan_id}"
         )
-        
-        # 2. BUILD THE TASK PLAN (MUTUALLY EXCLUSIVE PATHS)
-        # ---------------------------------------------------------
-        
-        # DEBUG: Log detection results (remove in production)
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"Orchestrator Detection - is_holding: {is_holding}, must_be_bv: {must_be_bv}, is_tech: {is_tech}, prioritizes_speed: {prioritizes_speed}")
-        
-        # --- PATH 1: THE HOLDING COMPANY (Strict Isolation) ---
-        # CRITICAL: This path must RETURN EARLY to prevent any fall-through
-        if is_holding:
-            # Executive Summary for Holding
-            tasks.append(TaskPlan(
-                task_name="Holding Company Executive Summary",
-                search_query="Netherlands holding company benefits executive summary participation exemption dividend withholding 2025",
-                section_name="executive_summary",
-                priority=1
-            ))
-            
-            # Critical Tax Benefit: Participation Exemption
-            tasks.append(TaskPlan(
-                task_name="Participation Exemption Deep Dive",
-                search_query="Netherlands participation exemption deelnemingsvrijstelling requirements 5% ownership motive test dividends capital gains 2025",
-                section_name="tax_considerations",
-                priority=2
-            ))
-            
-            # Entity Structure: FORCE B.V. (Ignore Branch)
-            tasks.append(TaskPlan(
-                task_name="Holding Structure (BV)",
-                search_query="Netherlands BV incorporation requirements for holding company notary deed timeline 2025",
-                section_name="business_structure",
-                priority=3
-            ))
-            
-            # Corporate Tax for Holdings
-            tasks.append(TaskPlan(
-                task_name="Corporate Tax for Holding Companies",
-                search_query="Netherlands corporate income tax 2025 treaty network holding company tax benefits 2025",
-                section_name="tax_considerations",
-                priority=4
-            ))
-            
-            # Compliance
-            tasks.append(TaskPlan(
-                task_name="Holding Company Compliance",
-                search_query="Netherlands holding company substance requirements compliance filing obligations 2025",
-                section_name="implementation_timeline",
-                priority=5
-            ))
-            
-            # CRITICAL: RETURN EARLY - Do not let holding companies fall through to operating company logic
-            # This prevents Innovation Box, Branch Office, and other irrelevant tasks
-            tasks.sort(key=lambda x: x.priority)
-            return tasks
-        
-        # --- PATH 2: THE OPERATING COMPANY (Tech/General) ---
-        # This path only runs if NOT a holding company
-        else:
-            # Sub-path 2A: FORCE B.V. (If name is B.V. or LLC)
-            # CRITICAL: This check MUST happen BEFORE prioritizes_speed check
-            # Name constraint (B.V.) wins over speed preference
-            if must_be_bv:
-                tasks.append(TaskPlan(
-                    task_name="BV Executive Summary",
-                    search_query="Netherlands BV private limited company benefits liability protection executive summary 2025",
-                    section_name="executive_summary",
-                    priority=1
-                ))
-                
-                tasks.append(TaskPlan(
-                    task_name="BV Incorporation Process",
-                    search_query="Netherlands BV incorporation timeline notary requirements bank account opening KvK registration 2025",
-                    section_name="business_structure",
-                    priority=2
-                ))
-                
-                tasks.append(TaskPlan(
-                    task_name="BV Tax and Compliance",
-                    search_query="Netherlands BV corporate income tax VAT registration obligations 2025",
-                    section_name="tax_considerations",
-                    priority=3
-                ))
-                
-                tasks.append(TaskPlan(
-                    task_name="BV Implementation Timeline",
-                    search_query="Netherlands BV setup timeline notarization KvK registration bank account duration 2025",
-                    section_name="implementation_timeline",
-                    priority=4
-                ))
-            
-            # Sub-path 2B: SPEED / BRANCH (Only if NOT forced to BV)
-            elif prioritizes_speed:
-                tasks.append(TaskPlan(
-                    task_name="Branch Office Executive Summary",
-                    search_query="Netherlands Branch Office market entry speed benefits vs BV quick setup 2025",
-                    section_name="executive_summary",
-                    priority=1
-                ))
-                
-                # CRITICAL: Explicit "no notary" in query to prevent hallucination
-                tasks.append(TaskPlan(
-                    task_name="Branch Registration (No Notary)",
-                    search_query="Netherlands Branch Office registration Chamber of Commerce KvK no notary required timeline fast setup 2025",
-                    section_name="business_structure",
-                    priority=2
-                ))
-                
-                tasks.append(TaskPlan(
-                    task_name="Branch Tax and Compliance",
-                    search_query="Netherlands Branch Office tax obligations VAT registration corporate income tax 2025",
-                    section_name="tax_considerations",
-                    priority=3
-                ))
-                
-                tasks.append(TaskPlan(
-                    task_name="Branch Implementation Timeline",
-                    search_query="Netherlands Branch Office setup timeline KvK registration no notary fast entry 2025",
-                    section_name="implementation_timeline",
-                    priority=4
-                ))
-            
-            # Sub-path 2C: Default Comparison (If unclear)
-            else:
-                tasks.append(TaskPlan(
-                    task_name="Market Entry Comparison",
-                    search_query="Netherlands BV vs Branch Office comparison tax liability speed setup requirements 2025",
-                    section_name="market_entry_options",
-                    priority=1
-                ))
-                
-                tasks.append(TaskPlan(
-                    task_name="Executive Summary Research",
-                    search_query="Netherlands market entry overview corporate tax business structure 2025",
-                    section_name="executive_summary",
-                    priority=2
-                ))
-                
-                tasks.append(TaskPlan(
-                    task_name="Tax Overview Research",
-                    search_query="Netherlands corporate income tax rates VAT obligations tax overview 2025",
-                    section_name="tax_considerations",
-                    priority=3
-                ))
-                
-                tasks.append(TaskPlan(
-                    task_name="Implementation Timeline Research",
-                    search_query="Netherlands company registration timeline BV branch office setup duration 2025",
-                    section_name="implementation_timeline",
-                    priority=4
-                ))
-            
-            # --- OPERATING TAX INCENTIVES (Add-ons) ---
-            # These only apply to operating companies (NOT holding companies)
-            
-            # 1. Tech Incentives (Only for Tech industries - NOT Financial Services)
-            # CRITICAL: This prevents "Ghost R&D Credits" for Financial Services
-            if is_tech:
-                tasks.append(TaskPlan(
-                    task_name="R&D Incentives (WBSO & Innovation Box)",
-                    search_query="Netherlands WBSO R&D tax credit requirements and Innovation Box 9% rate conditions software technology 2025",
-                    section_name="tax_considerations",
-                    priority=5
-                ))
-            
-            # 2. General Corporate Tax (For everyone in operating path)
-            # Only add if not already added in sub-paths
-            if not must_be_bv and not prioritizes_speed:
-                tasks.append(TaskPlan(
-                    task_name="General Corporate Tax",
-                    search_query="Netherlands corporate income tax rate 2025 VAT registration payroll tax obligations 2025",
-                    section_name="tax_considerations",
-                    priority=5
-                ))
-            
-            # 3. Staffing (If hiring)
-            if "hire" in " ".join(goals) or "employees" in " ".join(goals):
-                tasks.append(TaskPlan(
-                    task_name="30% Ruling & Payroll",
-                    search_query="Netherlands 30% ruling for foreign employees payroll tax requirements employment contracts 2025",
-                    section_name="legal_deep_dive",
-                    priority=6
-                ))
-        
-        # Sort tasks by priority
-        tasks.sort(key=lambda x: x.priority)
-        
-        return tasks
+        return plan_for(features.plan_key)
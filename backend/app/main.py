@@ -1,6 +1,8 @@
 """FastAPI entrypoint for Tax Memo Orchestrator."""
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from app.models.request import TaxMemoRequest
 from app.models.response import (
     MemoResponse,
@@ -16,12 +18,29 @@ from app.models.response import (
     BudgetSection,
     RiskSection,
     ActionPlanSection,
-    AppendixSection
+    AppendixSection,
+    InsufficientEvidence,
+    MemoMetadata,
+    ScheduleSummary,
+    UsageSummary
 )
+from pydantic import BaseModel
 from app.core.orchestrator import Orchestrator
+from app.services.qdrant import RetrievalError
 from app.services.rag_engine import RAGEngine
-from typing import Dict, Any
+from app.services.resilience import request_deadline
+from app.core.config import settings
+from app.services.cache import cache_stats
+from app.services.metrics import MEMOS_IN_FLIGHT, render_metrics
+from app.services.routing import route_stats
+from app.services.tracing import current_trace, end_trace, span, start_trace
+from app.services.usage import end_memo_usage, ledger, start_memo_usage
+from typing import Callable, Dict, Any, Optional
+import asyncio
+import contextvars
+import json
 import logging
+import uuid
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -41,8 +60,35 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Server-Timing"],
 )
 
+@app.middleware("http")
+async def request_tracing(request: Request, call_next):
+    """
+    Assign a request id and collect a latency trace for every request.
+    
+    Honors an incoming X-Request-ID. Requests that recorded spans get a
+    Server-Timing header and one structured log line with the breakdown.
+    """
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    trace, token = start_trace(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        end_trace(token)
+    
+    response.headers["X-Request-ID"] = request_id
+    if trace.spans:
+        response.headers["Server-Timing"] = trace.server_timing()
+        logger.info(json.dumps(trace.to_log_record(
+            method=request.method,
+            path=request.url.path,
+            status=response.status_code
+        )))
+    return response
+
+
 # Initialize services
 orchestrator = Orchestrator()
 rag_engine = RAGEngine()
@@ -53,10 +99,31 @@ def map_sections_to_response(sections: Dict[str, Any], request: TaxMemoRequest)
     Map generated sections to the MemoResponse model.
     
     This function takes the raw generated sections and maps them to the
-    structured response model. For V1, we do basic mapping.
+    structured response model. Sections that were parsed straight into their
+    section model (structured outputs) are used as-is; raw dictionaries
+    (legacy parsing fallback) go through the key-alias mapping below.
+    "Insufficient evidence" placeholders stay null and are listed in
+    metadata.insufficient_evidence.
     """
     response = MemoResponse()
     
+    # Placeholders for sections retrieval found no evidence for
+    insufficient = [
+        InsufficientEvidence(section=name, search_query=data.get("search_query"), message=data.get("content"))
+        for name, data in sections.items()
+        if isinstance(data, dict) and data.get("insufficient_evidence") and name in MemoResponse.model_fields
+    ]
+    if insufficient:
+        response.metadata = MemoMetadata(insufficient_evidence=insufficient)
+        skipped = {item.section for item in insufficient}
+        sections = {name: data for name, data in sections.items() if name not in skipped}
+    
+    # Structured outputs already produced validated section models
+    for section_name, data in list(sections.items()):
+        if isinstance(data, BaseModel) and section_name in MemoResponse.model_fields:
+            setattr(response, section_name, data)
+    sections = {name: data for name, data in sections.items() if not isinstance(data, BaseModel)}
+    
     # Helper function to unwrap nested section structures
     def unwrap_section(section_name: str, data: Any) -> Any:
         """Unwrap nested structures where section name appears as a key."""
@@ -80,7 +147,7 @@ def map_sections_to_response(sections: Dict[str, Any], request: TaxMemoRequest)
                       exec_data.get("content") or 
                       exec_data.get("summary") or
                       exec_data.get("executive_summary") or
-                      str(exec_data) if len(exec_data) == 1 else None)
+                      (str(exec_data) if len(exec_data) == 1 else None))
             
             key_recommendations = (exec_data.get("key_recommendations") or 
                                   exec_data.get("recommendations") or
@@ -311,29 +378,80 @@ async def health_check():
     return {"status": "healthy"}
 
 
-@app.post("/generate-memo", response_model=MemoResponse)
-async def generate_memo(request: TaxMemoRequest) -> MemoResponse:
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics endpoint."""
+    payload, content_type = render_metrics()
+    # Set the header directly: media_type would append a second charset
+    return Response(content=payload, headers={"Content-Type": content_type})
+
+
+@app.get("/admin/usage")
+async def admin_usage(window_minutes: int = 60, x_admin_key: Optional[str] = Header(None)):
     """
-    Generate a comprehensive market entry memo.
+    Token usage and cost over the last `window_minutes`.
     
-    This endpoint:
-    1. Accepts a TaxMemoRequest with company details
-    2. Orchestrates research tasks based on input
-    3. Queries Qdrant vector DB for relevant information
-    4. Generates a 13-section memo using OpenAI GPT-4
+    Aggregated per model and per section (most expensive first), plus the
+    embedding spend recorded by ingest_data.py. Figures cover this worker
+    process only.
+    """
+    if settings.admin_api_key and x_admin_key != settings.admin_api_key:
+        raise HTTPException(status_code=403, detail="Invalid admin key")
+    return ledger.summary(window_seconds=window_minutes * 60)
+
+
+@app.get("/admin/routes")
+async def admin_routes(x_admin_key: Optional[str] = Header(None)):
+    """
+    Model routing policy and per-route latency and cost.
+    
+    For every section, each model that served it: calls, p50/p95 latency
+    (last 500 calls), cost, and the share of outputs that failed validation
+    (and how many of those were upgraded to the synthesis model). Figures
+    cover this worker process since it started.
+    """
+    if settings.admin_api_key and x_admin_key != settings.admin_api_key:
+        raise HTTPException(status_code=403, detail="Invalid admin key")
+    return dict(route_stats.report(), policy=rag_engine.router.describe())
+
+
+@app.get("/admin/cache")
+async def admin_cache(x_admin_key: Optional[str] = Header(None)):
+    """
+    Embedding, retrieval and completion cache statistics.
+    
+    The backend's entries, bytes, byte limit and evictions (for the sqlite
+    backend, the entries of every worker on the host), and per namespace the
+    TTL and the hits and misses of this worker process since it started.
+    """
+    if settings.admin_api_key and x_admin_key != settings.admin_api_key:
+        raise HTTPException(status_code=403, detail="Invalid admin key")
+    return cache_stats()
+
+
+def build_memo(request: TaxMemoRequest, on_event: Optional[Callable[[Dict[str, Any]], None]] = None) -> MemoResponse:
+    """
+    Plan, retrieve, generate and map one memo.
     
     Args:
         request: TaxMemoRequest with company and entry details
+        on_event: Optional callback receiving progress events (plan, streamed
+            section fields/items, completed sections); enables streaming completions
     
     Returns:
         MemoResponse with 13 sections of market entry analysis
     """
+    MEMOS_IN_FLIGHT.inc()
+    usage, usage_token = start_memo_usage()
     try:
         logger.info(f"Generating memo for company: {request.company_name}")
         
         # Step 1: Plan research tasks
-        tasks = orchestrator.plan_tasks(request)
+        with span("plan", stage="planning"):
+            tasks = orchestrator.plan_tasks(request)
         logger.info(f"Planned {len(tasks)} research tasks")
+        if on_event:
+            on_event({"type": "plan", "tasks": [task.to_dict() for task in tasks]})
         
         # Step 2: Prepare user context
         user_context = {
@@ -352,30 +470,171 @@ async def generate_memo(request: TaxMemoRequest) -> MemoResponse:
             "key_products_services": request.key_products_services or []
         }
         
-        # Step 3: Generate all sections using RAG
+        # Step 3: Generate all sections using RAG (dependency calls share one deadline)
         logger.info(f"Starting RAG generation for {len(tasks)} tasks...")
-        sections = rag_engine.generate_memo_sections(tasks, user_context)
+        with request_deadline(settings.request_deadline_seconds):
+            sections = None
+            if settings.memo_generation_mode == "template":
+                sections = rag_engine.generate_memo_from_templates(tasks, user_context, on_event=on_event)
+            if sections is None:
+                sections = rag_engine.generate_memo_sections(tasks, user_context, on_event=on_event)
         logger.info(f"Generated {len(sections)} sections")
-        logger.info(f"Section keys: {list(sections.keys())}")
         
-        # Debug: Log section structures with full content
-        for key, value in sections.items():
-            if isinstance(value, dict):
-                logger.info(f"Section '{key}': keys={list(value.keys())}")
-                logger.info(f"Section '{key}' content preview: {str(value)[:500]}")
-            else:
-                logger.info(f"Section '{key}': type={type(value).__name__}, value={str(value)[:200]}")
+        # Section keys go into the request's structured trace log line
+        trace = current_trace()
+        if trace is not None:
+            trace.attributes["sections"] = list(sections.keys())
         
         # Step 4: Map to response model
         logger.info("Mapping sections to response model...")
-        response = map_sections_to_response(sections, request)
+        with span("map", stage="response_mapping"):
+            response = map_sections_to_response(sections, request)
         logger.info("Response mapping complete")
         
+        schedule = trace.attributes.get("schedule") if trace else None
+        metadata = response.metadata or MemoMetadata()
+        metadata.request_id = trace.request_id if trace else None
+        metadata.usage = UsageSummary(**usage.summary())
+        metadata.schedule = ScheduleSummary(**schedule) if schedule else None
+        response.metadata = metadata
+        
         return response
     
+    finally:
+        end_memo_usage(usage_token)
+        MEMOS_IN_FLIGHT.dec()
+
+
+@app.post("/generate-memo", response_model=MemoResponse)
+def generate_memo(request: TaxMemoRequest, omit_null_sections: Optional[bool] = None) -> Response:
+    """
+    Generate a comprehensive market entry memo.
+    
+    Declared sync on purpose: generation makes blocking OpenAI/Qdrant calls,
+    so FastAPI runs it in its threadpool instead of on the event loop.
+    
+    The memo is serialized here rather than by FastAPI: returning a Response
+    skips the response_model validation and encoder pass over a model that
+    map_sections_to_response has just built (response_model still documents
+    the schema).
+    
+    This endpoint:
+    1. Accepts a TaxMemoRequest with company details
+    2. Orchestrates research tasks based on input
+    3. Queries Qdrant vector DB for relevant information
+    4. Generates a 13-section memo using OpenAI GPT-4
+    
+    Args:
+        request: TaxMemoRequest with company and entry details
+        omit_null_sections: Leave out sections that were not generated
+            (defaults to settings.omit_null_sections)
+    
+    Returns:
+        MemoResponse JSON with 13 sections of market entry analysis
+    
+    Raises:
+        HTTPException: 503 if retrieval (embedding or Qdrant) is unavailable,
+            500 on other failures
+    """
+    try:
+        response = build_memo(request)
+    except RetrievalError as e:
+        logger.error(f"Retrieval unavailable, no memo generated: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Knowledge base unavailable: {str(e)}")
     except Exception as e:
         logger.error(f"Error generating memo: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to generate memo: {str(e)}")
+    
+    if omit_null_sections is None:
+        omit_null_sections = settings.omit_null_sections
+    with span("serialization"):
+        content = response.dump_json(omit_null_sections=omit_null_sections)
+    return Response(content=content, media_type="application/json")
+
+
+def _section_event(event: Dict[str, Any], request: TaxMemoRequest) -> Dict[str, Any]:
+    """
+    Map a "section" event's raw dictionary (lenient-parsing fallback) to its section model.
+    
+    The event then carries the same camelCase keys as the section in the final
+    memo. An "insufficient evidence" placeholder becomes a null value with an
+    insufficientEvidence entry, as in the memo's metadata.
+    """
+    if event["type"] != "section" or isinstance(event["value"], BaseModel):
+        return event
+    section = event["section"]
+    mapped = map_sections_to_response({section: event["value"]}, request)
+    event = dict(event, value=getattr(mapped, section, None))
+    if mapped.metadata and mapped.metadata.insufficient_evidence:
+        event["insufficientEvidence"] = mapped.metadata.insufficient_evidence[0]
+    return event
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    """Encode an event as a Server-Sent Events message."""
+    if event["type"] == "done":
+        data = f'{{"memo": {event["memo"].dump_json(omit_null_sections=settings.omit_null_sections)}}}'
+    else:
+        payload = {key: value for key, value in event.items() if key != "type"}
+        data = json.dumps(jsonable_encoder(payload, by_alias=True))
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+@app.post("/generate-memo/stream")
+async def generate_memo_stream(request: TaxMemoRequest) -> StreamingResponse:
+    """
+    Generate a memo, streaming progress as Server-Sent Events.
+    
+    Events, in order:
+    - plan: the planned tasks
+    - field / item: a top-level section field, or one item of a list field,
+      as soon as the completion has produced it: {"section", "field" (the
+      model's field name), "index" (items only; null for fields), "value"}.
+      Values have the section model's shape, so a dict field arrives as an
+      object in its field event; dict fields have no item events
+    - section_reset: the section's output did not validate and is being
+      rewritten by a larger model ("model"); discard its field / item events
+      received so far
+    - section: a completed section, as it appears in /generate-memo (camelCase
+      keys; null with an insufficientEvidence entry when no evidence was found)
+    - done: the full memo, identical to the /generate-memo response
+    - error: generation failed (replaces done); "status" is the code /generate-memo
+      would have returned (503 when the knowledge base is unavailable)
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue()
+    
+    def emit(event: Optional[Dict[str, Any]]) -> None:
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+    
+    def produce() -> None:
+        try:
+            response = build_memo(request, on_event=lambda event: emit(_section_event(event, request)))
+            emit({"type": "done", "memo": response})
+        except RetrievalError as e:
+            logger.error(f"Retrieval unavailable, no memo generated: {str(e)}")
+            emit({"type": "error", "status": 503, "detail": f"Knowledge base unavailable: {str(e)}"})
+        except Exception as e:
+            logger.error(f"Error generating memo: {str(e)}")
+            emit({"type": "error", "status": 500, "detail": f"Failed to generate memo: {str(e)}"})
+        finally:
+            emit(None)
+    
+    # Generation blocks, so it runs in a worker thread with this request's context (trace, ids)
+    loop.run_in_executor(None, contextvars.copy_context().run, produce)
+    
+    async def events():
+        while True:
+            event = await queue.get()
+            if event is None:
+                return
+            yield _sse(event)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 if __name__ == "__main__":
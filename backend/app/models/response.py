@@ -120,6 +120,62 @@ class AppendixSection(BaseModel):
     data_sources: Optional[List[str]] = None
 
 
+class SectionUsage(BaseModel):
+    """Token usage and cost of the completions for one section."""
+    model_config = _base_config
+    # The model of the last call; `models` lists every model called, in order (upgrades included)
+    model: Optional[str] = None
+    models: List[str] = []
+    calls: int = 0
+    # Calls to models without a price: cost_usd leaves them out
+    unpriced_calls: int = 0
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    cost_usd: float = 0.0
+
+
+class UsageSummary(BaseModel):
+    """Token usage and cost of a whole memo (completions and query embeddings)."""
+    model_config = _base_config
+    # Completion tokens only: the sums over `sections`
+    prompt_tokens: int = 0
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    embedding_tokens: int = 0
+    cost_usd: float = 0.0
+    # Calls (completions and embeddings) to models without a price: cost_usd leaves them out
+    unpriced_calls: int = 0
+    sections: Dict[str, SectionUsage] = {}
+
+
+class ScheduleSummary(BaseModel):
+    """How the memo's sections were scheduled (milliseconds)."""
+    model_config = _base_config
+    wall_ms: float = 0.0
+    critical_path_ms: float = 0.0
+    serial_ms: float = 0.0
+    critical_path: List[str] = []
+
+
+class InsufficientEvidence(BaseModel):
+    """A section left out because retrieval found no evidence for it."""
+    model_config = _base_config
+    section: str
+    search_query: Optional[str] = None
+    message: Optional[str] = None
+
+
+class MemoMetadata(BaseModel):
+    """Generation metadata returned alongside the memo."""
+    model_config = _base_config
+    request_id: Optional[str] = None
+    usage: Optional[UsageSummary] = None
+    schedule: Optional[ScheduleSummary] = None
+    # Sections not written for lack of evidence (they are null in the memo)
+    insufficient_evidence: List[InsufficientEvidence] = []
+
+
 class MemoResponse(BaseModel):
     """The complete 13-section memo response."""
     model_config = _base_config
@@ -136,4 +192,18 @@ class MemoResponse(BaseModel):
     risk_assessment: Optional[RiskSection] = None
     next_steps: Optional[ActionPlanSection] = None
     appendix: Optional[AppendixSection] = None
+    metadata: Optional[MemoMetadata] = None
+
+    def dump_json(self, omit_null_sections: bool = False) -> str:
+        """
+        Serialize as the API returns it (camelCase keys), without re-validation.
+        
+        Args:
+            omit_null_sections: Leave out sections that were not generated
+                instead of sending them as null
+        """
+        exclude = None
+        if omit_null_sections:
+            exclude = {name for name in type(self).model_fields if name != "metadata" and getattr(self, name) is None}
+        return self.model_dump_json(by_alias=True, exclude=exclude)
 
@@ -0,0 +1,260 @@
+"""Precomputed retrieval bundles for the orchestrator's plan paths.
+
+Every search query the orchestrator can plan is fixed (see PATH_TASKS), so
+its embedding, retrieved chunks and formatted context only change when the
+corpus or the retrieval settings do. `build_bundle` computes them once for
+every plan path, and ingest_data.py rebuilds the bundle after indexing.
+QdrantService then answers those queries with a dictionary lookup instead
+of an embedding call and a Qdrant search.
+
+A bundle (data/bundles/<collection>.json) is only used while it is current:
+- its corpus_version matches the chunk store manifest (without a local store it
+  is used unverified, with a warning on every load);
+- results and contexts are only served for the collection, embedding model,
+  limit, mode and score settings they were built with.
+"""
+import json
+import os
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+BUNDLE_FORMAT_VERSION = 1
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BUNDLE_DIR = os.path.join(BACKEND_DIR, "data", "bundles")
+# Written by ingest_data.py; its manifest carries the corpus_version
+CHUNK_STORE_DIR = os.path.join(BACKEND_DIR, "data", "chunk_store")
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# How often (seconds) a running server checks whether the bundle or corpus changed
+RELOAD_CHECK_SECONDS = 5.0
+
+
+def bundle_path(collection_name: str, directory: str = BUNDLE_DIR) -> str:
+    """Bundle file for a collection."""
+    return os.path.join(directory, f"{collection_name}.json")
+
+
+def retrieval_params(collection_name: str, limit: int, mode: str) -> Dict[str, Any]:
+    """Everything (besides the corpus) that determines a query's results."""
+    return {
+        "collection": collection_name,
+        "embedding_model": EMBEDDING_MODEL,
+        "limit": limit,
+        "mode": mode,
+        "score_threshold": settings.retrieval_score_threshold,
+        "score_margin": settings.retrieval_score_margin,
+        "mmr_fetch_k": settings.mmr_fetch_k if mode == "mmr" else None,
+        "mmr_lambda": settings.mmr_lambda if mode == "mmr" else None,
+    }
+
+
+def current_corpus_version(store_dir: str = CHUNK_STORE_DIR) -> Optional[str]:
+    """corpus_version of the local chunk store (None when there is no store)."""
+    from app.utils.chunk_store import ChunkStore
+
+    store = ChunkStore(store_dir)
+    if not store.exists():
+        return None
+    return store.manifest().get("corpus_version")
+
+
+def _result_ids(results: List[Dict[str, Any]]) -> Tuple[str, ...]:
+    return tuple(str(result.get("id")) for result in results)
+
+
+class RetrievalBundle:
+    """Embeddings, results and formatted contexts of the planned queries."""
+
+    def __init__(self, document: Dict[str, Any]):
+        self.corpus_version: Optional[str] = document.get("corpus_version")
+        self.params: Dict[str, Any] = document.get("params", {})
+        self.plans: Dict[str, List[str]] = document.get("plans", {})
+        self.created_at: Optional[str] = document.get("created_at")
+        self._queries: Dict[str, Dict[str, Any]] = document.get("queries", {})
+        self._contexts = {
+            _result_ids(entry["results"]): entry["context"]
+            for entry in self._queries.values()
+            if entry.get("results") and entry.get("context") is not None
+        }
+
+    @classmethod
+    def load(cls, path: str) -> Optional["RetrievalBundle"]:
+        """Read a bundle file (None if missing or of another format version)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable retrieval bundle {path}: {str(e)}")
+            return None
+        if document.get("format_version") != BUNDLE_FORMAT_VERSION:
+            print(f"Ignoring retrieval bundle {path}: format {document.get('format_version')}")
+            return None
+        return cls(document)
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+    def serves(self, collection_name: str, limit: int, mode: str, filters: Optional[Dict[str, Any]]) -> bool:
+        """True if results were built for exactly this kind of search."""
+        return not filters and self.params == retrieval_params(collection_name, limit, mode)
+
+    def results(self, query: str) -> Optional[List[Dict[str, Any]]]:
+        """Search results of a planned query (a fresh list; None if not bundled)."""
+        entry = self._queries.get(query)
+        if entry is None:
+            return None
+        return [dict(result) for result in entry["results"]]
+
+    def embedding(self, query: str) -> Optional[List[float]]:
+        """Query embedding (None if not bundled)."""
+        entry = self._queries.get(query)
+        return entry.get("embedding") if entry else None
+
+    def context(self, results: List[Dict[str, Any]]) -> Optional[str]:
+        """Formatted context for a bundled result list (matched by chunk ids)."""
+        return self._contexts.get(_result_ids(results))
+
+
+class VersionedSource(ABC):
+    """
+    A JSON artifact built from one corpus version, reloaded when it or the corpus changes.
+
+    File modification times are checked at most every RELOAD_CHECK_SECONDS,
+    so lookups cost nothing on the request path. Subclasses implement _load.
+    """
+
+    def __init__(self, path: str, store_dir: str = CHUNK_STORE_DIR):
+        self.path = path
+        self.store_dir = store_dir
+        self._value: Any = None
+        self._stamp: Optional[Tuple[Optional[float], Optional[float]]] = None
+        self._checked_at = 0.0
+
+    def _mtime(self, path: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+
+    def current(self) -> Any:
+        """The loaded artifact if it exists and matches the corpus, else None."""
+        now = time.monotonic()
+        if self._stamp is not None and now - self._checked_at < RELOAD_CHECK_SECONDS:
+            return self._value
+        self._checked_at = now
+
+        stamp = (self._mtime(self.path), self._mtime(os.path.join(self.store_dir, "manifest.json")))
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self._value = self._load() if stamp[0] is not None else None
+        return self._value
+
+    def _is_current_corpus(self, corpus_version: Optional[str], label: str) -> bool:
+        """
+        Whether an artifact built from `corpus_version` matches the chunk store.
+
+        Without a local chunk store there is nothing to compare against: the
+        artifact is used, but logged as unverified, since it is only invalidated
+        by rebuilding it.
+        """
+        store_version = current_corpus_version(self.store_dir)
+        if store_version is None:
+            print(
+                f"WARNING: {label} (corpus {corpus_version}) is unverified: no chunk store at "
+                f"{self.store_dir}; rebuild it after re-indexing"
+            )
+            return True
+        if store_version != corpus_version:
+            print(f"{label} is stale (corpus {corpus_version}, store {store_version}); not using it")
+            return False
+        return True
+
+    @abstractmethod
+    def _load(self) -> Any:
+        """Load the artifact from self.path (None if it is missing, invalid or stale)."""
+
+
+class BundleSource(VersionedSource):
+    """The current retrieval bundle of a collection."""
+
+    def __init__(self, collection_name: str, path: Optional[str] = None, store_dir: str = CHUNK_STORE_DIR):
+        super().__init__(path or bundle_path(collection_name), store_dir)
+        self.collection_name = collection_name
+
+    def current(self) -> Optional[RetrievalBundle]:
+        return super().current()
+
+    def _load(self) -> Optional[RetrievalBundle]:
+        bundle = RetrievalBundle.load(self.path)
+        if bundle is None or not self._is_current_corpus(bundle.corpus_version, "Retrieval bundle"):
+            return None
+        if bundle.params.get("collection") != self.collection_name:
+            print(f"Retrieval bundle was built for collection {bundle.params.get('collection')}; not using it")
+            return None
+        print(f"Loaded retrieval bundle: {len(bundle)} queries, {len(bundle.plans)} plans (corpus {bundle.corpus_version})")
+        return bundle
+
+
+def planned_queries() -> Dict[str, List[str]]:
+    """plan_id -> search queries of that plan, for every reachable plan."""
+    from app.core.orchestrator import all_plan_keys, plan_for, plan_id
+
+    return {plan_id(key): [task.search_query for task in plan_for(key)] for key in all_plan_keys()}
+
+
+def build_bundle(
+    qdrant_service,
+    corpus_version: Optional[str],
+    path: Optional[str] = None,
+    limit: int = 5,
+    mode: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Embed and search every planned query live, and write the bundle atomically.
+
+    Args:
+        qdrant_service: A QdrantService created with use_bundles=False
+        corpus_version: The chunk store's corpus_version the collection was indexed from
+        path: Output file (default: data/bundles/<collection>.json)
+        limit: Results per query (must match what the RAG engine requests)
+        mode: Retrieval mode (default: settings.retrieval_mode)
+
+    Returns:
+        Summary with the bundle path and the number of plans and queries
+    """
+    mode = mode or settings.retrieval_mode
+    path = path or bundle_path(qdrant_service.collection_name)
+    plans = planned_queries()
+    queries = list(dict.fromkeys(query for plan in plans.values() for query in plan))
+
+    vectors = qdrant_service._texts_to_embeddings(queries)
+    results = qdrant_service._search_vectors(vectors, limit, None, mode == "mmr")
+    document = {
+        "format_version": BUNDLE_FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "corpus_version": corpus_version,
+        "params": retrieval_params(qdrant_service.collection_name, limit, mode),
+        "plans": plans,
+        "queries": {
+            query: {
+                "embedding": vector,
+                "results": query_results,
+                "context": qdrant_service.format_context(query_results),
+            }
+            for query, vector, query_results in zip(queries, vectors, results)
+        },
+    }
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    return {"path": path, "plans": len(plans), "queries": len(queries), "corpus_version": corpus_version}
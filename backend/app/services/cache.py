@@ -0,0 +1,362 @@
+"""Cache for embeddings, retrievals and completions.
+
+A CacheBackend stores opaque bytes under string keys with a TTL, within a
+byte budget:
+- MemoryCacheBackend: an LRU dictionary in this process. Each uvicorn worker
+  has its own copy and warms it separately.
+- SQLiteCacheBackend: one database file (WAL mode) shared by every worker on
+  the host, so a value is computed once per host. Least recently used entries
+  are evicted when the file holds more than its budget.
+
+Callers use a CacheNamespace ("embedding", "retrieval", "completion"): it
+hashes JSON-serializable keys, encodes values (JSON, or packed float64
+vectors for embeddings), applies the namespace TTL and counts hits and
+misses. get_cache() returns None for a namespace that is disabled (no
+backend, a TTL of 0, or completion caching not enabled).
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.metrics import CACHE_LOOKUPS
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_CACHE_PATH = os.path.join(BACKEND_DIR, "data", "cache.sqlite")
+
+# SQLite entries refresh their LRU timestamp at most this often (seconds), so hits rarely write
+ACCESS_RESOLUTION_SECONDS = 60.0
+# Evict down to this share of the budget, so eviction does not run on every write
+EVICTION_TARGET = 0.9
+
+
+class CacheBackend(ABC):
+    """Byte values under string keys, with TTLs and a total size limit."""
+
+    name = "abstract"
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.evictions = 0
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """The value, or None if it is missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store a value for `ttl` seconds (None: until evicted). Values larger than the budget are not stored."""
+
+    @abstractmethod
+    def clear(self, prefix: str = "") -> int:
+        """Remove every entry whose key starts with `prefix`; returns how many were removed."""
+
+    @abstractmethod
+    def usage(self) -> Tuple[int, int]:
+        """(entries, bytes) currently stored."""
+
+    def describe(self) -> Dict[str, Any]:
+        entries, size = self.usage()
+        return {
+            "backend": self.name,
+            "entries": entries,
+            "bytes": size,
+            "max_bytes": self.max_bytes,
+            "evictions": self.evictions,
+        }
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process LRU cache."""
+
+    name = "memory"
+
+    def __init__(self, max_bytes: int):
+        super().__init__(max_bytes)
+        # key -> (value, expires at or None), least recently used first
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires = entry
+            if expires is not None and expires <= time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+            self._bytes += len(value)
+            while self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def clear(self, prefix: str = "") -> int:
+        with self._lock:
+            keys = [key for key in self._entries if key.startswith(prefix)]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def usage(self) -> Tuple[int, int]:
+        with self._lock:
+            return len(self._entries), self._bytes
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """LRU cache in a SQLite file shared by every process that opens the same path."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, max_bytes: int):
+        super().__init__(max_bytes)
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,
+                expires REAL, accessed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+            CREATE TABLE IF NOT EXISTS totals (id INTEGER PRIMARY KEY CHECK (id = 0), bytes INTEGER NOT NULL);
+            INSERT OR IGNORE INTO totals (id, bytes) VALUES (0, 0);
+            """
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit; writes open their transaction explicitly with BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            # A lost cache write after a power failure is harmless
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _write(self, operation: Callable[[sqlite3.Connection], Any]) -> Any:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            result = operation(connection)
+            connection.execute("COMMIT")
+            return result
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        row = self._connection().execute(
+            "SELECT value, expires, accessed FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires, accessed = row
+        now = time.time()
+        if expires is not None and expires <= now:
+            return None
+        if now - accessed > ACCESS_RESOLUTION_SECONDS:
+            self._write(lambda c: c.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key)))
+        return bytes(value)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        if len(value) > self.max_bytes:
+            return
+        now = time.time()
+
+        def write(connection: sqlite3.Connection) -> None:
+            row = connection.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now + ttl if ttl else None, now)
+            )
+            connection.execute("UPDATE totals SET bytes = bytes + ? WHERE id = 0", (len(value) - (row[0] if row else 0),))
+            total = connection.execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0]
+            if total > self.max_bytes:
+                self._evict(connection, now)
+
+        self._write(write)
+
+    def _evict(self, connection: sqlite3.Connection, now: float) -> None:
+        """Drop expired entries, then least recently used ones down to the eviction target."""
+        connection.execute("DELETE FROM entries WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        total = connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        target = self.max_bytes * EVICTION_TARGET
+        removed = []
+        if total > target:
+            for key, size in connection.execute("SELECT key, size FROM entries ORDER BY accessed"):
+                removed.append(key)
+                total -= size
+                if total <= target:
+                    break
+            connection.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in removed])
+        connection.execute("UPDATE totals SET bytes = ? WHERE id = 0", (total,))
+        self.evictions += len(removed)
+
+    def clear(self, prefix: str = "") -> int:
+        def write(connection: sqlite3.Connection) -> int:
+            # Keys are "<namespace>:<hex digest>", so no LIKE wildcards to escape
+            removed = connection.execute("DELETE FROM entries WHERE key LIKE ?", (prefix + "%",)).rowcount
+            connection.execute("UPDATE totals SET bytes = (SELECT COALESCE(SUM(size), 0) FROM entries) WHERE id = 0")
+            return removed
+
+        return self._write(write)
+
+    def usage(self) -> Tuple[int, int]:
+        row = self._connection().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return row[0], row[1]
+
+
+def _encode_json(value: Any) -> bytes:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _decode_json(data: bytes) -> Any:
+    return json.loads(data.decode("utf-8"))
+
+
+def _encode_vector(value: List[float]) -> bytes:
+    return array("d", value).tobytes()
+
+
+def _decode_vector(data: bytes) -> List[float]:
+    vector = array("d")
+    vector.frombytes(data)
+    return vector.tolist()
+
+
+CODECS = {
+    "json": (_encode_json, _decode_json),
+    "vector": (_encode_vector, _decode_vector),
+}
+
+
+class CacheNamespace:
+    """One kind of cached value: key hashing, encoding, TTL and hit/miss counts."""
+
+    def __init__(self, backend: CacheBackend, namespace: str, ttl: Optional[float], codec: str = "json"):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self._encode, self._decode = CODECS[codec]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, key: Any) -> str:
+        """Backend key of a JSON-serializable key."""
+        canonical = json.dumps(key, sort_keys=True, ensure_ascii=False, default=str)
+        return f"{self.namespace}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+    def get(self, key: Any) -> Optional[Any]:
+        try:
+            data = self.backend.get(self.key(key))
+        except sqlite3.Error as e:
+            # A broken cache must not fail the request
+            print(f"Cache read failed ({self.namespace}): {str(e)}")
+            data = None
+        hit = data is not None
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        CACHE_LOOKUPS.labels(namespace=self.namespace, result="hit" if hit else "miss").inc()
+        return self._decode(data) if hit else None
+
+    def set(self, key: Any, value: Any) -> None:
+        try:
+            self.backend.set(self.key(key), self._encode(value), self.ttl)
+        except sqlite3.Error as e:
+            print(f"Cache write failed ({self.namespace}): {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            "ttl_seconds": self.ttl,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        }
+
+
+# Namespace -> (codec, TTL setting, enabled setting or None)
+NAMESPACES = {
+    "embedding": ("vector", "embedding_cache_ttl_seconds", None),
+    "retrieval": ("json", "retrieval_cache_ttl_seconds", None),
+    "completion": ("json", "completion_cache_ttl_seconds", "completion_cache_enabled"),
+}
+
+_backend: Optional[CacheBackend] = None
+_backend_created = False
+_namespaces: Dict[str, CacheNamespace] = {}
+_cache_lock = threading.Lock()
+
+
+def create_backend() -> Optional[CacheBackend]:
+    """The backend selected by settings.cache_backend (None for "none")."""
+    max_bytes = int(settings.cache_max_mb * 1024 * 1024)
+    if settings.cache_backend == "sqlite":
+        return SQLiteCacheBackend(settings.cache_path or DEFAULT_CACHE_PATH, max_bytes)
+    if settings.cache_backend == "memory":
+        return MemoryCacheBackend(max_bytes)
+    if settings.cache_backend != "none":
+        print(f"Unknown CACHE_BACKEND {settings.cache_backend!r}; caching disabled")
+    return None
+
+
+def get_cache(namespace: str) -> Optional[CacheNamespace]:
+    """The process-wide cache of a namespace, or None if caching it is disabled."""
+    global _backend, _backend_created
+    codec, ttl_setting, enabled_setting = NAMESPACES[namespace]
+    ttl = getattr(settings, ttl_setting)
+    if ttl <= 0 or (enabled_setting and not getattr(settings, enabled_setting)):
+        return None
+    with _cache_lock:
+        if not _backend_created:
+            _backend = create_backend()
+            _backend_created = True
+        if _backend is None:
+            return None
+        if namespace not in _namespaces:
+            _namespaces[namespace] = CacheNamespace(_backend, namespace, ttl, codec)
+        return _namespaces[namespace]
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Backend size and per-namespace hit/miss counts (of this process) for the admin endpoint."""
+    with _cache_lock:
+        backend, namespaces = _backend, dict(_namespaces)
+    if backend is None:
+        return {"backend": settings.cache_backend, "namespaces": {}}
+    stats = backend.describe()
+    stats["namespaces"] = {name: cache.stats() for name, cache in sorted(namespaces.items())}
+    return stats
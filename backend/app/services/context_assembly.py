@@ -0,0 +1,145 @@
+"""Context assembly: turn retrieved chunks into a compact LLM context.
+
+Ingestion splits documents with chunk_overlap=200, so neighbouring chunks
+from one document share text. This stage:
+- drops chunks whose text was already seen,
+- merges overlapping or adjacent chunks of the same document into one span,
+- emits one source header per document instead of one per chunk.
+"""
+import hashlib
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Largest gap (in characters) between two chunks that still counts as adjacent;
+# the splitter strips the separators ("\n\n") it splits on
+ADJACENT_GAP = 5
+# Overlap search bounds when chunks carry no offsets (legacy collections)
+MIN_TEXT_OVERLAP = 20
+MAX_TEXT_OVERLAP = 400
+
+
+def _chunk_fields(result: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Return (text, metadata) from a search result (LangChain payload layout)."""
+    payload = result.get("payload") or {}
+    return payload.get("page_content", "") or "", payload.get("metadata") or {}
+
+
+def _text_overlap(left: str, right: str) -> int:
+    """Length of the longest suffix of left that is a prefix of right (0 if too short)."""
+    limit = min(len(left), len(right), MAX_TEXT_OVERLAP)
+    for size in range(limit, MIN_TEXT_OVERLAP - 1, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def _merge_offset_spans(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge spans that carry start/end offsets into the same document."""
+    spans = sorted(spans, key=lambda s: s["start"])
+    merged = [dict(spans[0])]
+    for span in spans[1:]:
+        current = merged[-1]
+        overlap = current["end"] - span["start"]
+        if span["end"] <= current["end"]:
+            # Fully contained in the current span
+            continue
+        if overlap > 0 and current["text"].endswith(span["text"][:overlap]):
+            current["text"] += span["text"][overlap:]
+            current["end"] = span["end"]
+        elif -ADJACENT_GAP <= overlap <= 0:
+            current["text"] += "\n" + span["text"]
+            current["end"] = span["end"]
+        else:
+            merged.append(dict(span))
+    return merged
+
+
+def _merge_text_spans(spans: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Merge spans without offsets by detecting shared text at their edges."""
+    merged: List[Dict[str, Any]] = []
+    for span in spans:
+        text = span["text"]
+        absorbed = False
+        for current in merged:
+            if text in current["text"]:
+                absorbed = True
+            elif current["text"] in text:
+                current["text"] = text
+                absorbed = True
+            else:
+                tail = _text_overlap(current["text"], text)
+                head = _text_overlap(text, current["text"]) if not tail else 0
+                if tail:
+                    current["text"] += text[tail:]
+                    absorbed = True
+                elif head:
+                    current["text"] = text + current["text"][head:]
+                    absorbed = True
+            if absorbed:
+                break
+        if not absorbed:
+            merged.append(dict(span))
+    return merged
+
+
+def assemble_context(search_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Deduplicate and merge retrieved chunks per source document.
+
+    Args:
+        search_results: Results from QdrantService.search (score, payload, id)
+
+    Returns:
+        One entry per document, ordered by best score:
+        {"source": filename, "page": page or None, "spans": [text, ...], "score": best score}
+    """
+    seen_hashes = set()
+    groups: Dict[Tuple[str, Optional[Any]], Dict[str, Any]] = {}
+
+    for result in search_results:
+        text, metadata = _chunk_fields(result)
+        if not text.strip():
+            continue
+        digest = metadata.get("content_hash") or hashlib.sha256(text.encode("utf-8")).hexdigest()
+        if digest in seen_hashes:
+            continue
+        seen_hashes.add(digest)
+
+        source = metadata.get("source_filename") or metadata.get("source", "Unknown")
+        # PDF loaders emit one document per page, each with its own offsets
+        page = metadata.get("page")
+        group = groups.setdefault((source, page), {
+            "source": source,
+            "page": page,
+            "score": result.get("score"),
+            "chunks": [],
+        })
+        group["chunks"].append({
+            "text": text,
+            "start": metadata.get("start_offset"),
+            "end": metadata.get("end_offset"),
+        })
+
+    assembled = []
+    for group in groups.values():
+        chunks = group.pop("chunks")
+        if all(c["start"] is not None and c["end"] is not None for c in chunks):
+            spans = _merge_offset_spans(chunks)
+        else:
+            spans = _merge_text_spans(chunks)
+        group["spans"] = [span["text"] for span in spans]
+        assembled.append(group)
+
+    return assembled
+
+
+def render_context(assembled: List[Dict[str, Any]]) -> str:
+    """Render assembled documents as the context block sent to the LLM."""
+    context_parts = []
+    for i, group in enumerate(assembled, 1):
+        source = group["source"]
+        if group.get("page") is not None:
+            source = f"{source}, page {group['page']}"
+        body = "\n[...]\n".join(group["spans"])
+        context_parts.append(f"Context {i} (Source: {source}):\n{body}")
+    return "\n---\n".join(context_parts)
@@ -0,0 +1,143 @@
+"""Hedged requests: trim tail latency by racing a duplicate of slow calls.
+
+When a call has not returned after the configured percentile of recently
+observed latencies, one duplicate is launched and whichever finishes first
+wins. Latencies are tracked per route key (e.g. model and max_tokens), since a
+large model writing a long answer is not slow by a small model's standard.
+Duplicates are capped per minute so hedging cannot double the spend.
+"""
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, Optional, TypeVar
+
+from app.services.metrics import HEDGE_EVENTS
+from app.utils.concurrency import submit_in_context
+
+
+T = TypeVar("T")
+
+
+class LatencyTracker:
+    """Sliding window of observed call latencies."""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """Return the p-th percentile latency, or None until enough samples exist."""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+
+class HedgeBudget:
+    """Caps the number of duplicate requests launched per rolling minute."""
+
+    def __init__(self, max_per_minute: int):
+        self.max_per_minute = max_per_minute
+        self._launched = deque()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            while self._launched and now - self._launched[0] >= 60:
+                self._launched.popleft()
+            if len(self._launched) >= self.max_per_minute:
+                return False
+            self._launched.append(now)
+            return True
+
+
+class HedgingPolicy:
+    """Runs a call, launching one duplicate if it is slower than the hedge percentile."""
+
+    def __init__(self, percentile: float, max_per_minute: int, min_samples: int = 20, max_workers: int = 32):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.trackers: Dict[str, LatencyTracker] = {}
+        self.budget = HedgeBudget(max_per_minute)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "hedges_launched": 0, "hedge_wins": 0, "budget_exhausted": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self._stats[key] += 1
+        if key != "calls":
+            HEDGE_EVENTS.labels(event=key).inc()
+
+    def stats(self) -> Dict[str, int]:
+        """Counters: calls, hedges launched, hedge wins and budget-denied hedges."""
+        with self._lock:
+            return dict(self._stats)
+
+    def tracker(self, key: str) -> LatencyTracker:
+        """The latency window of one route key (created on first use)."""
+        with self._lock:
+            if key not in self.trackers:
+                self.trackers[key] = LatencyTracker(min_samples=self.min_samples)
+            return self.trackers[key]
+
+    def _timed(self, tracker: LatencyTracker, call: Callable[[], T]) -> T:
+        started = time.monotonic()
+        result = call()
+        tracker.record(time.monotonic() - started)
+        return result
+
+    def run(self, call: Callable[[], T], key: str = "default") -> T:
+        """
+        Execute `call`, hedging it if it outlives the latency percentile of its route.
+
+        The losing request is not cancelled (the HTTP call cannot be
+        interrupted); its result is discarded when it completes.
+
+        Args:
+            call: The request to run
+            key: Route key; only latencies of calls with the same key set the hedge delay
+
+        Returns:
+            The result of whichever attempt succeeds first
+
+        Raises:
+            Exception: The primary's error if no attempt succeeds
+        """
+        self._count("calls")
+        tracker = self.tracker(key)
+        hedge_after = tracker.percentile(self.percentile)
+        primary: Future = submit_in_context(self._executor, self._timed, tracker, call)
+
+        if hedge_after is None:
+            return primary.result()
+
+        done, _ = wait([primary], timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        if not self.budget.try_acquire():
+            self._count("budget_exhausted")
+            return primary.result()
+
+        self._count("hedges_launched")
+        hedge: Future = submit_in_context(self._executor, self._timed, tracker, call)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is hedge:
+                        self._count("hedge_wins")
+                    return future.result()
+        # Both attempts failed: surface the primary's error
+        return primary.result()
@@ -0,0 +1,81 @@
+"""Prometheus metrics for memo generation.
+
+Exposed at /metrics. With several uvicorn workers, set PROMETHEUS_MULTIPROC_DIR
+to a shared, empty directory so every worker's samples are aggregated.
+"""
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+
+
+# Stage latencies span sub-millisecond CPU work to multi-second completions
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 60, 120)
+
+STAGE_LATENCY = Histogram(
+    "taxmemo_stage_duration_seconds",
+    "Latency of memo pipeline stages",
+    ["stage"],
+    buckets=STAGE_BUCKETS
+)
+CRITICAL_PATH = Histogram(
+    "taxmemo_critical_path_seconds",
+    "Critical path of each memo's section DAG (retrieval and the longest chain of dependent sections)",
+    buckets=STAGE_BUCKETS
+)
+RATE_LIMIT_WAIT = Histogram(
+    "taxmemo_rate_limit_wait_seconds",
+    "Time OpenAI calls queued for the host-wide rate governor (only calls that had to wait)",
+    ["model"],
+    buckets=STAGE_BUCKETS
+)
+JSON_PARSE_FALLBACKS = Counter(
+    "taxmemo_json_parse_fallbacks_total",
+    "Completions that could not be parsed as JSON and fell back to raw text",
+    ["section"]
+)
+EMPTY_RETRIEVALS = Counter(
+    "taxmemo_empty_retrievals_total",
+    "Section retrievals that returned no chunks above the score threshold",
+    ["section"]
+)
+SECTION_ERRORS = Counter(
+    "taxmemo_section_errors_total",
+    "Sections that failed to generate",
+    ["section", "reason"]
+)
+MEMOS_IN_FLIGHT = Gauge(
+    "taxmemo_memos_in_flight",
+    "Memo requests currently being generated",
+    multiprocess_mode="livesum"
+)
+RETRIEVAL_BUNDLE_LOOKUPS = Counter(
+    "taxmemo_retrieval_bundle_lookups_total",
+    "Planned queries answered from the retrieval bundle (hit) or searched live (miss)",
+    ["result"]
+)
+CACHE_LOOKUPS = Counter(
+    "taxmemo_cache_lookups_total",
+    "Cache lookups per namespace (embedding, retrieval, completion) and result (hit, miss)",
+    ["namespace", "result"]
+)
+MODEL_UPGRADES = Counter(
+    "taxmemo_model_upgrades_total",
+    "Sections retried on the synthesis model because the routed model's output did not validate",
+    ["section", "model"]
+)
+HEDGE_EVENTS = Counter(
+    "taxmemo_llm_hedge_events_total",
+    "Hedged completion events (hedges_launched, hedge_wins, budget_exhausted)",
+    ["event"]
+)
+
+
+def render_metrics():
+    """Return (payload, content type) for the /metrics endpoint."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
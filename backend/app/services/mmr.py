@@ -0,0 +1,62 @@
+"""Maximal marginal relevance (MMR) selection over retrieved chunks."""
+import math
+from typing import List, Sequence
+
+
+def _normalize(vector: Sequence[float]) -> List[float]:
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm == 0:
+        return list(vector)
+    return [x / norm for x in vector]
+
+
+def _dot(a: Sequence[float], b: Sequence[float]) -> float:
+    return sum(x * y for x, y in zip(a, b))
+
+
+def mmr_select(
+    relevance: Sequence[float],
+    vectors: Sequence[Sequence[float]],
+    k: int,
+    lambda_mult: float = 0.5
+) -> List[int]:
+    """
+    Choose k candidates balancing relevance to the query against redundancy.
+
+    Each step picks the candidate maximizing
+        lambda * relevance - (1 - lambda) * max cosine similarity to already chosen
+    so lambda=1.0 is plain top-k and lower values favour diversity.
+
+    Args:
+        relevance: Query similarity per candidate (Qdrant cosine scores)
+        vectors: Candidate embedding vectors, same order as relevance
+        k: Number of candidates to select
+        lambda_mult: Relevance/diversity trade-off in [0, 1]
+
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    count = min(k, len(relevance))
+    if count <= 0:
+        return []
+
+    unit = [_normalize(v) for v in vectors]
+    selected: List[int] = []
+    # Highest similarity of each candidate to anything selected so far
+    max_similarity = [float("-inf")] * len(relevance)
+
+    while len(selected) < count:
+        best_index, best_score = -1, float("-inf")
+        for i, rel in enumerate(relevance):
+            if i in selected:
+                continue
+            redundancy = max_similarity[i] if selected else 0.0
+            score = lambda_mult * rel - (1 - lambda_mult) * redundancy
+            if score > best_score:
+                best_index, best_score = i, score
+        selected.append(best_index)
+        for i in range(len(relevance)):
+            if i not in selected:
+                max_similarity[i] = max(max_similarity[i], _dot(unit[i], unit[best_index]))
+
+    return selected
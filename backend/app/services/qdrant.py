@@ -1,35 +1,244 @@
 """Qdrant Vector DB connection and search service."""
+import time
+import uuid
 from typing import List, Dict, Any, Optional, Union
 from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue
+from qdrant_client.models import Distance, Filter, FieldCondition, MatchAny, MatchValue, PointStruct, SearchRequest, VectorParams
 from app.core.config import settings
+from app.services.bundles import (
+    EMBEDDING_MODEL,
+    RELOAD_CHECK_SECONDS,
+    BundleSource,
+    RetrievalBundle,
+    retrieval_params,
+)
+from app.services.cache import get_cache
+from app.services.context_assembly import assemble_context, render_context
+from app.services.metrics import RETRIEVAL_BUNDLE_LOOKUPS
+from app.services.mmr import mmr_select
+from app.services.rate_governor import estimate_text_tokens
+from app.services.resilience import call_with_resilience
+from app.services.tracing import span
+from app.services.usage import record_usage
 from openai import OpenAI
 
 
+class RetrievalError(Exception):
+    """Raised when embedding or vector search fails (instead of searching with a dummy vector)."""
+
+
+# Every index run records itself in a one-point side collection ("<collection>_manifest"),
+# so servers without the local chunk store can still tell that the collection changed
+INDEX_MANIFEST_POINT_ID = 1
+
+
+def index_manifest_collection(collection_name: str) -> str:
+    """Name of the side collection holding a collection's index manifest."""
+    return f"{collection_name}_manifest"
+
+
+def delete_index_manifest(client: QdrantClient, collection_name: str) -> None:
+    """Drop a collection's manifest (before re-indexing it: its version is unknown until done)."""
+    manifest_collection = index_manifest_collection(collection_name)
+    if client.collection_exists(manifest_collection):
+        client.delete_collection(collection_name=manifest_collection)
+
+
+def write_index_manifest(
+    client: QdrantClient,
+    collection_name: str,
+    corpus_version: Optional[str],
+    chunk_count: int
+) -> Dict[str, Any]:
+    """
+    Record a finished index run of a collection.
+    
+    Args:
+        client: Qdrant client
+        collection_name: The collection that was indexed
+        corpus_version: The chunk store's corpus_version it was indexed from
+        chunk_count: Points upserted
+    
+    Returns:
+        The manifest; its index_version is new on every run, so re-indexing the
+        same corpus (e.g. with changed enrichment) still counts as a change
+    """
+    manifest = {
+        "collection": collection_name,
+        "corpus_version": corpus_version,
+        "chunk_count": chunk_count,
+        "index_version": uuid.uuid4().hex[:16],
+        "indexed_at": time.time(),
+    }
+    manifest_collection = index_manifest_collection(collection_name)
+    delete_index_manifest(client, collection_name)
+    # Collections need a vector; the manifest point's one is never searched
+    client.create_collection(
+        collection_name=manifest_collection,
+        vectors_config=VectorParams(size=1, distance=Distance.DOT),
+    )
+    client.upsert(
+        collection_name=manifest_collection,
+        points=[PointStruct(id=INDEX_MANIFEST_POINT_ID, vector=[1.0], payload=manifest)],
+    )
+    return manifest
+
+
+def read_index_manifest(client: QdrantClient, collection_name: str) -> Optional[Dict[str, Any]]:
+    """A collection's index manifest (None if it has none, e.g. indexed before manifests, or Qdrant fails)."""
+    try:
+        points = client.retrieve(
+            collection_name=index_manifest_collection(collection_name),
+            ids=[INDEX_MANIFEST_POINT_ID],
+            with_payload=True,
+            timeout=max(1, int(settings.qdrant_timeout_seconds))
+        )
+    except Exception:
+        return None
+    return dict(points[0].payload or {}) if points else None
+
+
 class QdrantService:
     """Service for interacting with Qdrant vector database."""
     
-    def __init__(self):
-        """Initialize Qdrant client."""
+    def __init__(self, use_bundles: Optional[bool] = None):
+        """
+        Initialize Qdrant client.
+        
+        Args:
+            use_bundles: Serve planned queries from the precomputed retrieval
+                bundle (default: settings.retrieval_bundles_enabled)
+        """
         if settings.qdrant_api_key:
             self.client = QdrantClient(
                 url=settings.qdrant_url,
-                api_key=settings.qdrant_api_key
+                api_key=settings.qdrant_api_key,
+                timeout=int(settings.qdrant_timeout_seconds)
             )
         else:
-            self.client = QdrantClient(url=settings.qdrant_url)
+            self.client = QdrantClient(url=settings.qdrant_url, timeout=int(settings.qdrant_timeout_seconds))
         
         # V1: Use the netherlands_pilot collection from data ingestion
         self.collection_name = "netherlands_pilot"
         # Initialize OpenAI for text embeddings
-        self.openai_client = OpenAI(api_key=settings.openai_api_key)
+        # Retries are handled by the resilience layer, not the SDK
+        self.openai_client = OpenAI(
+            api_key=settings.openai_api_key,
+            max_retries=0,
+            timeout=settings.embedding_timeout_seconds
+        )
+        if use_bundles is None:
+            use_bundles = settings.retrieval_bundles_enabled
+        self.bundle_source = BundleSource(self.collection_name) if use_bundles else None
+        self._index_version: Optional[str] = None
+        self._index_checked_at = float("-inf")
+    
+    def _bundle(self) -> Optional[RetrievalBundle]:
+        """The current retrieval bundle, if enabled and up to date."""
+        return self.bundle_source.current() if self.bundle_source else None
+    
+    def _bundled_results(
+        self,
+        queries: List[str],
+        limit: int,
+        mode: str,
+        filters: Optional[Dict[str, Any]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Results of the queries the bundle can answer for this search."""
+        bundle = self._bundle()
+        if bundle is None or not bundle.serves(self.collection_name, limit, mode, filters):
+            return {}
+        found = {}
+        for query in queries:
+            results = bundle.results(query)
+            if results is not None:
+                found[query] = results
+        RETRIEVAL_BUNDLE_LOOKUPS.labels(result="hit").inc(len(found))
+        RETRIEVAL_BUNDLE_LOOKUPS.labels(result="miss").inc(len(queries) - len(found))
+        return found
+    
+    def index_version(self) -> Optional[str]:
+        """
+        index_version of the collection's manifest, checked at most every RELOAD_CHECK_SECONDS.
+        
+        None when the collection has no manifest (indexed before manifests were
+        written, or being re-indexed right now) or Qdrant could not be asked.
+        """
+        now = time.monotonic()
+        if now - self._index_checked_at > RELOAD_CHECK_SECONDS:
+            manifest = read_index_manifest(self.client, self.collection_name)
+            index_version = manifest.get("index_version") if manifest else None
+            if index_version is None and self._index_version is not None:
+                print(f"Index manifest of {self.collection_name} is gone; not caching retrievals")
+            self._index_version = index_version
+            self._index_checked_at = now
+        return self._index_version
+    
+    def _retrieval_cache_version(self) -> Optional[str]:
+        """Index version to cache retrievals under (None: retrieval cache off or version unknown)."""
+        return self.index_version() if get_cache("retrieval") is not None else None
+    
+    def _retrieval_key(
+        self,
+        index_version: str,
+        query: str,
+        limit: int,
+        mode: str,
+        filters: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Retrieval cache key: the query, its search settings and the collection's index version."""
+        return dict(
+            retrieval_params(self.collection_name, limit, mode),
+            index_version=index_version,
+            filters=filters,
+            query=query
+        )
+    
+    def _cached_results(
+        self,
+        index_version: Optional[str],
+        queries: List[str],
+        limit: int,
+        mode: str,
+        filters: Optional[Dict[str, Any]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """Results of the queries found in the retrieval cache (none while the index version is unknown)."""
+        cache = get_cache("retrieval")
+        if cache is None or index_version is None:
+            return {}
+        found = {}
+        for query in queries:
+            results = cache.get(self._retrieval_key(index_version, query, limit, mode, filters))
+            if results is not None:
+                found[query] = results
+        return found
+    
+    def _cache_results(
+        self,
+        index_version: Optional[str],
+        results: Dict[str, List[Dict[str, Any]]],
+        limit: int,
+        mode: str,
+        filters: Optional[Dict[str, Any]]
+    ) -> None:
+        """
+        Store search results under the index version read before searching, so
+        results from a collection being re-indexed never get the new version.
+        """
+        cache = get_cache("retrieval")
+        if cache is None or index_version is None:
+            return
+        for query, query_results in results.items():
+            cache.set(self._retrieval_key(index_version, query, limit, mode, filters), query_results)
     
     def search(
         self,
         query: str,
         limit: int = 5,
         country: str = "netherlands",
-        year: str = "2025"
+        year: str = "2025",
+        filters: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Search the vector database with mandatory metadata filters.
@@ -41,42 +250,222 @@ class QdrantService:
             limit: Number of results to return (default: 5)
             country: Country filter (default: "netherlands")
             year: Year filter (default: "2025")
+            filters: Optional enriched-metadata filters, e.g.
+                {"doc_type": "rechtspraak", "topic": ["holding", "corporate_income_tax"]}.
+                List values match any of the given values.
+            mode: "similarity" or "mmr" (default: settings.retrieval_mode).
+                MMR fetches settings.mmr_fetch_k candidates with vectors and
+                keeps the `limit` most relevant yet mutually diverse ones.
+        
+        Only hits scoring at least settings.retrieval_score_threshold and
+        within settings.retrieval_score_margin of the best hit are kept, so
+        fewer than `limit` (possibly zero) results can be returned.
+        
+        Planned queries are answered from the retrieval bundle when it is
+        current (see app/services/bundles.py), repeated ones from the
+        retrieval cache while the collection's index manifest is readable.
         
         Returns:
             List of search results with metadata
+        
+        Raises:
+            RetrievalError: If embedding the query or the Qdrant search fails
         """
+        mode = mode or settings.retrieval_mode
+        bundled = self._bundled_results([query], limit, mode, filters)
+        if query in bundled:
+            return bundled[query]
+        index_version = self._retrieval_cache_version()
+        cached = self._cached_results(index_version, [query], limit, mode, filters)
+        if query in cached:
+            return cached[query]
+        
         try:
             # Convert query text to embedding vector
             # Qdrant search requires a query vector, not text
-            query_vector = self._text_to_embedding(query)
+            bundle = self._bundle()
+            query_vector = (bundle and bundle.embedding(query)) or self._text_to_embedding(query)
             
-            # Perform vector search (no metadata filters for V1 - search all documents)
-            search_results = self.client.search(
-                collection_name=self.collection_name,
-                query_vector=query_vector,
-                limit=limit
-            )
+            use_mmr = mode == "mmr"
             
-            # Format results
-            results = []
-            for result in search_results:
-                results.append({
-                    "score": result.score,
-                    "payload": result.payload,
-                    "id": result.id
-                })
+            # Perform vector search (no country/year filters for V1 - only explicit metadata filters)
+            with span("search", stage="qdrant_search"):
+                search_results = call_with_resilience(
+                    "qdrant",
+                    lambda timeout: self.client.search(
+                        collection_name=self.collection_name,
+                        query_vector=query_vector,
+                        query_filter=self._build_filter(filters),
+                        limit=max(limit, settings.mmr_fetch_k) if use_mmr else limit,
+                        with_vectors=use_mmr,
+                        score_threshold=settings.retrieval_score_threshold or None,
+                        timeout=max(1, int(timeout))
+                    ),
+                    call_timeout=settings.qdrant_timeout_seconds
+                )
             
+            results = self._select_results(search_results, limit, use_mmr)
+            self._cache_results(index_version, {query: results}, limit, mode, filters)
             return results
         
+        except RetrievalError:
+            raise
         except Exception as e:
-            # Log error and return empty list
+            # Fail fast: callers must not generate from a failed search
             print(f"Qdrant search error: {str(e)}")
+            raise RetrievalError(f"Qdrant search failed: {str(e)}") from e
+    
+    def search_batch(
+        self,
+        queries: List[str],
+        limit: int = 5,
+        filters: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search several queries in one embedding call and one Qdrant request.
+        
+        Applies the same thresholding and selection as search(). Duplicate
+        queries are embedded and searched once, and queries in the current
+        retrieval bundle or the retrieval cache are not searched at all.
+        
+        Args:
+            queries: Search query texts (e.g. every task of a memo plan)
+            limit: Number of results per query
+            filters: Optional enriched-metadata filters applied to every query
+            mode: "similarity" or "mmr" (default: settings.retrieval_mode)
+        
+        Returns:
+            One result list per query, in the same order as `queries`
+        
+        Raises:
+            RetrievalError: If embedding or the batch search fails
+        """
+        if not queries:
             return []
+        
+        unique_queries = list(dict.fromkeys(queries))
+        mode = mode or settings.retrieval_mode
+        by_query = self._bundled_results(unique_queries, limit, mode, filters)
+        index_version = self._retrieval_cache_version()
+        by_query.update(self._cached_results(
+            index_version, [query for query in unique_queries if query not in by_query], limit, mode, filters
+        ))
+        missing = [query for query in unique_queries if query not in by_query]
+        if not missing:
+            return [by_query[query] for query in queries]
+        
+        try:
+            # Bundled embeddings still save the embedding call when the
+            # bundle's results don't apply (e.g. other filters or limit)
+            bundle = self._bundle()
+            vectors = {query: bundle.embedding(query) for query in missing} if bundle else {}
+            to_embed = [query for query in missing if not vectors.get(query)]
+            if to_embed:
+                vectors.update(zip(to_embed, self._texts_to_embeddings(to_embed)))
+            
+            results = dict(zip(missing, self._search_vectors(
+                [vectors[query] for query in missing], limit, filters, mode == "mmr"
+            )))
+            self._cache_results(index_version, results, limit, mode, filters)
+            by_query.update(results)
+            return [by_query[query] for query in queries]
+        
+        except RetrievalError:
+            raise
+        except Exception as e:
+            print(f"Qdrant batch search error: {str(e)}")
+            raise RetrievalError(f"Qdrant batch search failed: {str(e)}") from e
+    
+    def _search_vectors(
+        self,
+        vectors: List[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]],
+        use_mmr: bool
+    ) -> List[List[Dict[str, Any]]]:
+        """Search several query vectors in one Qdrant request; results in input order."""
+        query_filter = self._build_filter(filters)
+        requests = [
+            SearchRequest(
+                vector=vector,
+                filter=query_filter,
+                limit=max(limit, settings.mmr_fetch_k) if use_mmr else limit,
+                with_payload=True,
+                with_vector=use_mmr,
+                score_threshold=settings.retrieval_score_threshold or None
+            )
+            for vector in vectors
+        ]
+        
+        # One round trip for the whole plan
+        with span("search", stage="qdrant_search"):
+            batch_results = call_with_resilience(
+                "qdrant",
+                lambda timeout: self.client.search_batch(
+                    collection_name=self.collection_name,
+                    requests=requests,
+                    timeout=max(1, int(timeout))
+                ),
+                call_timeout=settings.qdrant_timeout_seconds
+            )
+        
+        return [self._select_results(points, limit, use_mmr) for points in batch_results]
+    
+    def _select_results(self, points: list, limit: int, use_mmr: bool) -> List[Dict[str, Any]]:
+        """Apply adaptive k and optional MMR to scored points, then format them."""
+        # Adaptive k: drop the tail that falls too far below the best hit
+        if points and settings.retrieval_score_margin:
+            floor = points[0].score - settings.retrieval_score_margin
+            points = [point for point in points if point.score >= floor]
+        
+        if use_mmr:
+            selected = mmr_select(
+                relevance=[point.score for point in points],
+                vectors=[point.vector for point in points],
+                k=limit,
+                lambda_mult=settings.mmr_lambda
+            )
+            points = [points[i] for i in selected]
+        
+        # Format results
+        results = []
+        for point in points:
+            results.append({
+                "score": point.score,
+                "payload": point.payload,
+                "id": point.id
+            })
+        
+        return results
+    
+    def _build_filter(self, filters: Optional[Dict[str, Any]]) -> Optional[Filter]:
+        """
+        Build a Qdrant filter over the enriched chunk metadata.
+        
+        Ingestion stores chunk metadata under the "metadata" payload key
+        (doc_type, language, topic, year, ...), so keys are prefixed accordingly.
+        """
+        if not filters:
+            return None
+        
+        conditions = []
+        for key, value in filters.items():
+            if value is None:
+                continue
+            match = MatchAny(any=list(value)) if isinstance(value, (list, tuple, set)) else MatchValue(value=value)
+            conditions.append(FieldCondition(key=f"metadata.{key}", match=match))
+        
+        return Filter(must=conditions) if conditions else None
     
     def format_context(self, search_results: List[Dict[str, Any]]) -> str:
         """
         Format search results into a context string for LLM.
         
+        Chunks from the same document are deduplicated and merged into
+        contiguous spans (ingestion overlaps chunks by 200 characters), and
+        each document gets a single source header.
+        
         Args:
             search_results: List of search result dictionaries
         
@@ -86,17 +475,13 @@ class QdrantService:
         if not search_results:
             return "No relevant context found in knowledge base."
         
-        context_parts = []
-        for i, result in enumerate(search_results, 1):
-            payload = result.get("payload", {})
-            # LangChain QdrantVectorStore stores: page_content and metadata
-            content = payload.get("page_content", "")
-            metadata = payload.get("metadata", {})
-            source_filename = metadata.get("source_filename") or metadata.get("source", "Unknown")
-            
-            context_parts.append(f"Context {i} (Source: {source_filename}):\n{content}")
+        # Bundled results come with their context already rendered
+        bundle = self._bundle()
+        context = bundle.context(search_results) if bundle else None
+        if context is not None:
+            return context
         
-        return "\n---\n".join(context_parts)
+        return render_context(assemble_context(search_results))
     
     def _text_to_embedding(self, text: str) -> List[float]:
         """
@@ -107,15 +492,71 @@ class QdrantService:
         
         Returns:
             List of floats representing the embedding vector
+        
+        Raises:
+            RetrievalError: If the embedding request fails
         """
+        cache = get_cache("embedding")
+        vector = cache.get([EMBEDDING_MODEL, text]) if cache else None
+        if vector is not None:
+            return vector
         try:
-            response = self.openai_client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text
-            )
-            return response.data[0].embedding
+            with span("embed", stage="embedding"):
+                response = call_with_resilience(
+                    "openai",
+                    lambda timeout: self.openai_client.embeddings.create(
+                        model="text-embedding-3-small",
+                        input=text,
+                        timeout=timeout
+                    ),
+                    call_timeout=settings.embedding_timeout_seconds,
+                    rate=("text-embedding-3-small", estimate_text_tokens([text]))
+                )
+            record_usage("retrieval", "text-embedding-3-small", response.usage, kind="embedding")
+            vector = response.data[0].embedding
         except Exception as e:
             print(f"Error generating embedding: {str(e)}")
-            # Return empty vector as fallback (will result in no matches)
-            return [0.0] * 1536  # text-embedding-3-small dimension
+            # Fail fast: a zero vector would search Qdrant for nothing
+            raise RetrievalError(f"Embedding failed: {str(e)}") from e
+        if cache:
+            cache.set([EMBEDDING_MODEL, text], vector)
+        return vector
+    
+    def _texts_to_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Convert several texts to embedding vectors in a single OpenAI request.
+        
+        Texts in the embedding cache are not sent.
+        
+        Raises:
+            RetrievalError: If the embedding request fails
+        """
+        cache = get_cache("embedding")
+        vectors = {text: cache.get([EMBEDDING_MODEL, text]) for text in dict.fromkeys(texts)} if cache else {}
+        missing = [text for text in dict.fromkeys(texts) if vectors.get(text) is None]
+        if not missing:
+            return [vectors[text] for text in texts]
+        try:
+            with span("embed", stage="embedding"):
+                response = call_with_resilience(
+                    "openai",
+                    lambda timeout: self.openai_client.embeddings.create(
+                        model="text-embedding-3-small",
+                        input=missing,
+                        timeout=timeout
+                    ),
+                    call_timeout=settings.embedding_timeout_seconds,
+                    rate=("text-embedding-3-small", estimate_text_tokens(missing))
+                )
+            record_usage("retrieval", "text-embedding-3-small", response.usage, kind="embedding")
+            # The API may return items out of order; index restores input order
+            embedded = [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+        except Exception as e:
+            print(f"Error generating embeddings: {str(e)}")
+            raise RetrievalError(f"Embedding failed: {str(e)}") from e
+        for text, vector in zip(missing, embedded):
+            vectors[text] = vector
+            if cache:
+                cache.set([EMBEDDING_MODEL, text], vector)
+        return [vectors[text] for text in texts]
 
@@ -1,11 +1,37 @@
 """RAG Engine: Handles retrieval and LLM generation."""
-from typing import Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, List, Sequence, Tuple, Union
 from openai import OpenAI
+from pydantic import BaseModel, ValidationError
 from app.core.config import settings
-from app.services.qdrant import QdrantService
-from app.utils.persona import MASTER_SYSTEM_PROMPT
+from app.services.cache import get_cache
+from app.services.qdrant import QdrantService, RetrievalError
+from app.services.rate_governor import estimate_chat_tokens
+from app.services.resilience import ResilienceError, call_with_resilience
+from app.services.hedging import HedgingPolicy
+from app.services.metrics import CRITICAL_PATH, EMPTY_RETRIEVALS, JSON_PARSE_FALLBACKS, MODEL_UPGRADES, SECTION_ERRORS
+from app.services.routing import ModelRouter, Route, route_stats
+from app.services.scheduler import DAGScheduler, Node
+from app.services.templates import TemplateSource
+from app.services.tracing import current_trace, span
+from app.services.usage import record_usage
+from app.core.orchestrator import DERIVED_SECTIONS, plan_id_of
+from app.utils.persona import MASTER_SYSTEM_PROMPT, PERSONALIZATION_PROMPT
+from app.utils.schemas import (
+    SECTION_MODELS,
+    field_from_wire,
+    is_list_field,
+    item_from_wire,
+    from_wire,
+    multi_section_response_format,
+    parse_section,
+    response_format_for,
+    section_example,
+    to_wire,
+)
+from app.utils.streaming_json import StreamingJSONParser, parse_partial
 import json
 import re
+import time
 
 
 class RAGEngine:
@@ -13,9 +39,24 @@ class RAGEngine:
     
     def __init__(self):
         """Initialize RAG engine with OpenAI and Qdrant."""
-        self.openai_client = OpenAI(api_key=settings.openai_api_key)
+        # Retries are handled by the resilience layer, not the SDK
+        self.openai_client = OpenAI(
+            api_key=settings.openai_api_key,
+            max_retries=0,
+            timeout=settings.openai_timeout_seconds
+        )
         self.qdrant_service = QdrantService()
-        self.model = "gpt-4o"  # Preferred model for complex synthesis
+        self.model = settings.synthesis_model  # Preferred model for complex synthesis
+        # Which model writes each section (per section and plan path)
+        self.router = ModelRouter.from_settings()
+        # Optional tail-latency hedging for completions
+        self.hedging = HedgingPolicy(
+            percentile=settings.llm_hedge_percentile,
+            max_per_minute=settings.llm_hedge_max_per_minute,
+            min_samples=settings.llm_hedge_min_samples
+        ) if settings.llm_hedging_enabled else None
+        # Pre-generated sections per plan path ("template" generation mode)
+        self.templates = TemplateSource(self.qdrant_service.collection_name)
     
     def _build_task_constraints(self, task_name: Optional[str], section_name: str, search_query: str) -> str:
         """
@@ -118,13 +159,42 @@ class RAGEngine:
         # Remove any leading/trailing whitespace
         return text.strip()
     
+    def _user_context_block(self, user_context: Optional[Dict[str, Any]]) -> str:
+        """The USER CONTEXT block appended to the retrieved context ("" without user context)."""
+        if not user_context:
+            return ""
+        user_context_str = f"\n\nUSER CONTEXT:\n"
+        user_context_str += f"Company: {user_context.get('company_name', 'N/A')}\n"
+        user_context_str += f"Industry: {user_context.get('industry', 'N/A')}\n"
+        user_context_str += f"Entry Goals: {', '.join(user_context.get('entry_goals', []))}\n"
+        return user_context_str
+    
+    def _insufficient_evidence_section(self, section_name: str, search_query: str) -> Dict[str, Any]:
+        """
+        Build the placeholder returned when retrieval finds no evidence.
+        
+        map_sections_to_response leaves the section null and reports it in
+        metadata.insufficient_evidence (with this query and message).
+        """
+        return {
+            "content": f"Insufficient evidence in the knowledge base to write the {section_name.replace('_', ' ')} section.",
+            "insufficient_evidence": True,
+            "search_query": search_query
+        }
+    
     def generate_section(
         self,
         section_name: str,
         search_query: str,
         user_context: Optional[Dict[str, Any]] = None,
-        task_name: Optional[str] = None
-    ) -> Optional[Dict[str, Any]]:
+        task_name: Optional[str] = None,
+        search_results: Optional[List[Dict[str, Any]]] = None,
+        trace_label: Optional[str] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+        plan_id: Optional[str] = None,
+        model: Optional[str] = None,
+        context: Optional[str] = None
+    ) -> Optional[Union[BaseModel, Dict[str, Any]]]:
         """
         Generate a memo section using RAG.
         
@@ -132,24 +202,46 @@ class RAGEngine:
             section_name: Name of the section to generate
             search_query: Query to search the knowledge base
             user_context: Additional user context from request
+            task_name: Name of the planned task (drives task constraints)
+            search_results: Pre-fetched results (e.g. from search_batch); when
+                omitted, the section runs its own search
+            trace_label: Span prefix in the request trace (default: section name)
+            on_event: Streaming mode: the completion is streamed and every top-level
+                field / list item is passed to this callback as soon as it is complete
+                (a "section_reset" event precedes the retry on the upgrade model)
+            plan_id: Plan the section belongs to (selects plan-path routes)
+            model: Write the section with this model, bypassing routing and upgrades
+            context: Write the section from this text (derived sections: the
+                finished sections) instead of retrieving context
         
         Returns:
-            Generated section as dictionary, or None if generation fails
+            The section model (structured outputs), a raw dictionary (legacy
+            parsing fallback), an "insufficient evidence" section if the
+            evidence gate trips, or None if retrieval or generation fails
         """
         try:
-            # Step 1: Retrieve relevant context from Qdrant
-            print(f"  Searching Qdrant with query: {search_query}")
-            search_results = self.qdrant_service.search(query=search_query)
-            print(f"  Found {len(search_results)} search results")
-            context = self.qdrant_service.format_context(search_results)
+            context_heading = "CONTEXT FROM KNOWLEDGE BASE"
+            if context is not None:
+                print(f"  Writing {section_name} from the finished sections ({len(context)} chars)")
+                context_heading = "FINISHED MEMO SECTIONS (derive this section from them)"
+            else:
+                # Step 1: Retrieve relevant context from Qdrant (unless pre-fetched)
+                if search_results is None:
+                    print(f"  Searching Qdrant with query: {search_query}")
+                    search_results = self.qdrant_service.search(query=search_query)
+                print(f"  Found {len(search_results)} search results")
+                if not search_results:
+                    EMPTY_RETRIEVALS.labels(section=section_name).inc()
+                
+                # Evidence gate: nothing cleared the score threshold, so don't pay for a completion
+                if not search_results and settings.evidence_gate_enabled:
+                    print(f"  No evidence above threshold - skipping LLM call for {section_name}")
+                    return self._insufficient_evidence_section(section_name, search_query)
+                
+                context = self.qdrant_service.format_context(search_results)
             
             # Step 2: Build user context string if provided
-            user_context_str = ""
-            if user_context:
-                user_context_str = f"\n\nUSER CONTEXT:\n"
-                user_context_str += f"Company: {user_context.get('company_name', 'N/A')}\n"
-                user_context_str += f"Industry: {user_context.get('industry', 'N/A')}\n"
-                user_context_str += f"Entry Goals: {', '.join(user_context.get('entry_goals', []))}\n"
+            user_context_str = self._user_context_block(user_context)
             
             # Step 3: Generate prompt using MASTER_SYSTEM_PROMPT
             full_context = context + user_context_str
@@ -179,8 +271,13 @@ class RAGEngine:
                 }
             }
             
-            schema_example = schema_examples.get(section_name, {})
+            schema_example = schema_examples.get(section_name) or section_example(section_name)
+            # Structured outputs: the completion is constrained to the section model's schema
+            structured = settings.structured_outputs_enabled and section_name in SECTION_MODELS
+            if structured:
+                schema_example = to_wire(SECTION_MODELS[section_name], schema_example)
             schema_json = json.dumps(schema_example, indent=2) if schema_example else "{}"
+            response_format = response_format_for(section_name) if structured else None
             
             # Build task-specific constraints
             task_constraints = self._build_task_constraints(task_name, section_name, search_query)
@@ -191,7 +288,7 @@ TASK: Generate the "{section_name}" section of a Market Entry Memo for the Nethe
 
 {task_constraints}
 
-CONTEXT FROM KNOWLEDGE BASE:
+{context_heading}:
 {full_context}
 
 EXPECTED JSON STRUCTURE:
@@ -211,74 +308,706 @@ INSTRUCTIONS:
 Return your response as pure JSON only.
 """
             
-            # Step 4: Call OpenAI
-            print(f"  Calling OpenAI API with model: {self.model}")
-            response = self.openai_client.chat.completions.create(
-                model=self.model,
-                messages=[
+            # Step 4: Call OpenAI on the routed model; retry once on the synthesis
+            # model when a smaller model's output does not validate
+            if model is not None:
+                route = Route(section_name, model, None, "override")
+            else:
+                route = self.router.route(section_name, plan_id)
+            models = [route.model] + ([route.upgrade_model] if route.upgrade_model else [])
+            request_kwargs = {
+                "messages": [
                     {"role": "system", "content": prompt},
                     {"role": "user", "content": f"Generate the {section_name} section now."}
                 ],
-                temperature=0.7,
-                max_tokens=2000
-            )
-            
-            # Step 5: Parse response
-            content = response.choices[0].message.content
-            print(f"  Received response from OpenAI (length: {len(content)} chars)")
-            
-            # CRITICAL FIX: Clean JSON response before parsing
-            cleaned_content = self.clean_json_response(content)
+                "temperature": 0.7,
+                "max_tokens": 2000,
+            }
+            if response_format:
+                request_kwargs["response_format"] = response_format
             
-            # Try to parse as JSON, fallback to text
-            try:
-                parsed = json.loads(cleaned_content)
-                print(f"  Successfully parsed JSON response")
-                return parsed
-            except json.JSONDecodeError as e:
-                print(f"  WARNING: Could not parse as JSON: {str(e)}")
-                print(f"  Response preview: {cleaned_content[:200]}...")
-                # If not JSON, return as text content
-                return {"content": cleaned_content}
+            for attempt, model_name in enumerate(models):
+                final = attempt == len(models) - 1
+                print(f"  Calling OpenAI API with model: {model_name} (route: {route.rule})")
+                label = (trace_label or section_name) + (".upgrade" if attempt else "")
+                started = time.perf_counter()
+                attempt_kwargs = dict(request_kwargs, model=model_name)
+                with span(f"{label}.llm", stage="llm_completion", desc=f"{section_name}:{model_name}"):
+                    content, refusal, cost = self._complete(section_name, attempt_kwargs, structured, on_event)
+                seconds = time.perf_counter() - started
+                
+                # Step 5: Parse response
+                print(f"  Received response from OpenAI (length: {len(content)} chars)")
+                
+                with span(f"{label}.parse", stage="json_parse", desc=section_name):
+                    if structured:
+                        try:
+                            if refusal:
+                                raise ValueError(f"model refused: {refusal}")
+                            parsed_section = parse_section(section_name, json.loads(content))
+                            print(f"  Parsed structured output into {type(parsed_section).__name__}")
+                            route_stats.record(section_name, model_name, seconds, cost, valid=True)
+                            self._cache_completion(attempt_kwargs, content)
+                            return parsed_section
+                        except (ValueError, ValidationError) as e:
+                            # Truncated output (max_tokens) or refusal
+                            print(f"  WARNING: Structured output did not validate: {str(e)[:200]}")
+                            route_stats.record(section_name, model_name, seconds, cost, valid=False, upgraded=not final)
+                            if not final:
+                                self._upgrade(section_name, model_name, models[attempt + 1], on_event)
+                                continue
+                            # Last model: fall back to lenient parsing
+                            JSON_PARSE_FALLBACKS.labels(section=section_name).inc()
+                    
+                    # CRITICAL FIX: Clean JSON response before parsing
+                    cleaned_content = self.clean_json_response(content)
+                    
+                    # Try to parse as JSON, fallback to text
+                    try:
+                        parsed = json.loads(cleaned_content)
+                        print(f"  Successfully parsed JSON response")
+                        if not structured:
+                            route_stats.record(section_name, model_name, seconds, cost, valid=True)
+                            self._cache_completion(attempt_kwargs, content)
+                        return parsed
+                    except json.JSONDecodeError as e:
+                        print(f"  WARNING: Could not parse as JSON: {str(e)}")
+                        if not structured:
+                            route_stats.record(section_name, model_name, seconds, cost, valid=False, upgraded=not final)
+                            if not final:
+                                self._upgrade(section_name, model_name, models[attempt + 1], on_event)
+                                continue
+                        print(f"  Response preview: {cleaned_content[:200]}...")
+                        JSON_PARSE_FALLBACKS.labels(section=section_name).inc()
+                        # Keep the fields completed before the malformed or truncated tail
+                        partial = parse_partial(cleaned_content)
+                        if partial:
+                            print(f"  Salvaged {len(partial)} complete fields from the valid prefix")
+                            if structured:
+                                try:
+                                    return parse_section(section_name, partial)
+                                except ValueError:
+                                    pass
+                            return partial
+                        # If not JSON, return as text content
+                        return {"content": cleaned_content}
+        
+        except RetrievalError as e:
+            # Fail fast: no completion without a working retrieval path
+            print(f"ERROR: Retrieval failed for {section_name}, skipping LLM call: {str(e)}")
+            SECTION_ERRORS.labels(section=section_name, reason="retrieval").inc()
+            return None
+        
+        except ResilienceError as e:
+            # Open circuit or exhausted deadline: give up on this section immediately
+            print(f"ERROR: OpenAI unavailable for {section_name}: {str(e)}")
+            SECTION_ERRORS.labels(section=section_name, reason="dependency").inc()
+            return None
         
         except Exception as e:
             import traceback
             print(f"ERROR: RAG generation error for {section_name}: {str(e)}")
             print(f"Traceback: {traceback.format_exc()}")
+            SECTION_ERRORS.labels(section=section_name, reason="exception").inc()
             return None
     
+    def _upgrade(
+        self,
+        section_name: str,
+        model_name: str,
+        upgrade_model: str,
+        on_event: Optional[Callable[[Dict[str, Any]], None]]
+    ) -> None:
+        """Record a section's retry on a larger model; streamed consumers discard what they received so far."""
+        print(f"  Upgrading {section_name} from {model_name} to {upgrade_model}")
+        MODEL_UPGRADES.labels(section=section_name, model=model_name).inc()
+        if on_event is not None:
+            on_event({"type": "section_reset", "section": section_name, "model": upgrade_model})
+    
+    def generate_sections_batch(
+        self,
+        task: Any,
+        user_context: Optional[Dict[str, Any]] = None,
+        search_results: Optional[List[Dict[str, Any]]] = None,
+        trace_label: Optional[str] = None,
+        plan_id: Optional[str] = None,
+        model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Generate a batch task's sections from one shared context in a single completion.
+        
+        The completion returns one JSON object keyed by section name. Sections
+        that do not validate are requested again, once, from the synthesis
+        model when the batch was routed to a smaller one; sections still
+        invalid after that keep their raw dictionary (lenient mapping) or are
+        left out.
+        
+        Args:
+            task: A TaskPlan with `sections` (its section_name names the batch)
+            user_context: Additional user context from request
+            search_results: Pre-fetched results; when omitted, the batch runs its own search
+            trace_label: Span prefix in the request trace (default: the batch name)
+            plan_id: Plan the batch belongs to (selects plan-path routes)
+            model: Write the batch with this model, bypassing routing and upgrades
+        
+        Returns:
+            Section name -> section model (or raw dictionary); empty if retrieval
+            or generation fails
+        """
+        batch_name = task.section_name
+        names = [name for name in task.sections if name in SECTION_MODELS]
+        sections: Dict[str, Any] = {}
+        try:
+            if search_results is None:
+                print(f"  Searching Qdrant with query: {task.search_query}")
+                search_results = self.qdrant_service.search(query=task.search_query)
+            print(f"  Found {len(search_results)} search results for {len(names)} sections")
+            if not search_results:
+                EMPTY_RETRIEVALS.labels(section=batch_name).inc()
+            if not search_results and settings.evidence_gate_enabled:
+                print(f"  No evidence above threshold - skipping LLM call for {batch_name}")
+                return {name: self._insufficient_evidence_section(name, task.search_query) for name in names}
+            
+            full_context = self.qdrant_service.format_context(search_results) + self._user_context_block(user_context)
+            task_constraints = self._build_task_constraints(task.task_name, batch_name, task.search_query)
+            structured = settings.structured_outputs_enabled
+            
+            def request_for(pending: List[str]) -> Dict[str, Any]:
+                example = {
+                    name: to_wire(SECTION_MODELS[name], section_example(name)) if structured else section_example(name)
+                    for name in pending
+                }
+                prompt = f"""{MASTER_SYSTEM_PROMPT}
+
+TASK: Generate the following sections of a Market Entry Memo for the Netherlands: {", ".join(pending)}.
+
+{task_constraints}
+
+CONTEXT FROM KNOWLEDGE BASE:
+{full_context}
+
+EXPECTED JSON STRUCTURE (one object per section, keyed by section name):
+{json.dumps(example, indent=2)}
+
+INSTRUCTIONS:
+1. Extract relevant information from the context above; the sections share it.
+2. Keep each section short, direct and actionable. Do not repeat content across sections.
+3. If information is missing, state that clearly rather than guessing.
+4. Return ONLY valid JSON with exactly these section keys, no text before or after it.
+
+Return your response as pure JSON only.
+"""
+                request_kwargs = {
+                    "messages": [
+                        {"role": "system", "content": prompt},
+                        {"role": "user", "content": f"Generate the {batch_name} section now."}
+                    ],
+                    "temperature": 0.7,
+                    "max_tokens": 4000,
+                }
+                if structured:
+                    request_kwargs["response_format"] = multi_section_response_format(pending, batch_name)
+                return request_kwargs
+            
+            if model is not None:
+                route = Route(batch_name, model, None, "override")
+            else:
+                route = self.router.route(batch_name, plan_id)
+            models = [route.model] + ([route.upgrade_model] if route.upgrade_model else [])
+            pending = list(names)
+            data: Dict[str, Any] = {}
+            for attempt, model_name in enumerate(models):
+                final = attempt == len(models) - 1
+                print(f"  Calling OpenAI API with model: {model_name} for {len(pending)} sections (route: {route.rule})")
+                label = (trace_label or batch_name) + (".upgrade" if attempt else "")
+                started = time.perf_counter()
+                attempt_kwargs = dict(request_for(pending), model=model_name)
+                with span(f"{label}.llm", stage="llm_completion", desc=f"{batch_name}:{model_name}"):
+                    content, refusal, cost = self._complete(batch_name, attempt_kwargs, structured, None)
+                seconds = time.perf_counter() - started
+                
+                with span(f"{label}.parse", stage="json_parse", desc=batch_name):
+                    try:
+                        if refusal:
+                            raise ValueError(f"model refused: {refusal}")
+                        data = json.loads(content if structured else self.clean_json_response(content))
+                        if not isinstance(data, dict):
+                            raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+                    except ValueError as e:
+                        print(f"  WARNING: Batch output did not parse: {str(e)[:200]}")
+                        data = parse_partial(self.clean_json_response(content)) or {}
+                    
+                    invalid = []
+                    for name in pending:
+                        try:
+                            if structured:
+                                sections[name] = parse_section(name, data.get(name))
+                            elif isinstance(data.get(name), dict):
+                                sections[name] = data[name]
+                            else:
+                                raise ValueError(f"missing section {name}")
+                        except ValueError as e:
+                            print(f"  WARNING: {name} did not validate: {str(e)[:200]}")
+                            invalid.append(name)
+                    route_stats.record(batch_name, model_name, seconds, cost, valid=not invalid, upgraded=bool(invalid) and not final)
+                
+                if not invalid:
+                    self._cache_completion(attempt_kwargs, content)
+                    break
+                if not final:
+                    print(f"  Upgrading {len(invalid)} {batch_name} sections from {model_name} to {models[attempt + 1]}")
+                    MODEL_UPGRADES.labels(section=batch_name, model=model_name).inc()
+                    pending = invalid
+                    continue
+                for name in invalid:
+                    JSON_PARSE_FALLBACKS.labels(section=name).inc()
+                    if isinstance(data.get(name), dict):
+                        # Lenient fallback: map_sections_to_response maps raw dictionaries
+                        sections[name] = from_wire(SECTION_MODELS[name], data[name]) if structured else data[name]
+            
+            print(f"  Generated {len(sections)}/{len(names)} sections of {batch_name}")
+            return sections
+        
+        except RetrievalError as e:
+            print(f"ERROR: Retrieval failed for {batch_name}, skipping LLM call: {str(e)}")
+            SECTION_ERRORS.labels(section=batch_name, reason="retrieval").inc()
+            return sections
+        
+        except ResilienceError as e:
+            print(f"ERROR: OpenAI unavailable for {batch_name}: {str(e)}")
+            SECTION_ERRORS.labels(section=batch_name, reason="dependency").inc()
+            return sections
+        
+        except Exception as e:
+            import traceback
+            print(f"ERROR: Batch generation error for {batch_name}: {str(e)}")
+            print(f"Traceback: {traceback.format_exc()}")
+            SECTION_ERRORS.labels(section=batch_name, reason="exception").inc()
+            return sections
+    
+    def _complete(
+        self,
+        section_name: str,
+        request_kwargs: Dict[str, Any],
+        structured: bool,
+        on_event: Optional[Callable[[Dict[str, Any]], None]]
+    ) -> Tuple[str, Optional[str], float]:
+        """
+        Run one section completion (hedged if enabled, streamed when `on_event` is set).
+        
+        With settings.completion_cache_enabled, an identical earlier request is
+        answered from the completion cache (streamed consumers receive its events
+        at once) at no cost. Only outputs that validated are cached: the callers
+        store them with _cache_completion once they have parsed them.
+        
+        Returns:
+            (content, refusal or None, cost in USD of every attempt)
+        """
+        cache = get_cache("completion")
+        if cache is not None:
+            cached = cache.get(request_kwargs)
+            if cached is not None:
+                content = cached["content"]
+                if on_event is not None:
+                    self._emit_stream_events(StreamingJSONParser(), section_name, content, structured, on_event)
+                return content, None, 0.0
+        
+        if on_event is not None:
+            # Streamed completions are not hedged: the consumer already sees partial output
+            return self._stream_completion(section_name, request_kwargs, structured, on_event)
+        return self._complete_hedged(section_name, request_kwargs)
+    
+    def _cache_completion(self, request_kwargs: Dict[str, Any], content: str) -> None:
+        """Store a completion whose output validated (no-op unless completion caching is enabled)."""
+        cache = get_cache("completion")
+        if cache is not None:
+            cache.set(request_kwargs, {"content": content})
+    
+    def _complete_hedged(self, section_name: str, request_kwargs: Dict[str, Any]) -> Tuple[str, Optional[str], float]:
+        """Run one completion, hedged if enabled: (content, refusal or None, cost in USD of every attempt)."""
+        costs: List[float] = []
+        
+        def complete():
+            completion = call_with_resilience(
+                "openai",
+                lambda timeout: self.openai_client.chat.completions.create(timeout=timeout, **request_kwargs),
+                call_timeout=settings.openai_timeout_seconds,
+                rate=(request_kwargs["model"], estimate_chat_tokens(request_kwargs))
+            )
+            # Recorded per attempt, so discarded hedge duplicates are still accounted for
+            entry = record_usage(section_name, request_kwargs["model"], completion.usage)
+            costs.append(entry["cost_usd"] if entry else 0.0)
+            return completion
+        
+        if self.hedging:
+            # Sections, batches and synthesis differ in model and answer length: each gets its own latency window
+            route = f"{request_kwargs['model']}:{request_kwargs.get('max_tokens')}"
+            response = self.hedging.run(complete, key=route)
+        else:
+            response = complete()
+        message = response.choices[0].message
+        return message.content or "", getattr(message, "refusal", None), sum(costs)
+    
+    def _stream_completion(
+        self,
+        section_name: str,
+        request_kwargs: Dict[str, Any],
+        structured: bool,
+        on_event: Callable[[Dict[str, Any]], None]
+    ) -> Tuple[str, Optional[str], float]:
+        """
+        Stream a completion, passing each completed field / list item to `on_event`.
+        
+        Returns:
+            (full content, refusal or None, cost in USD)
+        """
+        stream = call_with_resilience(
+            "openai",
+            lambda timeout: self.openai_client.chat.completions.create(
+                timeout=timeout,
+                stream=True,
+                stream_options={"include_usage": True},
+                **request_kwargs
+            ),
+            call_timeout=settings.openai_timeout_seconds,
+            rate=(request_kwargs["model"], estimate_chat_tokens(request_kwargs))
+        )
+        parser = StreamingJSONParser()
+        parts: List[str] = []
+        refusal_parts: List[str] = []
+        usage = None
+        for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            for choice in chunk.choices:
+                if getattr(choice.delta, "refusal", None):
+                    refusal_parts.append(choice.delta.refusal)
+                text = choice.delta.content
+                if not text:
+                    continue
+                parts.append(text)
+                self._emit_stream_events(parser, section_name, text, structured, on_event)
+        entry = record_usage(section_name, request_kwargs["model"], usage)
+        return "".join(parts), "".join(refusal_parts) or None, entry["cost_usd"] if entry else 0.0
+    
+    def _emit_stream_events(
+        self,
+        parser: StreamingJSONParser,
+        section_name: str,
+        text: str,
+        structured: bool,
+        on_event: Callable[[Dict[str, Any]], None]
+    ) -> None:
+        """
+        Feed a piece of streamed content to the parser and pass each completed field / list item on.
+        
+        Values are passed on in the section model's shape. Dict fields are
+        arrays of {"key", "value"} entries in structured output, so their
+        entries are not passed on as items; the field event carries the dict.
+        """
+        model = SECTION_MODELS.get(section_name) if structured else None
+        for kind, key, index, value in parser.feed(text):
+            if model is not None:
+                if kind == "field":
+                    value = field_from_wire(model, key, value)
+                elif is_list_field(model, key):
+                    value = item_from_wire(model, key, value)
+                else:
+                    continue
+            on_event({"type": kind, "section": section_name, "field": key, "index": index, "value": value})
+    
     def generate_memo_sections(
         self,
         tasks: list,
-        user_context: Optional[Dict[str, Any]] = None
+        user_context: Optional[Dict[str, Any]] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None
     ) -> Dict[str, Any]:
         """
         Generate all memo sections based on task plan.
         
+        The plan runs as a DAG (see app/services/scheduler.py): one batch
+        retrieval, then every retrieval-backed task concurrently (batch tasks
+        write all of their sections in one completion). Derived
+        sections (DERIVED_SECTIONS: executive summary, next steps) start as
+        soon as the other tasks have finished and are written from their
+        outputs, without retrieval of their own. The memo's critical path is
+        recorded in the request trace and the taxmemo_critical_path_seconds metric.
+        
         Args:
             tasks: List of TaskPlan objects
             user_context: User context from request
+            on_event: Streaming mode callback (see generate_section); also receives
+                a "section" event for every completed section
         
         Returns:
-            Dictionary mapping section names to generated content
+            Dictionary mapping section names to generated content (a later task
+            of the plan replaces an earlier one for the same section)
+        
+        Raises:
+            RetrievalError: If the batch retrieval failed (no section can be written)
         """
-        sections = {}
+        plan = plan_id_of(tasks)
+        if not settings.batched_sections_enabled:
+            tasks = [task for task in tasks if not task.sections]
+        indexes = list(range(1, len(tasks) + 1))
+        derived = [
+            index for index in indexes
+            if settings.derived_sections_enabled and tasks[index - 1].section_name in DERIVED_SECTIONS
+        ]
+        independent = [index for index in indexes if index not in derived]
+        if not independent:
+            # Nothing to derive from: every task retrieves its own context
+            derived, independent = [], indexes
+        searched = [tasks[index - 1] for index in independent]
+        # Derived sections wait for the single-section tasks only, so the batch of
+        # supporting sections never lengthens the critical path
+        sources = [index for index in independent if not tasks[index - 1].sections]
+        
+        def retrieve(inputs: Dict[str, Any]) -> List[List[Dict[str, Any]]]:
+            # Retrieve context for every retrieval-backed task in a single Qdrant round trip
+            print(f"Batch searching Qdrant for {len(searched)} tasks")
+            return self.qdrant_service.search_batch([task.search_query for task in searched])
         
-        for task in tasks:
-            section_name = task.section_name
-            search_query = task.search_query
-            task_name = task.task_name
+        def write(index: int) -> Callable[[Dict[str, Any]], Any]:
+            task = tasks[index - 1]
             
-            print(f"Generating section: {section_name} (Task: {task_name})")
-            generated = self.generate_section(
-                section_name=section_name,
-                search_query=search_query,
-                user_context=user_context,
-                task_name=task_name
-            )
+            def run(inputs: Dict[str, Any]) -> Any:
+                if "retrieval" not in inputs:
+                    # Fail fast: without retrieval no section can be generated
+                    SECTION_ERRORS.labels(section=task.section_name, reason="retrieval").inc()
+                    return None
+                if task.sections:
+                    print(f"Generating sections: {', '.join(task.sections)} (Task: {task.task_name})")
+                    return self.generate_sections_batch(
+                        task,
+                        user_context=user_context,
+                        search_results=inputs["retrieval"][independent.index(index)],
+                        trace_label=f"t{index}",
+                        plan_id=plan
+                    )
+                print(f"Generating section: {task.section_name} (Task: {task.task_name})")
+                return self.generate_section(
+                    section_name=task.section_name,
+                    search_query=task.search_query,
+                    user_context=user_context,
+                    task_name=task.task_name,
+                    search_results=inputs["retrieval"][independent.index(index)],
+                    trace_label=f"t{index}",
+                    on_event=on_event,
+                    plan_id=plan
+                )
+            return run
+        
+        def derive(index: int) -> Callable[[Dict[str, Any]], Any]:
+            task = tasks[index - 1]
             
-            if generated:
-                sections[section_name] = generated
+            def run(inputs: Dict[str, Any]) -> Any:
+                if "retrieval" not in inputs:
+                    SECTION_ERRORS.labels(section=task.section_name, reason="retrieval").inc()
+                    return None
+                outputs = [(tasks[i - 1], inputs.get(f"t{i}")) for i in sources]
+                context = self._derived_context(outputs)
+                print(f"Deriving section: {task.section_name} (Task: {task.task_name})")
+                return self.generate_section(
+                    section_name=task.section_name,
+                    search_query=task.search_query,
+                    user_context=user_context,
+                    task_name=task.task_name,
+                    trace_label=f"t{index}",
+                    on_event=on_event,
+                    plan_id=plan,
+                    # No usable section to derive from: fall back to the task's own retrieval
+                    context=context or None
+                )
+            return run
+        
+        nodes = [Node("retrieval", retrieve)]
+        nodes += [
+            Node(f"t{index}", write(index), ("retrieval",), label=f"t{index}:{tasks[index - 1].section_name}")
+            for index in independent
+        ]
+        nodes += [
+            Node(
+                f"t{index}",
+                derive(index),
+                ("retrieval",) + tuple(f"t{i}" for i in sources),
+                label=f"t{index}:{tasks[index - 1].section_name}"
+            )
+            for index in derived
+        ]
+        
+        # Streamed "section" events: only for the task that currently wins its section
+        latest: Dict[str, int] = {}
+        
+        def completed(node: Node, result: Any) -> None:
+            if node.key == "retrieval" or not result:
+                return
+            index = int(node.key[1:])
+            task = tasks[index - 1]
+            for section_name, value in (result.items() if task.sections else [(task.section_name, result)]):
+                if index > latest.get(section_name, 0):
+                    latest[section_name] = index
+                    on_event({"type": "section", "section": section_name, "value": value})
         
+        schedule = DAGScheduler(settings.section_concurrency).run(nodes, on_complete=completed if on_event else None)
+        for key, error in schedule.errors.items():
+            if key != "retrieval":
+                print(f"ERROR: Task {key} failed: {str(error)}")
+        
+        summary = schedule.summary()
+        print(
+            f"Schedule: wall {summary['wall_ms']}ms, critical path {summary['critical_path_ms']}ms "
+            f"({' > '.join(summary['critical_path'])}), sequential {summary['serial_ms']}ms"
+        )
+        CRITICAL_PATH.observe(summary["critical_path_ms"] / 1000)
+        trace = current_trace()
+        if trace is not None:
+            trace.attributes["schedule"] = summary
+        
+        if "retrieval" in schedule.errors:
+            error = schedule.errors["retrieval"]
+            print(f"ERROR: Batch retrieval failed, no section could be generated: {str(error)}")
+            if isinstance(error, RetrievalError):
+                raise error
+            raise RetrievalError(f"Batch retrieval failed: {str(error)}") from error
+        
+        sections = {}
+        for index in indexes:
+            generated = schedule.results.get(f"t{index}")
+            if generated and tasks[index - 1].sections:
+                sections.update(generated)
+            elif generated:
+                sections[tasks[index - 1].section_name] = generated
         return sections
+    
+    def _derived_context(self, outputs: Sequence[Tuple[Any, Any]]) -> str:
+        """
+        Render finished sections as the context of a derived section.
+        
+        Args:
+            outputs: (TaskPlan, generated section or None) per finished task
+        
+        Returns:
+            One labelled JSON block per usable section ("" if there is none);
+            failed and "insufficient evidence" sections are left out
+        """
+        blocks = []
+        for task, section in outputs:
+            if isinstance(section, BaseModel):
+                data = section.model_dump(exclude_none=True)
+            elif isinstance(section, dict) and not section.get("insufficient_evidence"):
+                data = section
+            else:
+                continue
+            blocks.append(f"[{task.section_name}: {task.task_name}]\n{json.dumps(data, ensure_ascii=False)}")
+        return "\n\n".join(blocks)
+    
+    def generate_memo_from_templates(
+        self,
+        tasks: Sequence[Any],
+        user_context: Optional[Dict[str, Any]] = None,
+        on_event: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Build the memo sections from the plan path's templates, personalized in one call.
+        
+        Args:
+            tasks: The plan returned by Orchestrator.plan_tasks
+            user_context: User context from request
+            on_event: Receives a "section" event for every section
+        
+        Returns:
+            Dictionary mapping section names to content, or None when there is
+            no current template for this plan (the caller generates in full)
+        """
+        templates = self.templates.current()
+        plan = plan_id_of(tasks)
+        sections = templates.sections_for(plan) if templates is not None and plan else None
+        if sections is None:
+            print(f"No path template for plan {plan}; generating in full")
+            return None
+        
+        print(f"Personalizing {len(sections)} template sections for plan {plan}")
+        sections = self.personalize_sections(sections, user_context)
+        if on_event:
+            for section_name, section in sections.items():
+                on_event({"type": "section", "section": section_name, "value": section})
+        return sections
+    
+    def personalize_sections(
+        self,
+        sections: Dict[str, Any],
+        user_context: Optional[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        Adapt template sections to the company in one structured completion.
+        
+        Only model-backed sections are sent (placeholders such as "insufficient
+        evidence" are kept as they are). Any section that does not come back
+        valid, and every section when the call fails, keeps its template text.
+        
+        Args:
+            sections: Section name -> template section
+            user_context: User context from request
+        
+        Returns:
+            Section name -> personalized (or template) section
+        """
+        names = [
+            name for name, section in sections.items()
+            if isinstance(section, BaseModel) and name in SECTION_MODELS
+        ]
+        if not names or not user_context:
+            return sections
+        
+        company = "\n".join(
+            f"{key.replace('_', ' ').capitalize()}: {', '.join(map(str, value)) if isinstance(value, list) else value}"
+            for key, value in user_context.items() if value not in (None, "", [])
+        )
+        template = {
+            name: to_wire(SECTION_MODELS[name], sections[name].model_dump())
+            for name in names
+        }
+        model = settings.personalization_model
+        request_kwargs = {
+            "model": model,
+            "messages": [
+                {"role": "system", "content": PERSONALIZATION_PROMPT},
+                {"role": "user", "content": f"COMPANY:\n{company}\n\nSECTIONS:\n{json.dumps(template, ensure_ascii=False)}"}
+            ],
+            "temperature": 0.3,
+            "max_tokens": 4000,
+            "response_format": multi_section_response_format(names, "personalized_sections"),
+        }
+        
+        try:
+            with span("personalize.llm", stage="llm_completion", desc="personalization"):
+                completion = call_with_resilience(
+                    "openai",
+                    lambda timeout: self.openai_client.chat.completions.create(timeout=timeout, **request_kwargs),
+                    call_timeout=settings.openai_timeout_seconds,
+                    rate=(model, estimate_chat_tokens(request_kwargs))
+                )
+            record_usage("personalization", model, completion.usage)
+            message = completion.choices[0].message
+            if getattr(message, "refusal", None):
+                raise ValueError(f"model refused: {message.refusal}")
+            data = json.loads(message.content or "")
+            if not isinstance(data, dict):
+                raise ValueError(f"expected a JSON object, got {type(data).__name__}")
+        except Exception as e:
+            # The templates are complete sections; serve them unpersonalized
+            print(f"WARNING: Personalization failed, using templates as is: {str(e)[:200]}")
+            reason = "dependency" if isinstance(e, ResilienceError) else "exception"
+            SECTION_ERRORS.labels(section="personalization", reason=reason).inc()
+            return sections
+        
+        personalized = dict(sections)
+        for name in names:
+            try:
+                personalized[name] = parse_section(name, data.get(name))
+            except ValueError as e:
+                print(f"  WARNING: Personalized {name} did not validate, using template: {str(e)[:200]}")
+                JSON_PARSE_FALLBACKS.labels(section=name).inc()
+        return personalized
 
@@ -0,0 +1,177 @@
+"""Host-wide OpenAI rate governor.
+
+OpenAI enforces requests-per-minute (RPM) and tokens-per-minute (TPM) limits
+per model and organization. Each uvicorn worker calling OpenAI on its own
+overshoots them together and gets 429 storms. The governor keeps two token
+buckets per model (requests and tokens) in a SQLite database that every
+worker on the host shares (WAL mode, one short IMMEDIATE transaction per
+call).
+
+Buckets may go negative: a call reserves its cost at once and then sleeps
+until the bucket has refilled to zero again. The reservations form a FIFO
+queue across all workers that drains at exactly the configured rate. A call
+whose wait would pass the request deadline reserves nothing and fails fast
+with DeadlineExceededError.
+
+Token costs are estimated before the call: characters / 4 for the input,
+plus max_tokens for completions, which is also how OpenAI's own limiter
+counts a request. Models without configured limits (settings.openai_rate_limits)
+are not governed.
+"""
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.pricing import base_model
+
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_GOVERNOR_PATH = os.path.join(BACKEND_DIR, "data", "rate_governor.sqlite")
+
+# Characters per token of the estimate (OpenAI's rule of thumb for English text)
+CHARS_PER_TOKEN = 4
+
+
+def estimate_text_tokens(texts: Iterable[str]) -> int:
+    """Rough token count of some input texts."""
+    return max(1, sum(len(text) for text in texts) // CHARS_PER_TOKEN)
+
+
+def estimate_chat_tokens(request_kwargs: Dict[str, Any]) -> int:
+    """Tokens a chat completion request counts against TPM: its messages plus max_tokens."""
+    contents = [str(message.get("content") or "") for message in request_kwargs.get("messages", [])]
+    return estimate_text_tokens(contents) + int(request_kwargs.get("max_tokens") or 0)
+
+
+class RateGovernor:
+    """RPM/TPM token buckets per model, shared by every process using the same database file."""
+
+    def __init__(self, path: str, limits: Dict[str, Dict[str, int]]):
+        """
+        Args:
+            path: SQLite database file (created if missing)
+            limits: Model -> {"rpm": ..., "tpm": ...}; either may be omitted
+        """
+        self.path = path
+        self.limits = limits
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        connection = self._connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, level REAL NOT NULL, updated REAL NOT NULL)"
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit; transactions are opened explicitly with BEGIN IMMEDIATE
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            self._local.connection = connection
+        return connection
+
+    def limits_for(self, model: str) -> Tuple[str, Optional[Dict[str, int]]]:
+        """
+        (limited model, its limits) of a model name.
+
+        Only exact names match, plus dated snapshots of a configured model
+        ("gpt-4o-2024-08-06" counts against "gpt-4o", which OpenAI limits
+        together); "gpt-4o-mini" does not match "gpt-4o".
+        """
+        base = base_model(model, self.limits)
+        if base is None:
+            return model, None
+        return base, self.limits[base]
+
+    def _buckets(self, model: str, tokens: int) -> Dict[str, Tuple[float, float]]:
+        """Bucket name -> (capacity, cost) for one call (buckets are shared by a model's snapshots)."""
+        base, limits = self.limits_for(model)
+        limits = limits or {}
+        buckets = {}
+        if limits.get("rpm"):
+            buckets[f"{base}:requests"] = (float(limits["rpm"]), 1.0)
+        if limits.get("tpm"):
+            # A call larger than the whole bucket would never fit; charge a full minute instead
+            buckets[f"{base}:tokens"] = (float(limits["tpm"]), float(min(tokens, limits["tpm"])))
+        return buckets
+
+    def reserve(self, model: str, tokens: int, max_wait: Optional[float] = None) -> Optional[float]:
+        """
+        Reserve one request and `tokens` tokens of the model's budget.
+
+        Args:
+            model: Model the call goes to
+            tokens: Estimated tokens of the call
+            max_wait: Longest acceptable wait in seconds (None: unbounded)
+
+        Returns:
+            Seconds to wait before sending the call (0 if it may go now), or
+            None if the wait would exceed max_wait (nothing was reserved)
+        """
+        buckets = self._buckets(model, tokens)
+        if not buckets:
+            return 0.0
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            levels = {}
+            wait = 0.0
+            for name, (capacity, cost) in buckets.items():
+                row = connection.execute("SELECT level, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+                level = capacity if row is None else min(capacity, row[0] + max(0.0, now - row[1]) * capacity / 60)
+                levels[name] = level - cost
+                # Time until the bucket is back at zero after this reservation
+                wait = max(wait, -levels[name] * 60 / capacity)
+            if max_wait is not None and wait > max_wait:
+                connection.execute("ROLLBACK")
+                return None
+            connection.executemany(
+                "INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+                [(name, level, now) for name, level in levels.items()]
+            )
+            connection.execute("COMMIT")
+            return wait
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+
+    def throttle(self, model: str) -> None:
+        """Empty the model's request bucket after a 429, so every worker backs off together."""
+        buckets = self._buckets(model, 0)
+        name = next((name for name in buckets if name.endswith(":requests")), None)
+        if name is None:
+            return
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            row = connection.execute("SELECT level, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+            level = 0.0 if row is None else min(0.0, row[0] + max(0.0, now - row[1]) * buckets[name][0] / 60)
+            connection.execute(
+                "INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)", (name, level, now)
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+
+
+_governor: Optional[RateGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_rate_governor() -> Optional[RateGovernor]:
+    """The process-wide governor (None when no rate limits are configured)."""
+    global _governor
+    if not settings.openai_rate_limits:
+        return None
+    with _governor_lock:
+        if _governor is None:
+            _governor = RateGovernor(settings.rate_governor_path or DEFAULT_GOVERNOR_PATH, settings.openai_rate_limits)
+        return _governor
@@ -0,0 +1,272 @@
+"""Resilience layer for calls to OpenAI and Qdrant.
+
+Provides:
+- jittered exponential retry for transient errors (429, 5xx, timeouts, connection errors),
+- one circuit breaker per dependency, so a dead dependency fails fast,
+- per-call timeouts derived from the request deadline,
+- waiting for the host-wide OpenAI rate governor (app/services/rate_governor.py)
+  before each attempt that carries a `rate` estimate.
+
+Usage:
+    with request_deadline(settings.request_deadline_seconds):
+        ...
+        call_with_resilience("openai", lambda timeout: client.chat.completions.create(..., timeout=timeout),
+                             call_timeout=settings.openai_timeout_seconds)
+"""
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+import httpx
+import openai
+
+from app.core.config import settings
+from app.services.metrics import RATE_LIMIT_WAIT
+from app.services.rate_governor import get_rate_governor
+from app.services.tracing import span
+
+
+T = TypeVar("T")
+
+
+class ResilienceError(Exception):
+    """Base class for errors raised by the resilience layer itself."""
+
+
+class DependencyUnavailableError(ResilienceError):
+    """Raised without calling the dependency while its circuit breaker is open."""
+
+
+class DeadlineExceededError(ResilienceError):
+    """Raised when the request deadline leaves no time for another call."""
+
+
+class Deadline:
+    """Absolute point in time by which the current request must finish."""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left before the deadline (negative once expired)."""
+        return self.expires_at - time.monotonic()
+
+
+_current_deadline: ContextVar[Optional[Deadline]] = ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: float):
+    """Set the deadline for all dependency calls made within the block."""
+    token = _current_deadline.set(Deadline(seconds))
+    try:
+        yield
+    finally:
+        _current_deadline.reset(token)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Return the active request deadline, if any."""
+    return _current_deadline.get()
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half-open after `reset_timeout` seconds, letting one trial call through;
+    half-open -> closed on success, back to open on failure, back to open without
+    a failure (release) when the trial never reached the dependency.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_thread: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a call may be attempted now."""
+        with self._lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+                self._trial_thread = threading.get_ident()
+                return True
+            # Open, or half-open with the trial call still in flight
+            return False
+
+    def release(self) -> None:
+        """Give back this thread's half-open trial if it was not attempted, so the next caller gets it."""
+        with self._lock:
+            if self.state == "half_open" and self._trial_thread == threading.get_ident():
+                # opened_at is unchanged, so the next allow() is the trial again
+                self.state = "open"
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(dependency: str) -> CircuitBreaker:
+    """Return the process-wide circuit breaker for a dependency."""
+    with _breakers_lock:
+        if dependency not in _breakers:
+            _breakers[dependency] = CircuitBreaker(
+                dependency,
+                failure_threshold=settings.circuit_failure_threshold,
+                reset_timeout=settings.circuit_reset_seconds
+            )
+        return _breakers[dependency]
+
+
+def is_retryable(error: Exception) -> bool:
+    """Transient errors worth retrying: rate limits, 5xx, timeouts and connection failures."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError, TimeoutError, ConnectionError)):
+        return True
+    # qdrant-client wraps HTTP errors; avoid importing its internals
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int):
+        return status_code == 429 or status_code >= 500
+    return type(error).__name__ == "ResponseHandlingException"
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given (0-based) retry attempt."""
+    cap = min(settings.retry_max_delay, settings.retry_base_delay * (2 ** attempt))
+    return random.uniform(0, cap)
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """True for a 429 from the dependency."""
+    return isinstance(error, openai.RateLimitError) or getattr(error, "status_code", None) == 429
+
+
+def wait_for_rate(model: str, tokens: int, deadline: Optional[Deadline], call_timeout: float) -> None:
+    """
+    Queue for the model's share of the host-wide rate limits (no-op when not governed).
+
+    The wait is capped so the call itself still gets min(call_timeout,
+    settings.rate_governor_min_call_seconds) before the deadline; a longer
+    queue fails fast without reserving any budget.
+
+    Raises:
+        DeadlineExceededError: If the queue is longer than the time left before the deadline
+    """
+    governor = get_rate_governor()
+    if governor is None:
+        return
+    if deadline is not None:
+        call_time = min(call_timeout, settings.rate_governor_min_call_seconds)
+        max_wait = max(0.0, deadline.remaining() - call_time)
+    else:
+        max_wait = settings.rate_governor_max_wait_seconds
+    wait = governor.reserve(model, tokens, max_wait=max_wait)
+    if wait is None:
+        raise DeadlineExceededError(f"{model} rate limit queue is longer than the time left ({max_wait:.1f}s)")
+    if wait > 0:
+        RATE_LIMIT_WAIT.labels(model=model).observe(wait)
+        with span("rate_wait", desc=model):
+            time.sleep(wait)
+
+
+def call_with_resilience(
+    dependency: str,
+    call: Callable[[float], T],
+    call_timeout: float,
+    rate: Optional[Tuple[str, int]] = None
+) -> T:
+    """
+    Run a dependency call with retries, a circuit breaker and a deadline-bound timeout.
+
+    Args:
+        dependency: Breaker name ("openai" or "qdrant")
+        call: Function performing the request; receives the timeout (seconds) to use
+        call_timeout: Upper bound for a single attempt
+        rate: (model, estimated tokens) of an OpenAI call; every attempt first
+            queues for that much of the shared rate governor's budget
+
+    Returns:
+        The call's result
+
+    Raises:
+        DependencyUnavailableError: If the dependency's circuit is open
+        DeadlineExceededError: If the request deadline has passed
+        Exception: The last error once retries are exhausted, or any non-retryable error
+    """
+    breaker = get_breaker(dependency)
+    deadline = current_deadline()
+    attempts = max(1, settings.retry_max_attempts)
+
+    for attempt in range(attempts):
+        if deadline is not None and deadline.remaining() <= 0:
+            raise DeadlineExceededError(f"Request deadline exceeded before {dependency} call")
+
+        if not breaker.allow():
+            raise DependencyUnavailableError(f"{dependency} circuit breaker is open")
+
+        try:
+            if rate is not None:
+                wait_for_rate(rate[0], rate[1], deadline, call_timeout)
+
+            timeout = call_timeout
+            if deadline is not None:
+                timeout = min(timeout, deadline.remaining())
+                if timeout <= 0:
+                    raise DeadlineExceededError(f"Request deadline exceeded before {dependency} call")
+        except BaseException:
+            # The dependency was never called: a half-open trial must not stay taken
+            breaker.release()
+            raise
+
+        try:
+            result = call(timeout)
+        except Exception as e:
+            if rate is not None and is_rate_limited(e):
+                # The provider disagrees with our budget: make every worker back off
+                governor = get_rate_governor()
+                if governor is not None:
+                    governor.throttle(rate[0])
+            if not is_retryable(e):
+                # Client errors (bad request, auth) say nothing about dependency health
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == attempts - 1:
+                raise
+            delay = backoff_delay(attempt)
+            if deadline is not None and delay >= deadline.remaining():
+                raise
+            print(f"  {dependency} call failed ({type(e).__name__}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+            continue
+
+        breaker.record_success()
+        return result
+
+    raise DeadlineExceededError(f"No attempts left for {dependency} call")
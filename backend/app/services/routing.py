@@ -0,0 +1,186 @@
+"""Model routing: which model writes each memo section.
+
+Sections differ in how much synthesis they need. List-heavy, mechanical
+sections (timelines, next steps, budgets) come out just as well from a
+small, fast model, while the executive summary and the structure/tax
+analysis need the large one. A route maps a section, optionally on one plan
+path, to a model tier ("fast", "synthesis") or a concrete model name.
+
+Rules are looked up most specific first:
+    "<plan_id>:<section>"   e.g. "bv+tech:tax_considerations"
+    "<path>:<section>"      e.g. "holding:implementation_timeline"
+    "<section>"
+    "*"
+and fall back to the synthesis model. settings.model_routes overrides
+individual entries of DEFAULT_ROUTES.
+
+A section routed below the synthesis model whose structured output does not
+validate is retried once on the synthesis model (see RAGEngine.generate_section).
+Every routed call is recorded in `route_stats`, served by /admin/routes.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, Mapping, Optional
+
+from app.core.config import settings
+
+
+DEFAULT_ROUTES: Dict[str, str] = {
+    # Synthesis: judgement across the whole context
+    "executive_summary": "synthesis",
+    "market_entry_options": "synthesis",
+    "business_structure": "synthesis",
+    "tax_considerations": "synthesis",
+    "legal_deep_dive": "synthesis",
+    "risk_assessment": "synthesis",
+    # Structured / list-heavy: mostly extraction into a fixed shape
+    "implementation_timeline": "fast",
+    "next_steps": "fast",
+    "resource_budget": "fast",
+    "business_profile": "fast",
+    "jurisdictions_treaties": "fast",
+    "legal_topics_overview": "fast",
+    "appendix": "fast",
+    # Batch of the supporting sections above (orchestrator.SUPPORTING_TASK)
+    "supporting_sections": "fast",
+    # The holding path's "timeline" task is its compliance and substance analysis
+    "holding:implementation_timeline": "synthesis",
+}
+
+# Latencies kept per route for the percentiles in the report
+ROUTE_SAMPLE_SIZE = 500
+
+
+@dataclass(frozen=True)
+class Route:
+    """The model chosen for one section, and where to go when its output does not validate."""
+    section: str
+    model: str
+    upgrade_model: Optional[str]
+    rule: str
+
+
+class ModelRouter:
+    """Resolves section (and plan path) routes to models."""
+
+    def __init__(
+        self,
+        routes: Optional[Mapping[str, str]] = None,
+        tiers: Optional[Mapping[str, str]] = None,
+        enabled: bool = True
+    ):
+        self.tiers = dict(tiers or {"fast": settings.fast_model, "synthesis": settings.synthesis_model})
+        self.synthesis_model = self.tiers["synthesis"]
+        self.routes = dict(DEFAULT_ROUTES)
+        self.routes.update(routes or {})
+        self.enabled = enabled
+        self._cache: Dict[tuple, Route] = {}
+
+    @classmethod
+    def from_settings(cls) -> "ModelRouter":
+        return cls(routes=settings.model_routes, enabled=settings.model_routing_enabled)
+
+    def _model(self, target: str) -> str:
+        return self.tiers.get(target, target)
+
+    def route(self, section_name: str, plan_id: Optional[str] = None) -> Route:
+        """The route of a section on a plan (plan_id as returned by plan_id_of; None if unknown)."""
+        key = (section_name, plan_id)
+        route = self._cache.get(key)
+        if route is not None:
+            return route
+
+        if not self.enabled:
+            route = Route(section_name, self.synthesis_model, None, "disabled")
+        else:
+            candidates = []
+            if plan_id:
+                candidates.append(f"{plan_id}:{section_name}")
+                candidates.append(f"{plan_id.split('+')[0]}:{section_name}")
+            candidates += [section_name, "*"]
+            rule = next((candidate for candidate in candidates if candidate in self.routes), None)
+            model = self._model(self.routes[rule]) if rule else self.synthesis_model
+            upgrade = self.synthesis_model if model != self.synthesis_model else None
+            route = Route(section_name, model, upgrade, rule or "default")
+        self._cache[key] = route
+        return route
+
+    def describe(self) -> Dict[str, Any]:
+        """The effective policy, for the route report."""
+        return {
+            "enabled": self.enabled,
+            "tiers": dict(self.tiers),
+            "routes": {rule: self._model(target) for rule, target in sorted(self.routes.items())},
+        }
+
+
+class _RouteTotals:
+    def __init__(self):
+        self.calls = 0
+        self.invalid = 0
+        self.upgraded = 0
+        self.cost_usd = 0.0
+        self.latencies: Deque[float] = deque(maxlen=ROUTE_SAMPLE_SIZE)
+
+
+def _percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class RouteStats:
+    """Process-wide latency, cost and validation outcomes per (section, model)."""
+
+    def __init__(self):
+        self._totals: Dict[tuple, _RouteTotals] = defaultdict(_RouteTotals)
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+
+    def record(self, section: str, model: str, seconds: float, cost_usd: float, valid: bool, upgraded: bool = False) -> None:
+        """
+        Record one completion.
+
+        Args:
+            valid: The output validated against the section model
+            upgraded: The output did not validate and the section was retried on a larger model
+        """
+        with self._lock:
+            totals = self._totals[(section, model)]
+            totals.calls += 1
+            totals.invalid += 0 if valid else 1
+            totals.upgraded += 1 if upgraded else 0
+            totals.cost_usd += cost_usd
+            totals.latencies.append(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._totals.clear()
+            self.started_at = time.time()
+
+    def report(self) -> Dict[str, Any]:
+        """Per section, the calls, latency, cost and validation failures of every model that served it."""
+        with self._lock:
+            snapshot = {
+                key: (t.calls, t.invalid, t.upgraded, t.cost_usd, list(t.latencies))
+                for key, t in self._totals.items()
+            }
+        sections: Dict[str, Dict[str, Any]] = defaultdict(dict)
+        for (section, model), (calls, invalid, upgraded, cost, latencies) in sorted(snapshot.items()):
+            sections[section][model] = {
+                "calls": calls,
+                "p50_ms": round(_percentile(latencies, 50) * 1000, 1),
+                "p95_ms": round(_percentile(latencies, 95) * 1000, 1),
+                "mean_ms": round(sum(latencies) / len(latencies) * 1000, 1) if latencies else 0.0,
+                "cost_usd": round(cost, 6),
+                "cost_per_call_usd": round(cost / calls, 6) if calls else 0.0,
+                "invalid_rate": round(invalid / calls, 4) if calls else 0.0,
+                "upgraded": upgraded,
+            }
+        return {"since": self.started_at, "sections": dict(sections)}
+
+
+route_stats = RouteStats()
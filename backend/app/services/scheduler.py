@@ -0,0 +1,139 @@
+"""Dependency-aware execution of a memo's work as a DAG.
+
+Each node runs once all of its dependencies have finished, on a thread pool
+(in a copy of the caller's context, so the request deadline, trace and usage
+follow the work). Independent nodes run concurrently; a dependent node starts
+the moment its last input completes and receives the inputs' results.
+
+After a run, Schedule reports per node timings and the critical path: the
+chain of dependent nodes whose summed durations bound the memo's latency,
+however many workers are available.
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from app.utils.concurrency import submit_in_context
+
+
+@dataclass(frozen=True)
+class Node:
+    """One unit of work; `run` receives the results of its (successful) dependencies by key."""
+    key: str
+    run: Callable[[Dict[str, Any]], Any]
+    depends_on: Tuple[str, ...] = ()
+    label: Optional[str] = None
+
+
+class Schedule:
+    """Results and timings of one DAG run."""
+
+    def __init__(self, nodes: Sequence[Node]):
+        self.nodes = {node.key: node for node in nodes}
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, BaseException] = {}
+        # key -> (start, end), seconds since the run started
+        self.timings: Dict[str, Tuple[float, float]] = {}
+        self.wall_seconds = 0.0
+
+    def critical_path(self) -> Tuple[float, List[str]]:
+        """(seconds, node keys) of the longest chain of dependent node durations."""
+        longest: Dict[str, Tuple[float, List[str]]] = {}
+
+        def visit(key: str) -> Tuple[float, List[str]]:
+            if key not in longest:
+                start, end = self.timings.get(key, (0.0, 0.0))
+                before = max((visit(dep) for dep in self.nodes[key].depends_on), default=(0.0, []), key=lambda x: x[0])
+                longest[key] = (before[0] + end - start, before[1] + [key])
+            return longest[key]
+
+        return max((visit(key) for key in self.nodes), default=(0.0, []), key=lambda x: x[0])
+
+    def summary(self) -> Dict[str, Any]:
+        """Wall time, critical path and summed node time (the sequential cost), in milliseconds."""
+        seconds, path = self.critical_path()
+        return {
+            "wall_ms": round(self.wall_seconds * 1000, 1),
+            "critical_path_ms": round(seconds * 1000, 1),
+            "serial_ms": round(sum(end - start for start, end in self.timings.values()) * 1000, 1),
+            "critical_path": [self.nodes[key].label or key for key in path],
+        }
+
+
+class DAGScheduler:
+    """Runs Nodes in dependency order with at most `max_workers` at a time."""
+
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max(1, max_workers)
+
+    def run(
+        self,
+        nodes: Sequence[Node],
+        on_complete: Optional[Callable[[Node, Any], None]] = None
+    ) -> Schedule:
+        """
+        Execute the nodes and wait for all of them.
+
+        A node whose dependency raised still runs, without that result; it
+        decides itself whether it can do without. Exceptions are collected in
+        Schedule.errors instead of propagating.
+
+        Args:
+            nodes: The DAG (dependencies must refer to keys in `nodes`)
+            on_complete: Called in the caller's thread with each finished node and its result
+
+        Raises:
+            ValueError: On unknown dependencies or cycles
+        """
+        schedule = Schedule(nodes)
+        waiting = {node.key: set(node.depends_on) for node in nodes}
+        for key, deps in waiting.items():
+            unknown = deps - waiting.keys()
+            if unknown:
+                raise ValueError(f"node {key} depends on unknown nodes {sorted(unknown)}")
+        dependents: Dict[str, List[str]] = {key: [] for key in waiting}
+        for node in nodes:
+            for dep in node.depends_on:
+                dependents[dep].append(node.key)
+
+        started = time.perf_counter()
+
+        def execute(node: Node) -> Any:
+            begin = time.perf_counter() - started
+            try:
+                inputs = {dep: schedule.results[dep] for dep in node.depends_on if dep in schedule.results}
+                return node.run(inputs)
+            finally:
+                schedule.timings[node.key] = (begin, time.perf_counter() - started)
+
+        running: Dict[Future, Node] = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="section") as executor:
+            def submit_ready() -> None:
+                for key in [key for key, deps in waiting.items() if not deps]:
+                    del waiting[key]
+                    node = schedule.nodes[key]
+                    running[submit_in_context(executor, execute, node)] = node
+
+            submit_ready()
+            if waiting and not running:
+                raise ValueError(f"dependency cycle between {sorted(waiting)}")
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    error = future.exception()
+                    if error is not None:
+                        schedule.errors[node.key] = error
+                    else:
+                        schedule.results[node.key] = future.result()
+                        if on_complete:
+                            on_complete(node, schedule.results[node.key])
+                    for dependent in dependents[node.key]:
+                        waiting[dependent].discard(node.key)
+                submit_ready()
+                if waiting and not running:
+                    raise ValueError(f"dependency cycle between {sorted(waiting)}")
+
+        schedule.wall_seconds = time.perf_counter() - started
+        return schedule
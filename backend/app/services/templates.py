@@ -0,0 +1,214 @@
+"""Pre-generated section templates for the orchestrator's plan paths.
+
+Most of a section's content depends only on the plan path (holding, BV,
+Branch, default; with or without tech and hiring), not on the company.
+`build_templates` runs the full RAG generation (gpt-4o) once per planned
+task without user context and stores the sections per plan path in
+data/templates/<collection>.json, versioned by the corpus like the retrieval
+bundle and by a hash of each plan's tasks, so templates built before the
+orchestrator's plans changed are not served. In "template" generation mode a request then only pays for one
+cheap personalization call (RAGEngine.personalize_sections).
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+from app.services.bundles import BACKEND_DIR, CHUNK_STORE_DIR, VersionedSource
+from app.utils.schemas import SECTION_MODELS
+
+
+# 2: plan_hashes (format 1 files predate the next-steps and supporting-sections tasks)
+TEMPLATE_FORMAT_VERSION = 2
+TEMPLATE_DIR = os.path.join(BACKEND_DIR, "data", "templates")
+
+
+def template_path(collection_name: str, directory: str = TEMPLATE_DIR) -> str:
+    """Template file for a collection."""
+    return os.path.join(directory, f"{collection_name}.json")
+
+
+def plan_hash(tasks) -> str:
+    """Fingerprint of a plan's tasks (names, queries, sections, priorities)."""
+    canonical = json.dumps([task.to_dict() for task in tasks], sort_keys=True)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+def current_plan_hashes() -> Dict[str, str]:
+    """plan_id -> plan_hash of every plan the orchestrator can currently produce."""
+    from app.core.orchestrator import all_plan_keys, plan_for, plan_id
+
+    return {plan_id(key): plan_hash(plan_for(key)) for key in all_plan_keys()}
+
+
+def _dump_section(section: Any) -> Dict[str, Any]:
+    if isinstance(section, BaseModel):
+        return {"structured": True, "data": section.model_dump()}
+    return {"structured": False, "data": section}
+
+
+def _load_section(section_name: str, entry: Dict[str, Any]) -> Any:
+    if entry.get("structured") and section_name in SECTION_MODELS:
+        return SECTION_MODELS[section_name].model_validate(entry["data"])
+    return entry["data"]
+
+
+class PathTemplates:
+    """Generated sections per plan path."""
+
+    def __init__(self, document: Dict[str, Any]):
+        self.corpus_version: Optional[str] = document.get("corpus_version")
+        self.collection: Optional[str] = document.get("collection")
+        self.model: Optional[str] = document.get("model")
+        self.created_at: Optional[str] = document.get("created_at")
+        self.plan_hashes: Dict[str, str] = document.get("plan_hashes", {})
+        tasks = document.get("tasks", {})
+        # plan_id -> {section_name: section}, following generate_memo_sections'
+        # rule that a later task for the same section replaces an earlier one
+        self._plans: Dict[str, Dict[str, Any]] = {
+            plan: {
+                section_name: _load_section(section_name, tasks[task_name])
+                for section_name, task_name in sections.items()
+            }
+            for plan, sections in document.get("plans", {}).items()
+        }
+
+    @classmethod
+    def load(cls, path: str) -> Optional["PathTemplates"]:
+        """Read a template file (None if missing, unreadable or of another format version)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                document = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable path templates {path}: {str(e)}")
+            return None
+        if document.get("format_version") != TEMPLATE_FORMAT_VERSION:
+            print(f"Ignoring path templates {path}: format {document.get('format_version')}")
+            return None
+        return cls(document)
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    def sections_for(self, plan_id: str) -> Optional[Dict[str, Any]]:
+        """Copies of the plan's template sections (None if the plan has no template)."""
+        sections = self._plans.get(plan_id)
+        if sections is None:
+            return None
+        return {
+            name: section.model_copy(deep=True) if isinstance(section, BaseModel) else dict(section)
+            for name, section in sections.items()
+        }
+
+
+class TemplateSource(VersionedSource):
+    """The current path templates of a collection."""
+
+    def __init__(self, collection_name: str, path: Optional[str] = None, store_dir: str = CHUNK_STORE_DIR):
+        super().__init__(path or template_path(collection_name), store_dir)
+        self.collection_name = collection_name
+
+    def current(self) -> Optional[PathTemplates]:
+        return super().current()
+
+    def _load(self) -> Optional[PathTemplates]:
+        templates = PathTemplates.load(self.path)
+        if templates is None or not self._is_current_corpus(templates.corpus_version, "Path templates"):
+            return None
+        if templates.collection != self.collection_name:
+            print(f"Path templates were built for collection {templates.collection}; not using them")
+            return None
+        if templates.plan_hashes != current_plan_hashes():
+            print("Path templates were built for other orchestrator plans; not using them (rebuild the templates)")
+            return None
+        print(f"Loaded path templates for {len(templates)} plans (corpus {templates.corpus_version})")
+        return templates
+
+
+def build_templates(rag_engine, corpus_version: Optional[str], path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Generate every planned task's section without user context and write the templates atomically.
+
+    Each distinct task is generated once, even when several plans share it.
+    Tasks that fail to generate are left out, so their section falls back to
+    an earlier task of the same plan (or is missing, like in full generation).
+
+    Args:
+        rag_engine: The RAGEngine (its synthesis model writes every template section)
+        corpus_version: The chunk store's corpus_version the collection was indexed from
+        path: Output file (default: data/templates/<collection>.json)
+
+    Returns:
+        Summary with the template path and the number of plans, tasks and failures
+    """
+    from app.core.orchestrator import all_plan_keys, plan_for, plan_id
+
+    collection_name = rag_engine.qdrant_service.collection_name
+    path = path or template_path(collection_name)
+    plans = {plan_id(key): plan_for(key) for key in all_plan_keys()}
+    tasks = list(dict.fromkeys(task for plan in plans.values() for task in plan))
+
+    search_results = rag_engine.qdrant_service.search_batch([task.search_query for task in tasks])
+    generated: Dict[str, Dict[str, Any]] = {}
+    failed = 0
+    for index, (task, results) in enumerate(zip(tasks, search_results), 1):
+        print(f"[{index}/{len(tasks)}] Generating template for {task.task_name} ({task.section_name})")
+        if task.sections:
+            # Batch tasks: one entry per section, keyed "<task name>/<section>"
+            batch = rag_engine.generate_sections_batch(task, search_results=results, model=rag_engine.model)
+            for section_name, section in batch.items():
+                generated[f"{task.task_name}/{section_name}"] = _dump_section(section)
+            failed += 0 if batch else 1
+            continue
+        section = rag_engine.generate_section(
+            section_name=task.section_name,
+            search_query=task.search_query,
+            user_context=None,
+            task_name=task.task_name,
+            search_results=results,
+            model=rag_engine.model
+        )
+        if section is not None:
+            generated[task.task_name] = _dump_section(section)
+        else:
+            failed += 1
+
+    plan_sections: Dict[str, Dict[str, str]] = {}
+    for plan, plan_tasks in plans.items():
+        sections: Dict[str, str] = {}
+        for task in plan_tasks:
+            for section_name in task.sections:
+                if f"{task.task_name}/{section_name}" in generated:
+                    sections[section_name] = f"{task.task_name}/{section_name}"
+            if task.task_name in generated:
+                sections[task.section_name] = task.task_name
+        plan_sections[plan] = sections
+
+    document = {
+        "format_version": TEMPLATE_FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "corpus_version": corpus_version,
+        "collection": collection_name,
+        "model": rag_engine.model,
+        "plan_hashes": {plan: plan_hash(plan_tasks) for plan, plan_tasks in plans.items()},
+        "plans": plan_sections,
+        "tasks": generated,
+    }
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    return {
+        "path": path,
+        "plans": len(plans),
+        "tasks": len(tasks),
+        "failed": failed,
+        "corpus_version": corpus_version,
+    }
@@ -0,0 +1,93 @@
+"""Per-request latency tracing.
+
+Every request gets a Trace (held in a context variable) that collects timed
+spans: plan, embed, search, then per task tN.llm / tN.parse, then map. The
+trace is returned in the Server-Timing header and logged as one JSON line.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.services.metrics import STAGE_LATENCY
+
+
+class Trace:
+    """Timed spans collected while serving one request."""
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.attributes: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, duration: float, desc: Optional[str] = None) -> None:
+        with self._lock:
+            self.spans.append({"name": name, "ms": round(duration * 1000, 1), "desc": desc})
+
+    def elapsed_ms(self) -> float:
+        return round((time.perf_counter() - self.started) * 1000, 1)
+
+    def server_timing(self) -> str:
+        """Render the spans (plus the total) as a Server-Timing header value."""
+        with self._lock:
+            spans = list(self.spans)
+        entries = []
+        for span in spans:
+            entry = f"{span['name']};dur={span['ms']}"
+            if span["desc"]:
+                entry += f';desc="{span["desc"]}"'
+            entries.append(entry)
+        entries.append(f"total;dur={self.elapsed_ms()}")
+        return ", ".join(entries)
+
+    def to_log_record(self, **extra: Any) -> Dict[str, Any]:
+        """Structured summary of the request for a single log line."""
+        with self._lock:
+            spans = list(self.spans)
+        record = {"event": "request_trace", "request_id": self.request_id, "total_ms": self.elapsed_ms()}
+        record.update(extra)
+        record.update(self.attributes)
+        record["spans"] = spans
+        return record
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("request_trace", default=None)
+
+
+def start_trace(request_id: str):
+    """Install a new trace for the current context; returns (trace, reset token)."""
+    trace = Trace(request_id)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token) -> None:
+    _current_trace.reset(token)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, stage: Optional[str] = None, desc: Optional[str] = None):
+    """
+    Time the enclosed block.
+
+    Args:
+        name: Span name in the request trace (e.g. "t2.llm")
+        stage: Prometheus stage label to also observe (e.g. "llm_completion")
+        desc: Optional human-readable description (e.g. the section name)
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter() - started
+        if stage:
+            STAGE_LATENCY.labels(stage=stage).observe(duration)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add_span(name, duration, desc)
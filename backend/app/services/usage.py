@@ -0,0 +1,207 @@
+"""Token usage and cost accounting.
+
+Each OpenAI call reports its usage here. Usage is accumulated:
+- per memo (MemoUsage in a context variable), attached to the response metadata,
+- per time window (process-wide UsageLedger), served by the admin usage endpoint.
+
+Calls to models without a price (app/utils/pricing.py) cost 0.0 and are
+counted in unpriced_calls, so a cost total is known to be incomplete.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+from app.utils.pricing import INGESTION_USAGE_LOG, compute_cost, get_pricing
+
+
+def _empty_totals() -> Dict[str, Any]:
+    return {"calls": 0, "unpriced_calls": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0, "cost_usd": 0.0}
+
+
+def _add(totals: Dict[str, Any], entry: Dict[str, Any]) -> None:
+    totals["calls"] += 1
+    if not entry.get("priced", True):
+        totals["unpriced_calls"] += 1
+    totals["prompt_tokens"] += entry["prompt_tokens"]
+    totals["cached_tokens"] += entry["cached_tokens"]
+    totals["completion_tokens"] += entry["completion_tokens"]
+    totals["cost_usd"] += entry["cost_usd"]
+
+
+def _rounded(totals: Dict[str, Any]) -> Dict[str, Any]:
+    return dict(totals, cost_usd=round(totals["cost_usd"], 6))
+
+
+class MemoUsage:
+    """Usage of all OpenAI calls made while generating one memo."""
+
+    def __init__(self):
+        self.entries: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self.entries.append(entry)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Totals per section and for the whole memo.
+        
+        Token counts cover completions only, so the memo's prompt and
+        completion tokens are the sums over its sections; embedding input is
+        reported separately in embedding_tokens. cost_usd includes both.
+        """
+        with self._lock:
+            entries = list(self.entries)
+        total = _empty_totals()
+        embedding_tokens = 0
+        embedding_cost = 0.0
+        unpriced_embeddings = 0
+        sections: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            if entry["kind"] == "embedding":
+                embedding_tokens += entry["prompt_tokens"]
+                embedding_cost += entry["cost_usd"]
+                unpriced_embeddings += not entry.get("priced", True)
+                continue
+            _add(total, entry)
+            section = sections.setdefault(entry["section"], dict(_empty_totals(), models=[]))
+            _add(section, entry)
+            # A section retried on a larger model was last written (and is reported) by that model
+            section["model"] = entry["model"]
+            if entry["model"] not in section["models"]:
+                section["models"].append(entry["model"])
+        return {
+            "prompt_tokens": total["prompt_tokens"],
+            "cached_tokens": total["cached_tokens"],
+            "completion_tokens": total["completion_tokens"],
+            "embedding_tokens": embedding_tokens,
+            "cost_usd": round(total["cost_usd"] + embedding_cost, 6),
+            "unpriced_calls": total["unpriced_calls"] + unpriced_embeddings,
+            "sections": {name: _rounded(totals) for name, totals in sections.items()},
+        }
+
+
+class UsageLedger:
+    """Process-wide usage aggregated into one-minute buckets (kept for `retention_hours`)."""
+
+    def __init__(self, retention_hours: int = 24):
+        self.retention_seconds = retention_hours * 3600
+        self._buckets: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        minute = int(entry["timestamp"] // 60)
+        with self._lock:
+            self._buckets[minute].append(entry)
+            cutoff = int((time.time() - self.retention_seconds) // 60)
+            for old in [m for m in self._buckets if m < cutoff]:
+                del self._buckets[old]
+
+    def entries_since(self, since: float) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [
+                entry
+                for minute, bucket in self._buckets.items() if (minute + 1) * 60 > since
+                for entry in bucket if entry["timestamp"] >= since
+            ]
+
+    def summary(self, window_seconds: int) -> Dict[str, Any]:
+        """Totals for the last window: overall, per model, per section, plus ingestion embedding spend."""
+        since = time.time() - window_seconds
+        total = _empty_totals()
+        by_model: Dict[str, Dict[str, Any]] = defaultdict(_empty_totals)
+        by_section: Dict[str, Dict[str, Any]] = defaultdict(_empty_totals)
+        for entry in self.entries_since(since):
+            _add(total, entry)
+            _add(by_model[entry["model"]], entry)
+            _add(by_section[entry["section"]], entry)
+
+        ingestion = _empty_totals()
+        for entry in _read_ingestion_usage(since):
+            _add(ingestion, entry)
+
+        return {
+            "window_seconds": window_seconds,
+            "total": _rounded(total),
+            "by_model": {model: _rounded(t) for model, t in by_model.items()},
+            "by_section": {section: _rounded(t) for section, t in sorted(by_section.items(), key=lambda kv: -kv[1]["cost_usd"])},
+            "ingestion": _rounded(ingestion),
+        }
+
+
+def _read_ingestion_usage(since: float) -> List[Dict[str, Any]]:
+    """Embedding spend recorded by ingest_data.py within the window."""
+    if not os.path.exists(INGESTION_USAGE_LOG):
+        return []
+    entries = []
+    with open(INGESTION_USAGE_LOG, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            if entry.get("timestamp", 0) >= since:
+                entries.append(entry)
+    return entries
+
+
+ledger = UsageLedger()
+_current_usage: ContextVar[Optional[MemoUsage]] = ContextVar("memo_usage", default=None)
+# Models already warned about by record_usage
+_unpriced_models = set()
+
+
+def start_memo_usage():
+    """Install a fresh MemoUsage for the current context; returns (usage, reset token)."""
+    usage = MemoUsage()
+    return usage, _current_usage.set(usage)
+
+
+def end_memo_usage(token) -> None:
+    _current_usage.reset(token)
+
+
+def record_usage(section: str, model: str, usage: Any, kind: str = "completion") -> Optional[Dict[str, Any]]:
+    """
+    Record the usage block of an OpenAI response.
+
+    Args:
+        section: Section the call was made for ("retrieval" for plan-level embeddings)
+        model: Model that served the call
+        usage: `response.usage` from the OpenAI SDK (may be None)
+        kind: "completion" or "embedding"
+
+    Returns:
+        The recorded entry, or None if the response carried no usage
+    """
+    if usage is None:
+        return None
+    priced = get_pricing(model) is not None
+    if not priced and model not in _unpriced_models:
+        _unpriced_models.add(model)
+        print(f"WARNING: no price for model {model}; its calls are recorded at $0 and counted as unpriced")
+    prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+    completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = (getattr(details, "cached_tokens", 0) or 0) if details is not None else 0
+
+    entry = {
+        "timestamp": time.time(),
+        "kind": kind,
+        "section": section,
+        "model": model,
+        "prompt_tokens": prompt_tokens,
+        "cached_tokens": cached_tokens,
+        "completion_tokens": completion_tokens,
+        "cost_usd": compute_cost(model, prompt_tokens, cached_tokens, completion_tokens),
+        "priced": priced,
+    }
+    ledger.add(entry)
+    memo_usage = _current_usage.get()
+    if memo_usage is not None:
+        memo_usage.add(entry)
+    return entry
@@ -0,0 +1,149 @@
+"""Durable JSONL store for parsed and split document chunks.
+
+Ingestion writes every chunk once, after loading and splitting the source
+documents. Embedding and indexing can then run from the store alone, so
+switching the embedding model does not require re-parsing .docx/.pdf files.
+
+Each write puts the chunks in a new file and then replaces the manifest,
+which names that file. Replacing the manifest is the only step readers can
+observe, so a crash mid-write leaves the previous store intact and the
+manifest's corpus_version always describes the chunks it points at.
+"""
+import hashlib
+import json
+import glob
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from app.utils.tokens import count_tokens
+
+
+STORE_FORMAT_VERSION = 2
+# Chunk file of format 1 stores, whose manifests do not name one
+CHUNKS_FILENAME = "chunks.jsonl"
+MANIFEST_FILENAME = "manifest.json"
+
+# Namespace for deterministic chunk ids (stable across re-indexing runs)
+CHUNK_ID_NAMESPACE = uuid.UUID("7f1c2a4e-5b0d-4c39-9a57-3f8e6d2b1c90")
+
+
+def content_hash(text: str) -> str:
+    """Return the SHA-256 hex digest of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def build_chunk_record(text: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build a store record from a split chunk.
+
+    Args:
+        text: Chunk text (page_content)
+        metadata: Loader metadata; must contain "start_index" when the
+            splitter ran with add_start_index=True
+
+    Returns:
+        Record with text, source_filename, offsets, token count and content hash
+    """
+    source = metadata.get("source", "unknown")
+    start_offset = metadata.get("start_index")
+    digest = content_hash(text)
+    return {
+        "id": str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{source}:{start_offset}:{digest}")),
+        "text": text,
+        "source": source,
+        "source_filename": os.path.basename(source),
+        "start_offset": start_offset,
+        "end_offset": start_offset + len(text) if start_offset is not None else None,
+        "token_count": count_tokens(text),
+        "content_hash": digest,
+        "metadata": {k: v for k, v in metadata.items() if k not in ("source", "start_index")},
+    }
+
+
+class ChunkStore:
+    """A directory holding a JSONL chunk file plus a manifest describing how it was built."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.manifest_path = os.path.join(path, MANIFEST_FILENAME)
+
+    @property
+    def chunks_path(self) -> str:
+        """The chunk file the current manifest points at."""
+        return os.path.join(self.path, self.manifest().get("chunks_file", CHUNKS_FILENAME))
+
+    def exists(self) -> bool:
+        """Return True if the manifest and the chunk file it names are present."""
+        return os.path.exists(self.manifest_path) and os.path.exists(self.chunks_path)
+
+    def write(self, records: Iterable[Dict[str, Any]], params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Replace the store contents atomically (the manifest is replaced last).
+
+        Args:
+            records: Chunk records built with build_chunk_record
+            params: Parse/split parameters to record in the manifest
+
+        Returns:
+            The written manifest
+        """
+        os.makedirs(self.path, exist_ok=True)
+        corpus_digest = hashlib.sha256()
+        count = 0
+        total_tokens = 0
+        sources = set()
+
+        tmp_chunks = os.path.join(self.path, f"chunks.{uuid.uuid4().hex[:8]}.tmp")
+        with open(tmp_chunks, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+                corpus_digest.update(record["content_hash"].encode("ascii"))
+                count += 1
+                total_tokens += record.get("token_count") or 0
+                sources.add(record["source_filename"])
+
+        corpus_version = corpus_digest.hexdigest()[:16]
+        # A new name per write: the file the current manifest names is never overwritten
+        chunks_file = f"chunks-{corpus_version}-{uuid.uuid4().hex[:8]}.jsonl"
+        os.replace(tmp_chunks, os.path.join(self.path, chunks_file))
+
+        manifest = {
+            "format_version": STORE_FORMAT_VERSION,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "corpus_version": corpus_version,
+            "chunks_file": chunks_file,
+            "chunk_count": count,
+            "source_count": len(sources),
+            "total_tokens": total_tokens,
+            "params": params or {},
+        }
+        tmp_manifest = self.manifest_path + ".tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_manifest, self.manifest_path)
+
+        # Chunk files of earlier writes (and of writes interrupted before their manifest)
+        stale = glob.glob(os.path.join(self.path, "chunks*.jsonl")) + glob.glob(os.path.join(self.path, "chunks.*.tmp"))
+        for path in stale:
+            if os.path.basename(path) != chunks_file:
+                os.remove(path)
+        return manifest
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        """Stream chunk records from the store."""
+        with open(self.chunks_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+
+    def read_all(self) -> List[Dict[str, Any]]:
+        """Load every chunk record into memory."""
+        return list(self.read())
+
+    def manifest(self) -> Dict[str, Any]:
+        """Return the store manifest."""
+        with open(self.manifest_path, "r", encoding="utf-8") as f:
+            return json.load(f)
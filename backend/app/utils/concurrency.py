@@ -0,0 +1,15 @@
+"""Thread pool helpers that keep request-scoped context variables."""
+import contextvars
+from concurrent.futures import Executor, Future
+from typing import Any, Callable
+
+
+def submit_in_context(executor: Executor, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Future:
+    """
+    Submit work to an executor inside a copy of the caller's context.
+
+    Worker threads don't inherit context variables (request deadline,
+    trace, ...), so each submission runs in its own copy of them.
+    """
+    context = contextvars.copy_context()
+    return executor.submit(context.run, fn, *args, **kwargs)
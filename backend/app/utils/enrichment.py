@@ -0,0 +1,193 @@
+"""Metadata enrichment for ingested chunks.
+
+Attaches doc type, language, topic, year and canonical URL to every chunk so
+retrieval can filter and rank on payload fields instead of relying only on
+vector similarity over the whole corpus.
+
+Sources come from `source docs/metadata_sources.json`. A file is linked to a
+source when:
+- the source lists the filename explicitly in an optional "files" array, or
+- the filename cites a Hoge Raad ruling by day ("HR 21") and exactly one
+  rechtspraak source has that day in its title ("HR 21 januari 2011"), or
+- at least two distinctive filename words appear in the source title.
+"""
+import json
+import os
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+
+# Ordered (topic, filename/title keywords) rules; the first match wins
+TOPIC_RULES = [
+    ("fiscal_residence", ["woonplaats", "duurzame band", "duurzamr banf"]),
+    ("emigration", ["emigratie", "uitschrijving", "uitschrijf", "mbiljet", "m-biljet", "verhuizen buitenland"]),
+    ("place_of_effective_management", ["feitelijke leiding", "werkelijke leiding", "place of effective", "vestigingsplaats", "oprichtingsfictie"]),
+    ("exit_tax", ["conserverende aanslag", "bedrijfsverhuizing", "herstructurering"]),
+    ("abuse_of_law", ["fraude", "misbruik", "fraus legis"]),
+    ("rd_incentives", ["wbso", "innovation box", "innovatiebox"]),
+    ("holding", ["holding", "deelneming"]),
+    ("corporate_income_tax", ["vennootschapsbelasting", "corporate income tax", "vpb"]),
+    ("tax_treaties", ["dtt", "verdrag"]),
+    ("data_protection", ["gdpr", "avg"]),
+    ("ecommerce", ["e-commerce", "ecommerce"]),
+    ("benchmarks", ["benchmark"]),
+    ("industry_regulation", ["industry"]),
+    ("small_business", ["small business"]),
+    ("substance", ["substance"]),
+    ("valuation", ["waardering"]),
+]
+
+# Filename patterns for files that are not linked to a listed source
+DOC_TYPE_RULES = [
+    ("rechtspraak", re.compile(r"\bhr \d{1,2}\b|rechtbank|jurisprudentie|crvb")),
+    ("belastingdienst", re.compile(r"belastingdienst")),
+    ("wet", re.compile(r"^wet\b")),
+]
+DEFAULT_DOC_TYPE = "guide"
+DEFAULT_TOPIC = "general"
+
+# High-frequency function words; shared words ("in", "is") are left out
+DUTCH_STOPWORDS = frozenset(
+    "de het een van en dat niet op voor met zijn bij wordt worden ook naar aan als door kan deze heeft uit om tot er maar"
+    " wel geen nog dan wat hun zij wij".split()
+)
+ENGLISH_STOPWORDS = frozenset(
+    "the of and to that for with are on as be by this it or from at which not can have has was were will their they"
+    " an if".split()
+)
+
+# Words too generic to link a filename to a source
+GENERIC_WORDS = frozenset(
+    "netherlands nederland bronnen jurisprudentie gevolgen voorbeeld voorbeelden over van een het met de en"
+    " natuurlijke natuurlijk persoon personen docx txt".split()
+)
+
+HR_DAY_PATTERN = re.compile(r"\bhr (\d{1,2})\b")
+YEAR_PATTERN = re.compile(r"(?<!\d)((?:19|20)\d{2})(?!\d)")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text: str) -> str:
+    """Lowercase, join hyphenated words ("m-biljet" -> "mbiljet") and split on other separators."""
+    text = text.lower().replace("-", "")
+    return re.sub(r"[_.()]+", " ", text).strip()
+
+
+def _words(text: str) -> set:
+    """Distinctive words, with hyphenated terms both joined and split."""
+    variants = _normalize(text) + " " + text.lower().replace("-", " ")
+    return {w for w in WORD_PATTERN.findall(variants) if len(w) > 3 and w not in GENERIC_WORDS}
+
+
+def load_sources(path: str) -> List[Dict[str, Any]]:
+    """Load the sources list from metadata_sources.json (empty list if missing)."""
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("sources", [])
+
+
+def match_source(filename: str, sources: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Find the metadata source a file was derived from, if any."""
+    stem = _normalize(os.path.splitext(filename)[0])
+
+    for source in sources:
+        if filename in source.get("files", []):
+            return source
+
+    hr_match = HR_DAY_PATTERN.search(stem)
+    if hr_match:
+        day = int(hr_match.group(1))
+        candidates = [
+            s for s in sources
+            if s.get("type") == "rechtspraak"
+            and re.match(rf"hr {day} ", s.get("title", "").lower())
+        ]
+        if len(candidates) == 1:
+            return candidates[0]
+
+    file_words = _words(stem)
+    best, best_score, tied = None, 0, False
+    for source in sources:
+        score = len(file_words & _words(source.get("title", "")))
+        if score > best_score:
+            best, best_score, tied = source, score, False
+        elif score == best_score and score > 0:
+            tied = True
+    if best_score >= 2 and not tied:
+        return best
+    return None
+
+
+def detect_language(text: str) -> str:
+    """Classify text as "nl" or "en" from stopword counts ("unknown" if undecided)."""
+    words = WORD_PATTERN.findall(text.lower())
+    dutch = sum(1 for w in words if w in DUTCH_STOPWORDS)
+    english = sum(1 for w in words if w in ENGLISH_STOPWORDS)
+    if dutch == english:
+        return "unknown"
+    return "nl" if dutch > english else "en"
+
+
+def detect_topic(*texts: str) -> str:
+    """Return the first topic whose keywords appear in the given texts."""
+    for text in texts:
+        normalized = text.lower()
+        for topic, keywords in TOPIC_RULES:
+            if any(keyword in normalized for keyword in keywords):
+                return topic
+    return DEFAULT_TOPIC
+
+
+def detect_year(filename: str, source: Optional[Dict[str, Any]] = None) -> Optional[int]:
+    """Take the year from the filename, else from the linked source title."""
+    for text in (filename, (source or {}).get("title", "")):
+        years = YEAR_PATTERN.findall(text)
+        if years:
+            year = int(years[-1])
+            if year <= date.today().year + 1:
+                return year
+    return None
+
+
+def detect_doc_type(filename: str, source: Optional[Dict[str, Any]] = None) -> str:
+    """Use the linked source type, else classify by filename."""
+    if source and source.get("type"):
+        return source["type"]
+    stem = _normalize(os.path.splitext(filename)[0])
+    for doc_type, pattern in DOC_TYPE_RULES:
+        if pattern.search(stem):
+            return doc_type
+    return DEFAULT_DOC_TYPE
+
+
+def enrich_records(records: List[Dict[str, Any]], sources: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Attach enrichment fields to chunk store records in place.
+
+    Adds doc_type, language, topic, year, canonical_url and source_title to
+    each record's metadata. Token counts are already part of the record.
+
+    Args:
+        records: Chunk records from app.utils.chunk_store
+        sources: Entries from metadata_sources.json
+
+    Returns:
+        The same records, enriched
+    """
+    per_file: Dict[str, Dict[str, Any]] = {}
+    for record in records:
+        filename = record["source_filename"]
+        if filename not in per_file:
+            source = match_source(filename, sources)
+            per_file[filename] = {
+                "doc_type": detect_doc_type(filename, source),
+                "topic": detect_topic(filename, (source or {}).get("title", "") + " " + (source or {}).get("note", "")),
+                "year": detect_year(filename, source),
+                "canonical_url": (source or {}).get("url"),
+                "source_title": (source or {}).get("title"),
+            }
+        record["metadata"].update(per_file[filename])
+        record["metadata"]["language"] = detect_language(record["text"])
+    return records
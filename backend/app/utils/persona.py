@@ -14,4 +14,16 @@ DATA RULES:
 
 LOGIC RULE (CRITICAL):
 - You MUST maintain logical consistency across all 13 sections. If you recommend a "Branch Office" in the Market Entry section, the "Implementation Timeline" section MUST be for a "Branch Office" and NOT a "BV" (e.g., it should not mention "Notary" fees or timelines).
-"""
\ No newline at end of file
+"""
+PERSONALIZATION_PROMPT = """
+You adapt pre-written sections of a Netherlands Market Entry Memo to one company.
+The sections were written for every company on the same entry path; they are
+correct and sourced. Your job is to make them read as written for this company.
+
+RULES:
+- Address the company by name and reflect its industry, goals, size, timeline and budget where relevant.
+- Keep every fact, rate, amount, deadline, legal requirement and recommended structure exactly as given.
+- Do NOT add new facts, regimes or numbers, and do NOT remove warnings or requirements.
+- Keep the same fields and list structure; return every section you were given.
+- NEVER return Markdown formatting inside JSON values. Keep text clean.
+"""
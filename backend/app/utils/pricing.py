@@ -0,0 +1,68 @@
+"""OpenAI model pricing and cost computation."""
+import json
+import os
+import re
+from datetime import datetime, timezone
+from typing import Any, Dict, Mapping, Optional
+
+
+# USD per 1M tokens; cached_input applies to prompt tokens served from the prompt cache
+MODEL_PRICING = {
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "text-embedding-3-small": {"input": 0.02, "cached_input": 0.02, "output": 0.0},
+    "text-embedding-3-large": {"input": 0.13, "cached_input": 0.13, "output": 0.0},
+}
+
+# Dated snapshot of a model, e.g. "gpt-4o-2024-08-06"; it shares its base model's price and limits
+SNAPSHOT_SUFFIX = re.compile(r"-\d{4}-\d{2}-\d{2}$")
+
+# Shared by ingest_data.py (writer) and the admin usage endpoint (reader)
+INGESTION_USAGE_LOG = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "data", "usage", "ingestion.jsonl"
+)
+
+
+def base_model(model: str, known: Mapping[str, Any]) -> Optional[str]:
+    """
+    The key of `known` a model name counts as, or None.
+
+    Only exact names match, plus dated snapshots of a known model
+    ("gpt-4o-2024-08-06" counts as "gpt-4o"); other variants such as
+    "gpt-4o-audio-preview" or "gpt-4o-mini" do not match "gpt-4o".
+    """
+    if model in known:
+        return model
+    base = SNAPSHOT_SUFFIX.sub("", model)
+    if base != model and base in known:
+        return base
+    return None
+
+
+def get_pricing(model: str) -> Optional[Dict[str, float]]:
+    """Pricing for a model or one of its dated snapshots (None if the model is not priced)."""
+    base = base_model(model, MODEL_PRICING)
+    return MODEL_PRICING[base] if base is not None else None
+
+
+def compute_cost(model: str, prompt_tokens: int, cached_tokens: int = 0, completion_tokens: int = 0) -> float:
+    """Cost in USD of one call, given its token counts (0.0 for unpriced models, see get_pricing)."""
+    pricing = get_pricing(model)
+    if pricing is None:
+        return 0.0
+    uncached = max(0, prompt_tokens - cached_tokens)
+    return (
+        uncached * pricing["input"]
+        + cached_tokens * pricing["cached_input"]
+        + completion_tokens * pricing["output"]
+    ) / 1_000_000
+
+
+def append_usage_record(path: str, record: Dict[str, Any]) -> None:
+    """Append a timestamped usage record to a JSONL log."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    record = dict(record)
+    record.setdefault("timestamp", datetime.now(timezone.utc).timestamp())
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
@@ -0,0 +1,219 @@
+"""Structured-output schemas derived from the section response models.
+
+OpenAI's strict json_schema mode requires every object to list all of its
+properties as required, with additionalProperties false. That rules out
+free-form dicts, so on the wire:
+- Dict[str, X] fields become arrays of {"key": ..., "value": X} entries,
+- Any becomes a string,
+- optional fields become nullable instead of omittable.
+
+`to_wire`/`from_wire` convert between the wire shape and the model shape, and
+`parse_section` validates a completion straight into the section model.
+"""
+import typing
+from functools import lru_cache
+from typing import Any, Dict, Optional, Sequence, Type
+
+from pydantic import BaseModel
+
+from app.models.response import MemoResponse
+
+
+def _section_model(annotation: Any) -> Optional[Type[BaseModel]]:
+    for arg in typing.get_args(annotation) or (annotation,):
+        if isinstance(arg, type) and issubclass(arg, BaseModel):
+            return arg
+    return None
+
+
+# Section name (as planned by the orchestrator) -> response model
+SECTION_MODELS: Dict[str, Type[BaseModel]] = {
+    name: model
+    for name, field in MemoResponse.model_fields.items()
+    if name != "metadata" and (model := _section_model(field.annotation)) is not None
+}
+
+
+def _strip_optional(annotation: Any) -> Any:
+    if typing.get_origin(annotation) is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not type(None)]
+        return args[0] if len(args) == 1 else annotation
+    return annotation
+
+
+def _is_dict(annotation: Any) -> bool:
+    return typing.get_origin(annotation) in (dict, Dict)
+
+
+def _is_list(annotation: Any) -> bool:
+    return typing.get_origin(annotation) in (list, typing.List)
+
+
+def _type_schema(annotation: Any) -> Dict[str, Any]:
+    """Strict-mode schema for a (non-optional) field annotation."""
+    annotation = _strip_optional(annotation)
+    if _is_list(annotation):
+        args = typing.get_args(annotation)
+        return {"type": "array", "items": _type_schema(args[0] if args else str)}
+    if _is_dict(annotation):
+        args = typing.get_args(annotation)
+        return {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "key": {"type": "string"},
+                    "value": _type_schema(args[1] if len(args) > 1 else str),
+                },
+                "required": ["key", "value"],
+                "additionalProperties": False,
+            },
+        }
+    if annotation is int:
+        return {"type": "integer"}
+    if annotation is float:
+        return {"type": "number"}
+    if annotation is bool:
+        return {"type": "boolean"}
+    # str and Any
+    return {"type": "string"}
+
+
+def _nullable(schema: Dict[str, Any]) -> Dict[str, Any]:
+    if schema.get("type") in ("string", "integer", "number", "boolean"):
+        return dict(schema, type=[schema["type"], "null"])
+    return {"anyOf": [schema, {"type": "null"}]}
+
+
+@lru_cache(maxsize=None)
+def _strict_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    properties = {}
+    for name, field in model.model_fields.items():
+        schema = _type_schema(field.annotation)
+        optional = _strip_optional(field.annotation) is not field.annotation
+        properties[name] = _nullable(schema) if optional else schema
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def strict_json_schema(model: Type[BaseModel]) -> Dict[str, Any]:
+    """Strict JSON schema (OpenAI structured outputs) for a section model."""
+    return _strict_schema(model)
+
+
+def response_format_for(section_name: str) -> Optional[Dict[str, Any]]:
+    """`response_format` constraining a completion to the section's schema (None if unknown)."""
+    model = SECTION_MODELS.get(section_name)
+    if model is None:
+        return None
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": section_name, "strict": True, "schema": strict_json_schema(model)},
+    }
+
+
+def multi_section_response_format(section_names: Sequence[str], name: str) -> Dict[str, Any]:
+    """`response_format` for one completion returning several sections, keyed by section name."""
+    properties = {section_name: strict_json_schema(SECTION_MODELS[section_name]) for section_name in section_names}
+    schema = {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+def _example_value(annotation: Any, name: str) -> Any:
+    annotation = _strip_optional(annotation)
+    label = name.replace("_", " ")
+    if _is_list(annotation):
+        args = typing.get_args(annotation)
+        return [_example_value(args[0] if args else str, f"{label} 1")]
+    if _is_dict(annotation):
+        args = typing.get_args(annotation)
+        return {"...": _example_value(args[1] if len(args) > 1 else str, label)}
+    return f"<{label}>"
+
+
+def section_example(section_name: str) -> Dict[str, Any]:
+    """Model-shaped placeholder example for a section (empty if unknown)."""
+    model = SECTION_MODELS.get(section_name)
+    if model is None:
+        return {}
+    return {name: _example_value(field.annotation, name) for name, field in model.model_fields.items()}
+
+
+def _convert(annotation: Any, value: Any, to_model: bool) -> Any:
+    if value is None:
+        return None
+    annotation = _strip_optional(annotation)
+    if _is_list(annotation) and isinstance(value, list):
+        args = typing.get_args(annotation)
+        item = args[0] if args else str
+        return [_convert(item, v, to_model) for v in value]
+    if _is_dict(annotation):
+        args = typing.get_args(annotation)
+        value_type = args[1] if len(args) > 1 else str
+        if to_model and isinstance(value, list):
+            return {
+                str(entry.get("key")): _convert(value_type, entry.get("value"), to_model)
+                for entry in value if isinstance(entry, dict)
+            }
+        if not to_model and isinstance(value, dict):
+            return [{"key": str(k), "value": _convert(value_type, v, to_model)} for k, v in value.items()]
+    # Already in the target shape (e.g. a model-shaped example)
+    return value
+
+
+def from_wire(model: Type[BaseModel], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a structured-output payload into the model's field shape."""
+    return {
+        name: _convert(field.annotation, data.get(name), to_model=True)
+        for name, field in model.model_fields.items() if name in data
+    }
+
+
+def field_from_wire(model: Type[BaseModel], name: str, value: Any) -> Any:
+    """Convert one structured-output field value into the model's field shape."""
+    field = model.model_fields.get(name)
+    return _convert(field.annotation, value, to_model=True) if field is not None else value
+
+
+def is_list_field(model: Type[BaseModel], name: str) -> bool:
+    """Whether a model field is a list (a JSON array both on the wire and in the model)."""
+    field = model.model_fields.get(name)
+    return field is not None and _is_list(_strip_optional(field.annotation))
+
+
+def item_from_wire(model: Type[BaseModel], name: str, value: Any) -> Any:
+    """Convert one element of a structured-output list field into the model's item shape."""
+    args = typing.get_args(_strip_optional(model.model_fields[name].annotation))
+    return _convert(args[0] if args else str, value, to_model=True)
+
+
+def to_wire(model: Type[BaseModel], data: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert model-shaped data (e.g. a prompt example) into the structured-output shape."""
+    return {
+        name: _convert(field.annotation, data.get(name), to_model=False)
+        for name, field in model.model_fields.items() if name in data
+    }
+
+
+def parse_section(section_name: str, data: Dict[str, Any]) -> BaseModel:
+    """
+    Validate a structured-output payload into the section model.
+
+    Raises:
+        KeyError: If the section has no model
+        ValueError: If the payload is not an object, or (pydantic.ValidationError)
+            does not fit the model
+    """
+    model = SECTION_MODELS[section_name]
+    if not isinstance(data, dict):
+        raise ValueError(f"expected a JSON object for {section_name}, got {type(data).__name__}")
+    return model.model_validate(from_wire(model, data))
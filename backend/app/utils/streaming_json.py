@@ -0,0 +1,199 @@
+"""Incremental parser for a streamed top-level JSON object.
+
+LLM sections arrive as one JSON object, token by token. The parser is fed
+the text as it streams and emits an event as soon as a piece is complete:
+- ("item", key, index, value) for each element of a top-level array,
+- ("field", key, None, value) for each top-level field.
+
+Anything before the opening brace (e.g. a ```json fence) is skipped, and
+`result()` returns every field completed so far (and the completed items of
+an array cut off mid-way), so a malformed or truncated tail does not discard
+the valid prefix.
+
+Usage:
+    parser = StreamingJSONParser()
+    for chunk in stream:
+        for kind, key, index, value in parser.feed(chunk):
+            ...
+    section = parser.result()
+"""
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+
+Event = Tuple[str, str, Optional[int], Any]
+
+_WHITESPACE = " \t\r\n"
+
+
+class StreamingJSONParser:
+    """Single-pass scanner over a growing buffer; each character is examined once."""
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._error: Optional[str] = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # Top-level object state
+        self._expect = "key"  # key | key_string | colon | value | comma
+        self._key_start: Optional[int] = None
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._value_is_array = False
+        self._item_start: Optional[int] = None
+        self._item_index = 0
+        self._items: List[Any] = []
+        self._fields: Dict[str, Any] = {}
+
+    @property
+    def finished(self) -> bool:
+        """True once the closing brace of the top-level object was seen."""
+        return self._finished
+
+    @property
+    def error(self) -> Optional[str]:
+        return self._error
+
+    def result(self) -> Dict[str, Any]:
+        """All top-level fields completed so far (plus the completed items of an unfinished array)."""
+        fields = dict(self._fields)
+        if self._value_is_array and self._key is not None and self._items:
+            fields[self._key] = list(self._items)
+        return fields
+
+    def feed(self, chunk: str) -> List[Event]:
+        """Consume more text; return the events it completed."""
+        if self._finished or self._error or not chunk:
+            return []
+        self._buffer += chunk
+        events: List[Event] = []
+        buffer = self._buffer
+        while self._pos < len(buffer) and not self._finished and not self._error:
+            char = buffer[self._pos]
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._depth = 1
+            elif self._in_string:
+                self._scan_string(char, events)
+            else:
+                self._scan(char, events)
+            self._pos += 1
+        return events
+
+    def _scan_string(self, char: str, events: List[Event]) -> None:
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            self._in_string = False
+            if self._depth == 1 and self._expect == "key_string":
+                self._key = self._decode(self._key_start, self._pos + 1)
+                self._expect = "colon"
+            elif self._depth == 1 and self._expect == "value":
+                # A top-level string value is complete at its closing quote
+                self._complete_field(self._pos + 1, events)
+
+    def _scan(self, char: str, events: List[Event]) -> None:
+        if char in _WHITESPACE:
+            return
+        if self._depth == 1:
+            self._scan_top_level(char, events)
+            return
+
+        # Inside a nested container of the current value
+        if self._value_is_array and self._depth == 2 and self._item_start is None and char not in ",]":
+            self._item_start = self._pos
+        if char == '"':
+            self._in_string = True
+        elif char in "{[":
+            self._depth += 1
+        elif char in "}]":
+            self._depth -= 1
+            if self._value_is_array and self._depth == 1:
+                self._complete_item(self._pos, events)
+                self._complete_field(self._pos + 1, events)
+            elif self._depth == 1:
+                self._complete_field(self._pos + 1, events)
+        elif char == "," and self._value_is_array and self._depth == 2:
+            self._complete_item(self._pos, events)
+
+    def _scan_top_level(self, char: str, events: List[Event]) -> None:
+        if self._expect == "key":
+            if char == '"':
+                self._key_start = self._pos
+                self._in_string = True
+                self._expect = "key_string"
+            elif char == "}":
+                self._finished = True
+            else:
+                self._error = f"expected a key at offset {self._pos}"
+        elif self._expect == "colon":
+            if char == ":":
+                self._expect = "value"
+            else:
+                self._error = f"expected ':' at offset {self._pos}"
+        elif self._expect == "value":
+            if self._value_start is None:
+                self._value_start = self._pos
+                if char == '"':
+                    self._in_string = True
+                elif char in "{[":
+                    self._value_is_array = char == "["
+                    self._item_start = None
+                    self._item_index = 0
+                    self._items = []
+                    self._depth += 1
+                # Otherwise a number/true/false/null, completed by ',' or '}'
+            elif char in ",}":
+                self._complete_field(self._pos, events)
+                self._after_value(char)
+        elif self._expect == "comma":
+            self._after_value(char)
+
+    def _after_value(self, char: str) -> None:
+        if char == ",":
+            self._expect = "key"
+        elif char == "}":
+            self._finished = True
+        else:
+            self._error = f"expected ',' or '}}' at offset {self._pos}"
+
+    def _decode(self, start: int, end: int) -> Any:
+        try:
+            return json.loads(self._buffer[start:end])
+        except json.JSONDecodeError as e:
+            self._error = f"invalid JSON at offset {start}: {e}"
+            return None
+
+    def _complete_item(self, end: int, events: List[Event]) -> None:
+        if self._item_start is None:
+            return
+        value = self._decode(self._item_start, end)
+        if self._error is None:
+            events.append(("item", self._key, self._item_index, value))
+            self._items.append(value)
+            self._item_index += 1
+        self._item_start = None
+
+    def _complete_field(self, end: int, events: List[Event]) -> None:
+        value = self._decode(self._value_start, end)
+        if self._error is None:
+            self._fields[self._key] = value
+            events.append(("field", self._key, None, value))
+        self._key = None
+        self._value_start = None
+        self._value_is_array = False
+        self._expect = "comma"
+
+
+def parse_partial(text: str) -> Dict[str, Any]:
+    """Top-level fields of a possibly truncated or malformed JSON object."""
+    parser = StreamingJSONParser()
+    parser.feed(text)
+    return parser.result()
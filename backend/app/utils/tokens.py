@@ -0,0 +1,51 @@
+"""Token counting helpers for OpenAI models."""
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken ships with langchain-openai; the API does not require it
+    tiktoken = None
+
+
+# Rough characters-per-token ratio used when no tokenizer is available
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=8)
+def _get_encoding(model: str):
+    """Load (and cache) the tokenizer for a model, or None if unavailable."""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        try:
+            return tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            return None
+    except Exception:
+        # Encodings are downloaded on first use; offline hosts fall back to the estimate
+        return None
+
+
+def count_tokens(text: Optional[str], model: str = "text-embedding-3-small") -> int:
+    """
+    Count the tokens in a text for the given model.
+
+    Uses tiktoken when it is installed and its encoding can be loaded,
+    otherwise falls back to a characters-per-token estimate.
+
+    Args:
+        text: Text to count
+        model: OpenAI model name used to select the tokenizer
+
+    Returns:
+        Number of tokens (0 for empty text)
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return max(1, len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,192 @@
+"""Offline end-to-end benchmark of POST /generate-memo.
+
+Runs the FastAPI app in-process (httpx ASGI transport) against the fake
+OpenAI and Qdrant servers from benchmarks/fakes.py, replaying the payloads
+from TEST_SCENARIOS.json and SAMPLE_TEST_INPUTS.json at several concurrency
+levels. Reports p50/p95/p99 latency and memos per second per level and
+compares them against a stored baseline.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_e2e                          # run and compare
+    python -m benchmarks.bench_e2e --concurrency 1,8 --requests 40
+    python -m benchmarks.bench_e2e --save-baseline          # record a new baseline
+    python -m benchmarks.bench_e2e --fail-on-regression     # exit 1 on regressions (CI)
+
+Baselines are only comparable when run with the same latency profile; a
+profile mismatch is reported instead of comparing.
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import (
+    BASELINE_DIR,
+    RESULTS_DIR,
+    compare_metrics,
+    environment_info,
+    latency_summary,
+    load_payloads,
+    read_json,
+    write_json,
+)
+from benchmarks.fakes import add_latency_arguments, services_from_args
+
+
+DEFAULT_BASELINE = BASELINE_DIR / "e2e.json"
+
+
+async def run_level(client: httpx.AsyncClient, payloads: List[Dict[str, Any]], concurrency: int, total: int) -> Dict[str, Any]:
+    """Send `total` memo requests with at most `concurrency` in flight."""
+    queue: asyncio.Queue = asyncio.Queue()
+    for payload in itertools.islice(itertools.cycle(payloads), total):
+        queue.put_nowait(payload)
+
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def worker() -> None:
+        while not queue.empty():
+            payload = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.post("/generate-memo", json=payload["request"])
+                status = str(response.status_code)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                latencies.append(elapsed_ms)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    result = {
+        "concurrency": concurrency,
+        "requests": total,
+        "ok": len(latencies),
+        "errors": total - len(latencies),
+        "statuses": statuses,
+        "wall_s": round(wall, 3),
+        "memos_per_sec": round(len(latencies) / wall, 3) if wall > 0 else 0.0,
+    }
+    result.update(latency_summary(latencies))
+    return result
+
+
+async def run_benchmark(app, payloads: List[Dict[str, Any]], levels: List[int], requests_per_level: int) -> List[Dict[str, Any]]:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        # Warm-up: first request pays for lazy imports and connection setup
+        await client.post("/generate-memo", json=payloads[0]["request"])
+        results = []
+        for concurrency in levels:
+            total = max(requests_per_level, concurrency)
+            result = await run_level(client, payloads, concurrency, total)
+            report(
+                f"c={concurrency:<3} n={result['requests']:<4} ok={result['ok']:<4} "
+                f"p50={result['p50_ms']:>8.1f}ms p95={result['p95_ms']:>8.1f}ms p99={result['p99_ms']:>8.1f}ms "
+                f"{result['memos_per_sec']:>6.2f} memos/s"
+            )
+            results.append(result)
+        return results
+
+
+def report(message: str) -> None:
+    """Print to the real stdout (app output is silenced during runs)."""
+    print(message, file=sys.__stdout__, flush=True)
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> Optional[List[str]]:
+    """Regression messages, or None when the runs are not comparable."""
+    if baseline.get("latency_profile") != results["latency_profile"]:
+        report("Baseline was recorded with a different latency profile; skipping comparison.")
+        return None
+    baseline_levels = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    regressions = []
+    for level in results["levels"]:
+        reference = baseline_levels.get(level["concurrency"])
+        if reference is None:
+            continue
+        for message in compare_metrics(level, reference, ("p50_ms", "p95_ms", "p99_ms"), ("memos_per_sec",), tolerance):
+            regressions.append(f"c={level['concurrency']}: {message}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark of /generate-memo.")
+    add_latency_arguments(parser)
+    parser.add_argument("--concurrency", default="1,4,8,16", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=24, help="Requests per concurrency level")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--output", default=str(RESULTS_DIR / "e2e_latest.json"))
+    parser.add_argument("--verbose", action="store_true", help="Show application logs")
+    args = parser.parse_args()
+
+    services = services_from_args(args).start()
+    # Settings are read at import time, so point the app at the fakes before importing it
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["OPENAI_BASE_URL"] = services.openai_base_url
+    os.environ["QDRANT_URL"] = services.qdrant_url
+    os.environ["QDRANT_API_KEY"] = ""
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    from app.main import app
+
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    payloads = load_payloads()
+    report(f"Fakes: {services.describe()}")
+    report(f"Replaying {len(payloads)} payloads at concurrency {levels}")
+
+    output = open(os.devnull, "w") if not args.verbose else sys.stdout
+    try:
+        with contextlib.redirect_stdout(output):
+            levels_results = asyncio.run(run_benchmark(app, payloads, levels, args.requests))
+    finally:
+        services.stop()
+
+    results = {
+        "benchmark": "e2e",
+        "environment": environment_info(),
+        "latency_profile": services.describe(),
+        "levels": levels_results,
+    }
+    write_json(args.output, results)
+    report(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        write_json(args.baseline, results)
+        report(f"Baseline saved to {args.baseline}")
+        return
+
+    baseline = read_json(args.baseline)
+    if baseline is None:
+        report(f"No baseline at {args.baseline}; run with --save-baseline to record one.")
+        return
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions is None:
+        return
+    if regressions:
+        report(f"REGRESSIONS (tolerance {args.tolerance:.0%}):")
+        for message in regressions:
+            report(f"  {message}")
+        if args.fail_on_regression:
+            sys.exit(1)
+    else:
+        report("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""Offline comparison of model routing policies.
+
+Generates memos for the scenario payloads against the fake OpenAI and
+Qdrant servers, once per policy:
+- "routed": the routing policy from settings (DEFAULT_ROUTES + MODEL_ROUTES),
+- "synthesis": every section on the synthesis model (routing disabled).
+Reports memo latency and cost per policy, and per route (section, model)
+the calls, latency, cost and validation failures from RouteStats.
+
+Costs come from the token usage the fakes report priced with MODEL_PRICING,
+so they compare prompt/completion pricing between models, not output
+quality. Use --fast-chat-ms to give *-mini models their own latency.
+
+Usage (from the backend directory):
+    python -m benchmarks.bench_routes
+    python -m benchmarks.bench_routes --chat-ms 1500 --fast-chat-ms 500 --rounds 2
+"""
+import argparse
+import contextlib
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List
+
+from benchmarks.common import RESULTS_DIR, environment_info, latency_summary, load_payloads, write_json
+from benchmarks.fakes import add_latency_arguments, services_from_args
+
+
+POLICIES = ("routed", "synthesis")
+
+
+def report(message: str) -> None:
+    """Print to the real stdout (app output is silenced during runs)."""
+    print(message, file=sys.__stdout__, flush=True)
+
+
+def run_policy(build_memo, payloads: List[Dict[str, Any]], rounds: int) -> Dict[str, Any]:
+    """Generate every payload `rounds` times; memo latency and cost."""
+    from app.models.request import TaxMemoRequest
+
+    latencies: List[float] = []
+    costs: List[float] = []
+    for _ in range(rounds):
+        for payload in payloads:
+            request = TaxMemoRequest(**payload["request"])
+            started = time.perf_counter()
+            memo = build_memo(request)
+            latencies.append((time.perf_counter() - started) * 1000)
+            usage = memo.metadata.usage if memo.metadata else None
+            costs.append(usage.cost_usd if usage else 0.0)
+    result = {
+        "memos": len(latencies),
+        "cost_per_memo_usd": round(sum(costs) / len(costs), 6) if costs else 0.0,
+    }
+    result.update(latency_summary(latencies))
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare model routing policies against the fakes.")
+    add_latency_arguments(parser)
+    parser.set_defaults(fast_chat_ms=350.0)
+    parser.add_argument("--rounds", type=int, default=1, help="Passes over the scenario payloads per policy")
+    parser.add_argument("--output", default=str(RESULTS_DIR / "routes_latest.json"))
+    parser.add_argument("--verbose", action="store_true", help="Show application logs")
+    args = parser.parse_args()
+
+    services = services_from_args(args).start()
+    # Settings are read at import time, so point the app at the fakes before importing it
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["OPENAI_BASE_URL"] = services.openai_base_url
+    os.environ["QDRANT_URL"] = services.qdrant_url
+    os.environ["QDRANT_API_KEY"] = ""
+    if not args.verbose:
+        logging.disable(logging.INFO)
+    from app.main import build_memo, rag_engine
+    from app.services.routing import ModelRouter, route_stats
+
+    payloads = load_payloads()
+    report(f"Fakes: {services.describe()}")
+    routers = {
+        "routed": ModelRouter.from_settings(),
+        "synthesis": ModelRouter(enabled=False),
+    }
+
+    output = open(os.devnull, "w") if not args.verbose else sys.stdout
+    policies: Dict[str, Any] = {}
+    try:
+        for name in POLICIES:
+            rag_engine.router = routers[name]
+            route_stats.reset()
+            with contextlib.redirect_stdout(output):
+                result = run_policy(build_memo, payloads, args.rounds)
+            result["routes"] = route_stats.report()["sections"]
+            policies[name] = result
+            report(
+                f"{name:<10} memos={result['memos']:<4} p50={result['p50_ms']:>8.1f}ms "
+                f"p95={result['p95_ms']:>8.1f}ms ${result['cost_per_memo_usd']:.4f}/memo"
+            )
+    finally:
+        services.stop()
+
+    report("")
+    report(f"{'section':<26}{'model':<14}{'calls':>6}{'p50 ms':>10}{'p95 ms':>10}{'$/call':>10}{'invalid':>9}")
+    for name in POLICIES:
+        report(f"[{name}]")
+        for section, models in policies[name]["routes"].items():
+            for model, stats in models.items():
+                report(
+                    f"{section:<26}{model:<14}{stats['calls']:>6}{stats['p50_ms']:>10.1f}{stats['p95_ms']:>10.1f}"
+                    f"{stats['cost_per_call_usd']:>10.4f}{stats['invalid_rate']:>9.1%}"
+                )
+
+    write_json(args.output, {
+        "benchmark": "routes",
+        "environment": environment_info(),
+        "latency_profile": services.describe(),
+        "policy": routers["routed"].describe(),
+        "policies": policies,
+    })
+    report(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""Helpers shared by the benchmark tools: payloads, statistics, baselines."""
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+RESULTS_DIR = BACKEND_DIR / "data" / "benchmarks"
+
+
+def load_payloads() -> List[Dict[str, Any]]:
+    """
+    Request bodies from TEST_SCENARIOS.json and SAMPLE_TEST_INPUTS.json.
+
+    Returns:
+        [{"name": ..., "request": {...}}, ...] in file order
+    """
+    payloads = []
+    with open(BACKEND_DIR / "TEST_SCENARIOS.json", "r", encoding="utf-8") as f:
+        scenarios = json.load(f)
+    for scenario in scenarios.get("scenarios", []):
+        payloads.append({"name": scenario["name"], "request": scenario["request"]})
+    for key in ("minimal_test", "comprehensive_test"):
+        if key in scenarios:
+            payloads.append({"name": scenarios[key]["name"], "request": scenarios[key]["request"]})
+
+    with open(BACKEND_DIR / "SAMPLE_TEST_INPUTS.json", "r", encoding="utf-8") as f:
+        samples = json.load(f)
+    for case in samples.get("test_cases", []):
+        payloads.append({"name": case["name"], "request": case["request"]})
+    return payloads
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), int(round(pct / 100 * len(ordered) + 0.5))))
+    return ordered[rank - 1]
+
+
+def latency_summary(latencies_ms: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean/max of a list of latencies in milliseconds."""
+    if not latencies_ms:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0, "max_ms": 0.0}
+    return {
+        "p50_ms": round(percentile(latencies_ms, 50), 2),
+        "p95_ms": round(percentile(latencies_ms, 95), 2),
+        "p99_ms": round(percentile(latencies_ms, 99), 2),
+        "mean_ms": round(sum(latencies_ms) / len(latencies_ms), 2),
+        "max_ms": round(max(latencies_ms), 2),
+    }
+
+
+def environment_info() -> Dict[str, Any]:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def write_json(path: Path, data: Dict[str, Any]) -> None:
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def read_json(path: Path) -> Optional[Dict[str, Any]]:
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_metrics(
+    current: Dict[str, float],
+    baseline: Dict[str, float],
+    lower_is_better: Iterable[str],
+    higher_is_better: Iterable[str],
+    tolerance: float
+) -> List[str]:
+    """
+    Compare one result row against its baseline row.
+
+    Returns:
+        Human-readable regression messages (empty if within tolerance)
+    """
+    regressions = []
+    for key in lower_is_better:
+        if key in current and baseline.get(key):
+            if current[key] > baseline[key] * (1 + tolerance):
+                regressions.append(f"{key} {current[key]:.2f} vs baseline {baseline[key]:.2f} (+{(current[key] / baseline[key] - 1) * 100:.0f}%)")
+    for key in higher_is_better:
+        if key in current and baseline.get(key):
+            if current[key] < baseline[key] * (1 - tolerance):
+                regressions.append(f"{key} {current[key]:.2f} vs baseline {baseline[key]:.2f} ({(current[key] / baseline[key] - 1) * 100:.0f}%)")
+    return regressions
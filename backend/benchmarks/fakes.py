@@ -0,0 +1,450 @@
+"""Local stand-ins for OpenAI and Qdrant with injected latency.
+
+Both fakes speak just enough of the real HTTP APIs for the unmodified
+clients used by the app (openai SDK, qdrant-client REST):
+- OpenAI: POST /v1/embeddings, POST /v1/chat/completions (plain and streamed)
+- Qdrant: POST /collections/{name}/points/search, .../points/search/batch,
+  POST /collections/{name}/points (retrieve; only the index manifest exists)
+
+Each endpoint sleeps for a latency drawn from a log-normal distribution
+(median and spread configurable) and can fail a fraction of calls with 503.
+Chat completions return section JSON shaped like the response models, so
+parsing and response mapping do realistic work.
+
+Run standalone (e.g. behind a local uvicorn for the load tester):
+    python -m benchmarks.fakes --chat-ms 800 --embed-ms 60 --qdrant-ms 15
+then start the API with OPENAI_BASE_URL=http://127.0.0.1:8101/v1 and
+QDRANT_URL=http://127.0.0.1:8102.
+"""
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import typing
+import uuid
+from dataclasses import dataclass
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from app.models.response import MemoResponse
+from app.utils.schemas import SECTION_MODELS, to_wire
+
+
+EMBEDDING_DIM = 1536
+FILLER = (
+    "Under Dutch law a foreign company may operate through a branch or a BV; the choice "
+    "affects corporate income tax, payroll obligations, VAT registration and reporting duties."
+)
+
+
+@dataclass
+class LatencyProfile:
+    """Log-normal latency: `median_ms` scaled by exp(sigma * N(0, 1))."""
+    median_ms: float
+    sigma: float = 0.4
+    error_rate: float = 0.0
+
+    def sample(self) -> float:
+        """Latency for one call, in seconds."""
+        if self.median_ms <= 0:
+            return 0.0
+        return self.median_ms * math.exp(self.sigma * random.gauss(0, 1)) / 1000
+
+    def fails(self) -> bool:
+        return self.error_rate > 0 and random.random() < self.error_rate
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"median_ms": self.median_ms, "sigma": self.sigma, "error_rate": self.error_rate}
+
+
+def _unit_vector(text: str) -> List[float]:
+    """Deterministic pseudo-random unit vector for a text."""
+    rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+    vector = [rng.gauss(0, 1) for _ in range(EMBEDDING_DIM)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _fake_value(annotation: Any, name: str) -> Any:
+    """Plausible JSON value for a response model field annotation."""
+    origin = typing.get_origin(annotation)
+    args = typing.get_args(annotation)
+    if origin is typing.Union:
+        return _fake_value(next(a for a in args if a is not type(None)), name)
+    if origin in (list, List):
+        item = args[0] if args else str
+        return [_fake_value(item, f"{name} {i + 1}") for i in range(3)]
+    if origin in (dict, Dict):
+        value_type = args[1] if len(args) > 1 else str
+        return {f"{name.split()[0]}_{i + 1}": _fake_value(value_type, f"{name} item {i + 1}") for i in range(2)}
+    if annotation is Any:
+        return f"{name.replace('_', ' ').capitalize()}: {FILLER}"
+    return f"{name.replace('_', ' ').capitalize()}. {FILLER}"
+
+
+def section_payload(section_name: str) -> Dict[str, Any]:
+    """Section JSON as the LLM would return it (snake_case keys)."""
+    field = MemoResponse.model_fields.get(section_name)
+    model = None
+    if field is not None:
+        model = next((a for a in typing.get_args(field.annotation) if isinstance(a, type) and issubclass(a, BaseModel)), None)
+    if model is None:
+        return {"content": f"{section_name.replace('_', ' ').capitalize()}. {FILLER}"}
+    return {name: _fake_value(info.annotation, name) for name, info in model.model_fields.items()}
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class _FakeHandler(BaseHTTPRequestHandler):
+    """JSON-over-HTTP handler dispatching on (method, path regex)."""
+
+    routes: List[Tuple[str, "re.Pattern[str]", str]] = []
+    profiles: Dict[str, LatencyProfile] = {}
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # noqa: A002 - silence per-request logging
+        pass
+
+    def _send_json(self, status: int, body: Any) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method: str) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        for route_method, pattern, handler_name in self.routes:
+            match = pattern.fullmatch(self.path.split("?")[0])
+            if route_method == method and match:
+                profile = self.profiles[handler_name]
+                if "mini" in str(body.get("model", "")):
+                    # Small models answer with their own latency profile when one is configured
+                    profile = self.profiles.get(f"{handler_name}_fast", profile)
+                if body.get("stream") and hasattr(self, f"{handler_name}_stream"):
+                    getattr(self, f"{handler_name}_stream")(body, profile)
+                    return
+                time.sleep(profile.sample())
+                if profile.fails():
+                    self._send_json(503, {"error": {"message": "injected failure", "type": "server_error"}})
+                    return
+                self._send_json(200, getattr(self, handler_name)(body, **match.groupdict()))
+                return
+        self._send_json(404, {"error": {"message": f"no fake route for {method} {self.path}"}})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+
+def _sse_chunk(body: Dict[str, Any], delta: Dict[str, Any], finish_reason: Optional[str] = None, usage: Optional[Dict[str, Any]] = None) -> bytes:
+    chunk = {
+        "id": "chatcmpl-stream",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o"),
+        "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    if usage:
+        chunk["usage"] = usage
+    return f"data: {json.dumps(chunk)}\n\n".encode("utf-8")
+
+
+class FakeOpenAIHandler(_FakeHandler):
+    routes = [
+        ("POST", re.compile(r"/v1/embeddings"), "embeddings"),
+        ("POST", re.compile(r"/v1/chat/completions"), "chat_completions"),
+    ]
+
+    def embeddings(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        inputs = body.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        tokens = sum(_estimate_tokens(text) for text in inputs)
+        return {
+            "object": "list",
+            "model": body.get("model", "text-embedding-3-small"),
+            "data": [{"object": "embedding", "index": i, "embedding": _unit_vector(text)} for i, text in enumerate(inputs)],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    def _section_content(self, body: Dict[str, Any]) -> Tuple[str, str]:
+        """(prompt, completion content) for a chat request."""
+        messages = body.get("messages") or []
+        prompt = "\n".join(str(m.get("content", "")) for m in messages)
+        match = re.search(r"Generate the (\w+) section", prompt)
+        section_name = match.group(1) if match else "content"
+        payload = section_payload(section_name)
+        response_format = body.get("response_format") or {}
+        if response_format.get("type") == "json_schema":
+            properties = response_format["json_schema"]["schema"].get("properties", {})
+            if properties and all(name in SECTION_MODELS for name in properties):
+                # Several sections in one completion, keyed by section name
+                payload = {name: to_wire(SECTION_MODELS[name], section_payload(name)) for name in properties}
+            elif section_name in SECTION_MODELS:
+                # Structured outputs: answer in the schema's wire shape
+                payload = to_wire(SECTION_MODELS[section_name], payload)
+        return prompt, json.dumps(payload)
+
+    def chat_completions(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        prompt, content = self._section_content(body)
+        prompt_tokens = _estimate_tokens(prompt)
+        completion_tokens = _estimate_tokens(content)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": 0},
+            },
+        }
+
+    def chat_completions_stream(self, body: Dict[str, Any], profile: LatencyProfile) -> None:
+        """Server-sent chat completion chunks; a quarter of the latency passes before the first token."""
+        total = profile.sample()
+        if profile.fails():
+            time.sleep(total)
+            self._send_json(503, {"error": {"message": "injected failure", "type": "server_error"}})
+            return
+        prompt, content = self._section_content(body)
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        time.sleep(total * 0.25)
+        per_piece = total * 0.75 / max(1, len(pieces))
+        self.wfile.write(_sse_chunk(body, {"role": "assistant", "content": ""}))
+        for piece in pieces:
+            time.sleep(per_piece)
+            self.wfile.write(_sse_chunk(body, {"content": piece}))
+            self.wfile.flush()
+        self.wfile.write(_sse_chunk(body, {}, finish_reason="stop"))
+        if (body.get("stream_options") or {}).get("include_usage"):
+            prompt_tokens = _estimate_tokens(prompt)
+            completion_tokens = _estimate_tokens(content)
+            self.wfile.write(_sse_chunk(body, {}, usage={
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            }))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+# Synthetic corpus: documents split into overlapping chunks (chunk_size 1000,
+# overlap 200, like ingestion) so context assembly has real merging to do
+CORPUS_DOCUMENTS = 12
+CHUNKS_PER_DOCUMENT = 8
+CHUNK_SIZE = 1000
+CHUNK_STRIDE = 800
+
+
+@lru_cache(maxsize=None)
+def fake_document_text(doc: int) -> str:
+    rng = random.Random(doc)
+    words = FILLER.split()
+    length = CHUNK_STRIDE * CHUNKS_PER_DOCUMENT + CHUNK_SIZE
+    text = f"Fake document {doc}. "
+    while len(text) < length:
+        text += " ".join(rng.choice(words) for _ in range(12)) + ". "
+    return text[:length]
+
+
+def fake_point(doc: int, chunk: int, score: float, with_vector: bool = False) -> Dict[str, Any]:
+    """One chunk as a Qdrant scored point (LangChain payload layout)."""
+    start = chunk * CHUNK_STRIDE
+    text = fake_document_text(doc)[start:start + CHUNK_SIZE]
+    point = {
+        "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"fake/{doc}/{chunk}")),
+        "version": 0,
+        "score": score,
+        "payload": {
+            "page_content": text,
+            "metadata": {
+                "source": f"source docs/fake_document_{doc}.pdf",
+                "source_filename": f"fake_document_{doc}.pdf",
+                "start_offset": start,
+                "end_offset": start + len(text),
+                "content_hash": hashlib.sha256(text.encode("utf-8")).hexdigest(),
+            },
+        },
+    }
+    if with_vector:
+        point["vector"] = _unit_vector(text)
+    return point
+
+
+def fake_search_results(seed: Any, limit: int = 5, score_threshold: Optional[float] = None, with_vector: bool = False) -> List[Dict[str, Any]]:
+    """Deterministic, descending-score hits for a query seed."""
+    rng = random.Random(seed)
+    points = []
+    score = rng.uniform(0.55, 0.75)
+    # Queries hit a few documents, often neighbouring chunks of the same one
+    docs = [rng.randrange(CORPUS_DOCUMENTS) for _ in range(3)]
+    for _ in range(limit):
+        if score_threshold is not None and score < score_threshold:
+            break
+        doc = rng.choice(docs)
+        chunk = rng.randrange(CHUNKS_PER_DOCUMENT)
+        points.append(fake_point(doc, chunk, round(score, 4), with_vector))
+        score -= rng.uniform(0.005, 0.03)
+    return points
+
+
+class FakeQdrantHandler(_FakeHandler):
+    routes = [
+        ("GET", re.compile(r"/"), "root"),
+        ("POST", re.compile(r"/collections/(?P<collection>[^/]+)/points/search"), "search"),
+        ("POST", re.compile(r"/collections/(?P<collection>[^/]+)/points/search/batch"), "search_batch"),
+        ("POST", re.compile(r"/collections/(?P<collection>[^/]+)/points"), "retrieve"),
+    ]
+
+    def root(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        return {"title": "qdrant - fake", "version": "1.12.1"}
+
+    def _search_one(self, request: Dict[str, Any]) -> List[Dict[str, Any]]:
+        vector = request.get("vector") or []
+        return fake_search_results(
+            hashlib.sha256(json.dumps(vector[:8]).encode("utf-8")).digest(),
+            limit=int(request.get("limit") or 5),
+            score_threshold=request.get("score_threshold"),
+            with_vector=bool(request.get("with_vector"))
+        )
+
+    def search(self, body: Dict[str, Any], collection: str) -> Dict[str, Any]:
+        return {"result": self._search_one(body), "status": "ok", "time": 0.001}
+
+    def search_batch(self, body: Dict[str, Any], collection: str) -> Dict[str, Any]:
+        return {"result": [self._search_one(s) for s in body.get("searches", [])], "status": "ok", "time": 0.001}
+
+    def retrieve(self, body: Dict[str, Any], collection: str) -> Dict[str, Any]:
+        # The fake corpus never changes: its index manifest has a fixed version
+        points = []
+        if collection.endswith("_manifest"):
+            points = [{"id": point_id, "payload": {"index_version": "fake"}} for point_id in body.get("ids", [])]
+        return {"result": points, "status": "ok", "time": 0.001}
+
+
+def _handler_with_profiles(base: type, profiles: Dict[str, LatencyProfile]) -> type:
+    return type(base.__name__, (base,), {"profiles": profiles})
+
+
+class FakeServices:
+    """Fake OpenAI and Qdrant servers running in background threads."""
+
+    def __init__(
+        self,
+        chat: LatencyProfile,
+        embedding: LatencyProfile,
+        qdrant: LatencyProfile,
+        host: str = "127.0.0.1",
+        openai_port: int = 0,
+        qdrant_port: int = 0,
+        fast_chat: Optional[LatencyProfile] = None
+    ):
+        self.profiles = {"chat": chat, "embedding": embedding, "qdrant": qdrant}
+        openai_profiles = {"embeddings": embedding, "chat_completions": chat}
+        if fast_chat is not None:
+            self.profiles["chat_fast"] = fast_chat
+            openai_profiles["chat_completions_fast"] = fast_chat
+        openai_handler = _handler_with_profiles(FakeOpenAIHandler, openai_profiles)
+        qdrant_handler = _handler_with_profiles(FakeQdrantHandler, {"root": LatencyProfile(0), "search": qdrant, "search_batch": qdrant, "retrieve": qdrant})
+        self.openai_server = ThreadingHTTPServer((host, openai_port), openai_handler)
+        self.qdrant_server = ThreadingHTTPServer((host, qdrant_port), qdrant_handler)
+        self.openai_server.daemon_threads = True
+        self.qdrant_server.daemon_threads = True
+        self._threads: List[threading.Thread] = []
+
+    @property
+    def openai_base_url(self) -> str:
+        host, port = self.openai_server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    @property
+    def qdrant_url(self) -> str:
+        host, port = self.qdrant_server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeServices":
+        for server in (self.openai_server, self.qdrant_server):
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        for server in (self.openai_server, self.qdrant_server):
+            server.shutdown()
+            server.server_close()
+
+    def describe(self) -> Dict[str, Dict[str, float]]:
+        return {name: profile.to_dict() for name, profile in self.profiles.items()}
+
+
+def add_latency_arguments(parser: argparse.ArgumentParser) -> None:
+    """CLI flags shared by every tool that starts the fakes."""
+    parser.add_argument("--chat-ms", type=float, default=800.0, help="Median chat completion latency")
+    parser.add_argument("--fast-chat-ms", type=float, default=None, help="Median chat latency of *-mini models (default: --chat-ms)")
+    parser.add_argument("--embed-ms", type=float, default=60.0, help="Median embeddings latency")
+    parser.add_argument("--qdrant-ms", type=float, default=15.0, help="Median Qdrant search latency")
+    parser.add_argument("--sigma", type=float, default=0.4, help="Log-normal spread of all latencies")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls failing with 503")
+
+
+def services_from_args(args: argparse.Namespace, openai_port: int = 0, qdrant_port: int = 0, host: str = "127.0.0.1") -> FakeServices:
+    return FakeServices(
+        chat=LatencyProfile(args.chat_ms, args.sigma, args.error_rate),
+        embedding=LatencyProfile(args.embed_ms, args.sigma, args.error_rate),
+        qdrant=LatencyProfile(args.qdrant_ms, args.sigma, args.error_rate),
+        host=host,
+        openai_port=openai_port,
+        qdrant_port=qdrant_port,
+        fast_chat=LatencyProfile(args.fast_chat_ms, args.sigma, args.error_rate) if args.fast_chat_ms is not None else None
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run fake OpenAI and Qdrant servers with injected latency.")
+    add_latency_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--openai-port", type=int, default=8101)
+    parser.add_argument("--qdrant-port", type=int, default=8102)
+    args = parser.parse_args()
+
+    services = services_from_args(args, args.openai_port, args.qdrant_port, args.host).start()
+    print(f"Fake OpenAI: OPENAI_BASE_URL={services.openai_base_url}")
+    print(f"Fake Qdrant: QDRANT_URL={services.qdrant_url}")
+    print("Press Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        services.stop()
+
+
+if __name__ == "__main__":
+    main()
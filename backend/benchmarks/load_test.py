@@ -0,0 +1,301 @@
+"""Async HTTP load generator for POST /generate-memo.
+
+Replays the payloads from TEST_SCENARIOS.json and SAMPLE_TEST_INPUTS.json
+against any deployment, stepping up the load to find its saturation point.
+
+Two load models:
+- concurrency (closed loop): N clients each send a request as soon as the
+  previous one finished. Steps are client counts.
+- rate (open loop): requests start at a fixed arrival rate (req/s),
+  regardless of how fast the server answers. Steps are rates.
+
+Each step reports status codes, a latency histogram and percentiles. A step
+counts as saturated when its error rate or p95 exceeds the limits, or when
+it no longer adds throughput (concurrency) / requests start queueing, i.e.
+the median latency grows well beyond that of the first step (rate).
+
+Usage (from the backend directory):
+    python -m benchmarks.load_test --url https://tax-memo-backend.onrender.com --steps 1,2,4,8
+    python -m benchmarks.load_test --mode rate --steps 0.5,1,2,4 --step-seconds 120 --slo-ms 60000
+    python -m benchmarks.load_test --local --chat-ms 800 --steps 1,4,16,32   # fakes + local uvicorn
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import (
+    BACKEND_DIR,
+    RESULTS_DIR,
+    environment_info,
+    latency_summary,
+    load_payloads,
+    write_json,
+)
+from benchmarks.fakes import FakeServices, add_latency_arguments, services_from_args
+
+
+# Histogram bucket upper bounds in milliseconds (last bucket is open-ended)
+HISTOGRAM_BUCKETS_MS = [250, 500, 1000, 2500, 5000, 10000, 20000, 30000, 60000, 120000]
+
+
+class StepRecorder:
+    """Outcomes of the requests sent during one load step."""
+
+    def __init__(self):
+        self.statuses: Dict[str, int] = {}
+        self.latencies_ms: List[float] = []
+        self.ok_latencies_ms: List[float] = []
+
+    def record(self, status: str, latency_ms: float) -> None:
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.latencies_ms.append(latency_ms)
+        if status == "200":
+            self.ok_latencies_ms.append(latency_ms)
+
+    def histogram(self) -> Dict[str, int]:
+        counts = {f"<={bound}ms": 0 for bound in HISTOGRAM_BUCKETS_MS}
+        counts[f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] = 0
+        for latency in self.latencies_ms:
+            for bound in HISTOGRAM_BUCKETS_MS:
+                if latency <= bound:
+                    counts[f"<={bound}ms"] += 1
+                    break
+            else:
+                counts[f">{HISTOGRAM_BUCKETS_MS[-1]}ms"] += 1
+        return counts
+
+
+async def send(client: httpx.AsyncClient, payload: Dict[str, Any], recorder: StepRecorder) -> None:
+    started = time.perf_counter()
+    try:
+        response = await client.post("/generate-memo", json=payload["request"])
+        status = str(response.status_code)
+    except httpx.TimeoutException:
+        status = "timeout"
+    except httpx.HTTPError as e:
+        status = type(e).__name__
+    recorder.record(status, (time.perf_counter() - started) * 1000)
+
+
+async def run_concurrency_step(client, payloads, clients: int, duration: float, recorder: StepRecorder) -> None:
+    """Closed loop: `clients` workers send back-to-back requests until the step ends."""
+    stop_at = time.perf_counter() + duration
+
+    async def worker(offset: int) -> None:
+        for payload in itertools.islice(itertools.cycle(payloads), offset, None):
+            if time.perf_counter() >= stop_at:
+                return
+            await send(client, payload, recorder)
+
+    await asyncio.gather(*(worker(i) for i in range(int(clients))))
+
+
+async def run_rate_step(client, payloads, rate: float, duration: float, recorder: StepRecorder, poisson: bool, max_in_flight: int) -> int:
+    """Open loop: start requests at `rate` per second for `duration`, then wait for them to finish."""
+    tasks = set()
+    dropped = 0
+    started = time.perf_counter()
+    next_at = started
+    for payload in itertools.cycle(payloads):
+        if next_at - started >= duration:
+            break
+        await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        if len(tasks) >= max_in_flight:
+            # Client-side cap so a saturated server cannot exhaust local sockets
+            dropped += 1
+        else:
+            task = asyncio.create_task(send(client, payload, recorder))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        next_at += random.expovariate(rate) if poisson else 1.0 / rate
+    if tasks:
+        await asyncio.gather(*tasks)
+    return dropped
+
+
+def summarize_step(mode: str, level: float, recorder: StepRecorder, wall: float, dropped: int, duration: float) -> Dict[str, Any]:
+    total = len(recorder.latencies_ms)
+    ok = len(recorder.ok_latencies_ms)
+    result = {
+        "mode": mode,
+        "level": level,
+        "sent": total,
+        "offered_rps": round(total / duration, 3) if duration > 0 else 0.0,
+        "ok": ok,
+        "error_rate": round((total - ok) / total, 4) if total else 0.0,
+        "dropped": dropped,
+        "wall_s": round(wall, 2),
+        "throughput_rps": round(ok / wall, 3) if wall > 0 else 0.0,
+        "statuses": recorder.statuses,
+        "histogram": recorder.histogram(),
+    }
+    result.update(latency_summary(recorder.ok_latencies_ms))
+    return result
+
+
+def saturation_reason(step: Dict[str, Any], steps: List[Dict[str, Any]], args: argparse.Namespace) -> Optional[str]:
+    """Why a step counts as saturated, or None if the deployment kept up."""
+    if step["error_rate"] > args.max_error_rate:
+        return f"error rate {step['error_rate']:.1%} > {args.max_error_rate:.1%}"
+    if args.slo_ms and step["p95_ms"] > args.slo_ms:
+        return f"p95 {step['p95_ms']:.0f}ms > SLO {args.slo_ms:.0f}ms"
+    previous = steps[-1] if steps else None
+    if step["mode"] == "rate":
+        if step["dropped"]:
+            return f"{step['dropped']} requests dropped at the client in-flight cap"
+        # Open loop: once the server falls behind, requests queue and latency climbs
+        reference = steps[0]["p50_ms"] if steps else 0.0
+        if reference and step["p50_ms"] > reference * (1 + args.max_latency_growth):
+            return f"p50 {step['p50_ms']:.0f}ms vs {reference:.0f}ms at the first step (queueing)"
+    elif previous is not None and step["throughput_rps"] < previous["throughput_rps"] * (1 + args.min_gain):
+        return f"throughput {step['throughput_rps']:.2f} req/s did not grow (was {previous['throughput_rps']:.2f})"
+    return None
+
+
+def print_step(step: Dict[str, Any]) -> None:
+    unit = "req/s" if step["mode"] == "rate" else "clients"
+    print(
+        f"{step['level']:>6} {unit:<7} sent={step['sent']:<5} ok={step['ok']:<5} err={step['error_rate']:>6.1%} "
+        f"p50={step['p50_ms']:>8.0f}ms p95={step['p95_ms']:>8.0f}ms p99={step['p99_ms']:>8.0f}ms "
+        f"thr={step['throughput_rps']:>6.2f} req/s  {step['statuses']}"
+        + (f"  SATURATED: {step['saturated']}" if step["saturated"] else ""),
+        flush=True
+    )
+
+
+async def run_load(args: argparse.Namespace, base_url: str) -> List[Dict[str, Any]]:
+    payloads = load_payloads()
+    random.shuffle(payloads)
+    levels = [float(level) for level in args.steps.split(",") if level.strip()]
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    steps: List[Dict[str, Any]] = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        for level in levels:
+            recorder = StepRecorder()
+            started = time.perf_counter()
+            dropped = 0
+            if args.mode == "rate":
+                dropped = await run_rate_step(client, payloads, level, args.step_seconds, recorder, args.poisson, args.max_in_flight)
+            else:
+                await run_concurrency_step(client, payloads, level, args.step_seconds, recorder)
+            step = summarize_step(args.mode, level, recorder, time.perf_counter() - started, dropped, args.step_seconds)
+            step["saturated"] = saturation_reason(step, steps, args)
+            print_step(step)
+            steps.append(step)
+            if step["saturated"] and args.stop_on_saturation:
+                break
+            if args.cooldown_seconds:
+                await asyncio.sleep(args.cooldown_seconds)
+    return steps
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_local_instance(services: FakeServices, workers: int, verbose: bool) -> Tuple[subprocess.Popen, str]:
+    """Start uvicorn on a free port with the app pointed at the fakes."""
+    port = _free_port()
+    env = dict(os.environ)
+    env.update({
+        "OPENAI_API_KEY": "sk-loadtest",
+        "OPENAI_BASE_URL": services.openai_base_url,
+        "QDRANT_URL": services.qdrant_url,
+        "QDRANT_API_KEY": "",
+    })
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=str(BACKEND_DIR),
+        env=env,
+        stdout=None if verbose else subprocess.DEVNULL,
+        stderr=None if verbose else subprocess.DEVNULL
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("Local uvicorn exited during startup")
+        try:
+            if httpx.get(f"{base_url}/health", timeout=1).status_code == 200:
+                return process, base_url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError("Local uvicorn did not become healthy within 60s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Step load test for POST /generate-memo.")
+    parser.add_argument("--url", default="http://localhost:8000", help="Base URL of the deployment")
+    parser.add_argument("--mode", choices=["concurrency", "rate"], default="concurrency")
+    parser.add_argument("--steps", default="1,2,4,8", help="Comma-separated clients (concurrency) or req/s (rate) per step")
+    parser.add_argument("--step-seconds", type=float, default=60.0, help="Duration of each step")
+    parser.add_argument("--cooldown-seconds", type=float, default=0.0, help="Pause between steps")
+    parser.add_argument("--poisson", action="store_true", help="Poisson arrivals instead of a fixed interval (rate mode)")
+    parser.add_argument("--timeout", type=float, default=180.0, help="Per-request timeout in seconds")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="Client-side cap on concurrent requests")
+    parser.add_argument("--max-error-rate", type=float, default=0.01, help="Error rate that marks a step saturated")
+    parser.add_argument("--slo-ms", type=float, default=0.0, help="p95 latency that marks a step saturated (0 = off)")
+    parser.add_argument("--min-gain", type=float, default=0.1, help="Minimum relative throughput gain per step (concurrency)")
+    parser.add_argument("--max-latency-growth", type=float, default=1.0, help="Allowed p50 growth over the first step (rate; 1.0 = doubling)")
+    parser.add_argument("--stop-on-saturation", action="store_true")
+    parser.add_argument("--output", default=str(RESULTS_DIR / "load_test_latest.json"))
+    local = parser.add_argument_group("local instance backed by fakes")
+    local.add_argument("--local", action="store_true", help="Start the fakes and a local uvicorn instead of using --url")
+    local.add_argument("--workers", type=int, default=1, help="uvicorn workers for --local")
+    local.add_argument("--verbose", action="store_true", help="Show the local instance's logs")
+    add_latency_arguments(local)
+    args = parser.parse_args()
+
+    services = None
+    process = None
+    base_url = args.url
+    if args.local:
+        services = services_from_args(args).start()
+        process, base_url = start_local_instance(services, args.workers, args.verbose)
+        print(f"Local instance at {base_url} backed by fakes {services.describe()}")
+
+    print(f"Load test against {base_url} ({args.mode} mode, steps {args.steps}, {args.step_seconds:.0f}s each)")
+    try:
+        steps = asyncio.run(run_load(args, base_url))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+        if services is not None:
+            services.stop()
+
+    healthy = [step for step in steps if not step["saturated"]]
+    saturated = next((step for step in steps if step["saturated"]), None)
+    if saturated:
+        capacity = f"last healthy step {healthy[-1]['level']}" if healthy else "no healthy step"
+        print(f"Saturation at step {saturated['level']}: {saturated['saturated']} ({capacity})")
+    else:
+        print("No saturation observed; extend --steps to push further.")
+
+    write_json(args.output, {
+        "benchmark": "load_test",
+        "environment": environment_info(),
+        "target": base_url,
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "steps": steps,
+        "saturation_step": saturated["level"] if saturated else None,
+    })
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
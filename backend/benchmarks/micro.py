@@ -0,0 +1,223 @@
+"""Microbenchmarks for the CPU-side work of one memo request.
+
+Covers the code that runs between and around the network calls:
+- Orchestrator.plan_tasks
+- RAGEngine._build_task_constraints
+- RAGEngine.clean_json_response
+- QdrantService.format_context
+- map_sections_to_response
+- MemoResponse serialization: FastAPI's response_model path, and
+  MemoResponse.dump_json with and without null sections
+
+Inputs come from TEST_SCENARIOS.json and SAMPLE_TEST_INPUTS.json: every
+payload is planned, and each planned task gets fake search results and a
+fake LLM section (benchmarks/fakes.py). Each case runs over the whole
+input set; timings are reported per operation.
+
+Usage (from the backend directory):
+    python -m benchmarks.micro                       # run and compare with baselines/micro.json
+    python -m benchmarks.micro --case format_context --repeat 10
+    python -m benchmarks.micro --save-baseline
+    python -m benchmarks.micro --fail-on-regression
+"""
+import argparse
+import json
+import logging
+import os
+import statistics
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.common import (
+    BASELINE_DIR,
+    RESULTS_DIR,
+    compare_metrics,
+    environment_info,
+    load_payloads,
+    read_json,
+    write_json,
+)
+from benchmarks.fakes import fake_search_results, section_payload
+
+
+DEFAULT_BASELINE = BASELINE_DIR / "micro.json"
+
+
+def _llm_wrapped(content: Dict[str, Any], index: int) -> str:
+    """Raw completion text in the shapes the LLM actually returns."""
+    body = json.dumps(content, indent=2)
+    shapes = [
+        body,
+        f"```json\n{body}\n```",
+        f"Here is the section you asked for:\n```json\n{body}\n```\nLet me know if you need more.",
+    ]
+    return shapes[index % len(shapes)]
+
+
+def build_inputs() -> Dict[str, Any]:
+    """Realistic inputs for every case, derived from the sample payloads."""
+    from app.core.orchestrator import Orchestrator
+    from app.models.request import TaxMemoRequest
+
+    orchestrator = Orchestrator()
+    requests = [TaxMemoRequest(**payload["request"]) for payload in load_payloads()]
+    plans = [orchestrator.plan_tasks(request) for request in requests]
+    tasks = [task for plan in plans for task in plan]
+    memos = [
+        (request, {task.section_name: section_payload(task.section_name) for task in plan})
+        for request, plan in zip(requests, plans)
+    ]
+    return {
+        "orchestrator": orchestrator,
+        "requests": requests,
+        "tasks": tasks,
+        "raw_completions": [_llm_wrapped(section_payload(task.section_name), i) for i, task in enumerate(tasks)],
+        "search_results": [fake_search_results(task.search_query, limit=5) for task in tasks],
+        "memos": memos,
+    }
+
+
+def build_cases(inputs: Dict[str, Any]) -> Dict[str, Tuple[Callable[[], Any], int]]:
+    """Case name -> (function running the case over all inputs, operations per run)."""
+    from fastapi.routing import APIRoute
+    from app.main import app, map_sections_to_response, rag_engine
+
+    orchestrator = inputs["orchestrator"]
+    requests = inputs["requests"]
+    tasks = inputs["tasks"]
+    raw_completions = inputs["raw_completions"]
+    search_results = inputs["search_results"]
+    memos = inputs["memos"]
+    qdrant_service = rag_engine.qdrant_service
+    responses = [map_sections_to_response(sections, request) for request, sections in memos]
+    # The response field FastAPI would validate and serialize /generate-memo's return value with
+    response_field = next(
+        route.response_field for route in app.routes
+        if isinstance(route, APIRoute) and route.path == "/generate-memo"
+    )
+
+    def plan_tasks():
+        for request in requests:
+            orchestrator.plan_tasks(request)
+
+    def build_task_constraints():
+        for task in tasks:
+            rag_engine._build_task_constraints(task.task_name, task.section_name, task.search_query)
+
+    def clean_json_response():
+        for text in raw_completions:
+            json.loads(rag_engine.clean_json_response(text))
+
+    def format_context():
+        for results in search_results:
+            qdrant_service.format_context(results)
+
+    def map_sections():
+        for request, sections in memos:
+            map_sections_to_response(sections, request)
+
+    def memo_serialize_response_model():
+        # fastapi.routing.serialize_response followed by JSONResponse.render
+        for response in responses:
+            value, _ = response_field.validate(response, {}, loc=("response",))
+            content = response_field.serialize(value, by_alias=True)
+            json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+    def memo_serialize_dump_json():
+        for response in responses:
+            response.dump_json().encode("utf-8")
+
+    def memo_serialize_omit_null():
+        for response in responses:
+            response.dump_json(omit_null_sections=True).encode("utf-8")
+
+    return {
+        "plan_tasks": (plan_tasks, len(requests)),
+        "build_task_constraints": (build_task_constraints, len(tasks)),
+        "clean_json_response": (clean_json_response, len(raw_completions)),
+        "format_context": (format_context, len(search_results)),
+        "map_sections_to_response": (map_sections, len(memos)),
+        "memo_serialize_response_model": (memo_serialize_response_model, len(responses)),
+        "memo_serialize_dump_json": (memo_serialize_dump_json, len(responses)),
+        "memo_serialize_omit_null": (memo_serialize_omit_null, len(responses)),
+    }
+
+
+def time_case(fn: Callable[[], Any], operations: int, repeat: int) -> Dict[str, float]:
+    """Per-operation timings in microseconds over `repeat` runs of at least ~0.2s each."""
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    runs = [total / number / operations * 1e6 for total in timer.repeat(repeat=repeat, number=number)]
+    return {
+        "operations": operations,
+        "loops": number,
+        "min_us": round(min(runs), 3),
+        "median_us": round(statistics.median(runs), 3),
+        "max_us": round(max(runs), 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for CPU-side hot paths.")
+    parser.add_argument("--case", action="append", help="Run only this case (repeatable)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative slowdown (0.25 = 25%%)")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--output", default=str(RESULTS_DIR / "micro_latest.json"))
+    args = parser.parse_args()
+
+    # The app reads settings at import time; nothing here talks to the network
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    os.environ.setdefault("QDRANT_URL", "http://127.0.0.1:6333")
+    # Measure the code, not the log handler writing to the terminal
+    logging.disable(logging.INFO)
+
+    cases = build_cases(build_inputs())
+    selected = args.case or list(cases)
+    unknown = [name for name in selected if name not in cases]
+    if unknown:
+        parser.error(f"unknown case(s) {unknown}; choose from {list(cases)}")
+
+    results: Dict[str, Dict[str, float]] = {}
+    for name in selected:
+        fn, operations = cases[name]
+        results[name] = time_case(fn, operations, args.repeat)
+        row = results[name]
+        print(f"{name:<28} {row['median_us']:>12.2f} us/op (min {row['min_us']:.2f}, max {row['max_us']:.2f}, {row['operations']} ops x {row['loops']} loops)")
+
+    document = {"benchmark": "micro", "environment": environment_info(), "cases": results}
+    write_json(args.output, document)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        baseline = read_json(args.baseline) or {"benchmark": "micro", "cases": {}}
+        baseline["environment"] = document["environment"]
+        baseline["cases"].update(results)
+        write_json(args.baseline, baseline)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    baseline = read_json(args.baseline)
+    if baseline is None:
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one.")
+        return
+    regressions: List[str] = []
+    for name, row in results.items():
+        reference = baseline.get("cases", {}).get(name)
+        if reference:
+            regressions += [f"{name}: {message}" for message in compare_metrics(row, reference, ("median_us",), (), args.tolerance)]
+    if regressions:
+        print(f"REGRESSIONS (tolerance {args.tolerance:.0%}):")
+        for message in regressions:
+            print(f"  {message}")
+        if args.fail_on_regression:
+            sys.exit(1)
+    else:
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
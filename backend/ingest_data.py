@@ -1,12 +1,26 @@
-"""Data ingestion script for PDF, HTML, DOCX, and TXT files into Qdrant."""
+"""Data ingestion script for PDF, HTML, DOCX, and TXT files into Qdrant.
+
+Ingestion runs in two stages:
+1. Parse: load the source documents, split them into chunks and write the
+   chunks to a JSONL chunk store (data/chunk_store by default).
+2. Index: embed the chunks from the store and upsert them to Qdrant.
+3. Bundle: precompute the retrieval results of every orchestrator plan
+   (data/bundles, see app/services/bundles.py) against the new collection.
+4. Templates (opt-in, --templates): pre-generate every plan path's sections with
+   gpt-4o for the "template" generation mode (data/templates, see
+   app/services/templates.py).
+
+Usage:
+    python ingest_data.py                # parse + index + bundle (full rebuild)
+    python ingest_data.py --parse-only   # refresh the chunk store only
+    python ingest_data.py --from-store   # re-embed/re-index without re-parsing
+    python ingest_data.py --bundles-only # rebuild the retrieval bundle only
+    python ingest_data.py --templates    # full rebuild, plus path templates
+    python ingest_data.py --templates-only
+"""
+import argparse
 import os
 import sys
-from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader, BSHTMLLoader, Docx2txtLoader, TextLoader
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_qdrant import QdrantVectorStore
-from qdrant_client import QdrantClient
-from qdrant_client.http.models import Distance, VectorParams
 from dotenv import load_dotenv
 
 # Load environment variables (look for .env in backend directory)
@@ -18,100 +32,254 @@ else:
     # Fallback: try current directory
     load_dotenv()
 
+from app.utils.chunk_store import ChunkStore, build_chunk_record
+from app.utils.enrichment import enrich_records, load_sources
+from app.utils.pricing import INGESTION_USAGE_LOG, append_usage_record, compute_cost
+
 # --- CONFIGURATION ---
 QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY", "")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 COLLECTION_NAME = "netherlands_pilot"
 SOURCE_DIR = "../source docs"
+METADATA_SOURCES_PATH = os.path.join(SOURCE_DIR, "metadata_sources.json")
+CHUNK_STORE_DIR = os.path.join(script_dir, "data", "chunk_store")
+EMBEDDING_MODEL = "text-embedding-3-small"
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
 
-# Validate required environment variables
-if not OPENAI_API_KEY:
-    print("ERROR: OPENAI_API_KEY not found in environment variables!")
-    print("Please set OPENAI_API_KEY in your .env file or environment.")
-    sys.exit(1)
-
-print(f"Scanning {SOURCE_DIR} for PDF, HTML, DOCX, and TXT files...")
-
-# 1. Define Loaders for each file type
-pdf_loader = DirectoryLoader(SOURCE_DIR, glob="**/*.pdf", loader_cls=PyPDFLoader)
-html_loader = DirectoryLoader(SOURCE_DIR, glob="**/*.html", loader_cls=BSHTMLLoader)
-docx_loader = DirectoryLoader(SOURCE_DIR, glob="**/*.docx", loader_cls=Docx2txtLoader)
-txt_loader = DirectoryLoader(SOURCE_DIR, glob="**/*.txt", loader_cls=TextLoader, loader_kwargs={"encoding": "utf-8"})
-
-# 2. Load Data
-print("Loading PDFs...")
-pdf_docs = pdf_loader.load()
-print(f"  - Found {len(pdf_docs)} PDF pages.")
-
-print("Loading HTML files...")
-html_docs = html_loader.load()
-print(f"  - Found {len(html_docs)} HTML documents.")
-
-print("Loading Word (.docx) files...")
-word_docs = docx_loader.load()
-print(f"  - Found {len(word_docs)} Word documents.")
-
-print("Loading Text (.txt) files...")
-txt_docs = txt_loader.load()
-print(f"  - Found {len(txt_docs)} text documents.")
-
-# 3. Combine ALL documents
-all_docs = pdf_docs + html_docs + word_docs + txt_docs
-print(f"TOTAL documents to process: {len(all_docs)}")
-
-if len(all_docs) == 0:
-    print("ERROR: No documents found! Check your source_documents folder.")
-    exit(1)
-
-# 4. Split into Chunks
-print("Splitting documents into chunks...")
-text_splitter = RecursiveCharacterTextSplitter(
-    chunk_size=1000,
-    chunk_overlap=200,
-    separators=["\n\n", "\n", " ", ""]
-)
-
-chunks = text_splitter.split_documents(all_docs)
-print(f"Created {len(chunks)} vector-ready chunks.")
-
-# 5. Add metadata with source filename
-print("Adding metadata to chunks...")
-for chunk in chunks:
-    source = chunk.metadata.get("source", "unknown")
-    filename = os.path.basename(source)
-    chunk.metadata["source_filename"] = filename
-
-# 6. Embed & Upsert to Qdrant
-print("Initializing embeddings and Qdrant connection...")
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-# Initialize Qdrant client
-if QDRANT_API_KEY:
-    client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
-else:
-    client = QdrantClient(url=QDRANT_URL)
+# Enriched payload fields that retrieval filters on (payload key -> Qdrant index type)
+PAYLOAD_INDEXES = {
+    "metadata.doc_type": "keyword",
+    "metadata.language": "keyword",
+    "metadata.topic": "keyword",
+    "metadata.year": "integer",
+}
+
+
+def parse_documents(source_dir: str, chunk_size: int, chunk_overlap: int) -> list:
+    """Load every source document and split it into chunk records."""
+    from langchain_community.document_loaders import DirectoryLoader, PyPDFLoader, BSHTMLLoader, Docx2txtLoader, TextLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    print(f"Scanning {source_dir} for PDF, HTML, DOCX, and TXT files...")
+
+    # 1. Define Loaders for each file type
+    pdf_loader = DirectoryLoader(source_dir, glob="**/*.pdf", loader_cls=PyPDFLoader)
+    html_loader = DirectoryLoader(source_dir, glob="**/*.html", loader_cls=BSHTMLLoader)
+    docx_loader = DirectoryLoader(source_dir, glob="**/*.docx", loader_cls=Docx2txtLoader)
+    txt_loader = DirectoryLoader(source_dir, glob="**/*.txt", loader_cls=TextLoader, loader_kwargs={"encoding": "utf-8"})
+
+    # 2. Load Data
+    print("Loading PDFs...")
+    pdf_docs = pdf_loader.load()
+    print(f"  - Found {len(pdf_docs)} PDF pages.")
+
+    print("Loading HTML files...")
+    html_docs = html_loader.load()
+    print(f"  - Found {len(html_docs)} HTML documents.")
+
+    print("Loading Word (.docx) files...")
+    word_docs = docx_loader.load()
+    print(f"  - Found {len(word_docs)} Word documents.")
+
+    print("Loading Text (.txt) files...")
+    txt_docs = txt_loader.load()
+    print(f"  - Found {len(txt_docs)} text documents.")
+
+    # 3. Combine ALL documents
+    all_docs = pdf_docs + html_docs + word_docs + txt_docs
+    print(f"TOTAL documents to process: {len(all_docs)}")
+
+    if len(all_docs) == 0:
+        print("ERROR: No documents found! Check your source_documents folder.")
+        sys.exit(1)
+
+    # 4. Split into Chunks (start_index records each chunk's offset in its document)
+    print("Splitting documents into chunks...")
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        separators=["\n\n", "\n", " ", ""],
+        add_start_index=True
+    )
+
+    chunks = text_splitter.split_documents(all_docs)
+    print(f"Created {len(chunks)} vector-ready chunks.")
+
+    return [build_chunk_record(chunk.page_content, chunk.metadata) for chunk in chunks]
+
+
+def index_chunks(records: list, corpus_version: str) -> None:
+    """Embed chunk records, upsert them into a fresh Qdrant collection and record its index manifest."""
+    from langchain_core.documents import Document
+    from langchain_openai import OpenAIEmbeddings
+    from langchain_qdrant import QdrantVectorStore
+    from qdrant_client import QdrantClient
+    from qdrant_client.http.models import Distance, PayloadSchemaType, VectorParams
+    from app.services.qdrant import delete_index_manifest, write_index_manifest
+
+    # Validate required environment variables
+    if not OPENAI_API_KEY:
+        print("ERROR: OPENAI_API_KEY not found in environment variables!")
+        print("Please set OPENAI_API_KEY in your .env file or environment.")
+        sys.exit(1)
+
+    # Rebuild LangChain documents; payload metadata keeps source_filename and offsets
+    documents = []
+    ids = []
+    for record in records:
+        metadata = dict(record["metadata"])
+        metadata.update({
+            "source": record["source"],
+            "source_filename": record["source_filename"],
+            "start_offset": record["start_offset"],
+            "end_offset": record["end_offset"],
+            "token_count": record["token_count"],
+            "content_hash": record["content_hash"],
+        })
+        documents.append(Document(page_content=record["text"], metadata=metadata))
+        ids.append(record["id"])
+
+    # Embed & Upsert to Qdrant
+    print("Initializing embeddings and Qdrant connection...")
+    embeddings = OpenAIEmbeddings(model=EMBEDDING_MODEL)
+
+    # Initialize Qdrant client
+    if QDRANT_API_KEY:
+        client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
+    else:
+        client = QdrantClient(url=QDRANT_URL)
+
+    # Servers stop caching retrievals until the new manifest is written
+    delete_index_manifest(client, COLLECTION_NAME)
+
+    # ⚠️ This line prevents duplicates!
+    if client.collection_exists(COLLECTION_NAME):
+        print(f"🧹 Found existing collection... Deleting it for a clean start...")
+        client.delete_collection(collection_name=COLLECTION_NAME)
+
+    # Create collection
+    print(f"Creating new collection: {COLLECTION_NAME}")
+    client.create_collection(
+        collection_name=COLLECTION_NAME,
+        vectors_config=VectorParams(size=1536, distance=Distance.COSINE),
+    )
+
+    print(f"Uploading {len(documents)} chunks to Qdrant (this may take a while)...")
+    qdrant = QdrantVectorStore(
+        client=client,
+        collection_name=COLLECTION_NAME,
+        embedding=embeddings,
+    )
+
+    qdrant.add_documents(documents, ids=ids)
+
+    # Record embedding spend (token counts were computed when the chunks were stored)
+    embedding_tokens = sum(record["token_count"] for record in records)
+    cost = compute_cost(EMBEDDING_MODEL, embedding_tokens)
+    print(f"Embedded {embedding_tokens} tokens with {EMBEDDING_MODEL} (~${cost:.4f})")
+    append_usage_record(INGESTION_USAGE_LOG, {
+        "kind": "embedding",
+        "section": "ingestion",
+        "model": EMBEDDING_MODEL,
+        "prompt_tokens": embedding_tokens,
+        "cached_tokens": 0,
+        "completion_tokens": 0,
+        "cost_usd": cost,
+    })
+
+    # Index enriched metadata so filtered searches stay cheap
+    print("Creating payload indexes for enriched metadata...")
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        client.create_payload_index(
+            collection_name=COLLECTION_NAME,
+            field_name=field_name,
+            field_schema=PayloadSchemaType(schema),
+        )
+
+    index_manifest = write_index_manifest(client, COLLECTION_NAME, corpus_version, len(records))
+    print(f"Recorded index {index_manifest['index_version']} (corpus {corpus_version})")
+
+
+def build_bundles(corpus_version: str) -> None:
+    """Precompute retrieval bundles for every plan path against the indexed collection."""
+    from app.services.bundles import build_bundle
+    from app.services.qdrant import QdrantService
+
+    print("Building retrieval bundle for all orchestrator plans...")
+    summary = build_bundle(QdrantService(use_bundles=False), corpus_version)
+    print(f"Bundled {summary['queries']} queries for {summary['plans']} plans (corpus {corpus_version}) in {summary['path']}")
+
+
+def build_path_templates(corpus_version: str) -> None:
+    """Pre-generate the sections of every plan path (one gpt-4o completion per distinct task)."""
+    from app.services.rag_engine import RAGEngine
+    from app.services.templates import build_templates
+
+    print("Generating path templates for all orchestrator plans...")
+    summary = build_templates(RAGEngine(), corpus_version)
+    print(f"Generated {summary['tasks'] - summary['failed']}/{summary['tasks']} task sections for {summary['plans']} plans (corpus {corpus_version}) in {summary['path']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Ingest source documents into Qdrant.")
+    stage = parser.add_mutually_exclusive_group()
+    stage.add_argument("--parse-only", action="store_true", help="Parse and split documents into the chunk store, skip indexing")
+    stage.add_argument("--from-store", action="store_true", help="Embed and index from the existing chunk store without re-parsing")
+    stage.add_argument("--bundles-only", action="store_true", help="Rebuild the retrieval bundle against the current collection")
+    stage.add_argument("--templates-only", action="store_true", help="Regenerate the path templates against the current collection")
+    parser.add_argument("--skip-bundles", action="store_true", help="Do not rebuild the retrieval bundle after indexing")
+    parser.add_argument("--templates", action="store_true", help="Also pre-generate the path templates after indexing")
+    parser.add_argument("--store-dir", default=CHUNK_STORE_DIR, help="Chunk store directory")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP)
+    args = parser.parse_args()
+
+    store = ChunkStore(args.store_dir)
 
-# ⚠️ This line prevents duplicates!
-if client.collection_exists(COLLECTION_NAME):
-    print(f"🧹 Found existing collection... Deleting it for a clean start...")
-    client.delete_collection(collection_name=COLLECTION_NAME)
+    if args.bundles_only or args.templates_only:
+        if not store.exists():
+            print(f"ERROR: No chunk store found at {args.store_dir}. Bundles and templates are versioned by its corpus.")
+            sys.exit(1)
+        corpus_version = store.manifest()["corpus_version"]
+        if args.bundles_only:
+            build_bundles(corpus_version)
+        else:
+            build_path_templates(corpus_version)
+        return
 
-# Create collection
-print(f"Creating new collection: {COLLECTION_NAME}")
-client.create_collection(
-    collection_name=COLLECTION_NAME,
-    vectors_config=VectorParams(size=1536, distance=Distance.COSINE),
-)
+    if args.from_store:
+        if not store.exists():
+            print(f"ERROR: No chunk store found at {args.store_dir}. Run with --parse-only first.")
+            sys.exit(1)
+        manifest = store.manifest()
+        print(f"Loading chunks from store (corpus {manifest['corpus_version']}, params {manifest['params']})...")
+        records = store.read_all()
+        # Re-run enrichment so rule changes apply without re-parsing
+        enrich_records(records, load_sources(METADATA_SOURCES_PATH))
+    else:
+        records = parse_documents(SOURCE_DIR, args.chunk_size, args.chunk_overlap)
+        print("Enriching chunk metadata...")
+        enrich_records(records, load_sources(METADATA_SOURCES_PATH))
+        manifest = store.write(records, params={
+            "source_dir": SOURCE_DIR,
+            "chunk_size": args.chunk_size,
+            "chunk_overlap": args.chunk_overlap,
+        })
+        print(f"Wrote {manifest['chunk_count']} chunks ({manifest['total_tokens']} tokens) to {args.store_dir}")
 
-print(f"Uploading {len(chunks)} chunks to Qdrant (this may take a while)...")
-qdrant = QdrantVectorStore(
-    client=client,
-    collection_name=COLLECTION_NAME,
-    embedding=embeddings,
-)
+    if args.parse_only:
+        print("SUCCESS! Chunk store updated (indexing skipped).")
+        return
 
-qdrant.add_documents(chunks)
+    index_chunks(records, manifest["corpus_version"])
+    if not args.skip_bundles:
+        build_bundles(manifest["corpus_version"])
+    if args.templates:
+        build_path_templates(manifest["corpus_version"])
+    print("SUCCESS! All PDFs, HTML, Word, and Text documents have been ingested.")
 
-print("SUCCESS! All PDFs, HTML, Word, and Text documents have been ingested.")
 
+if __name__ == "__main__":
+    main()
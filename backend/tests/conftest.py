@@ -0,0 +1,9 @@
+"""Shared test setup.
+
+Settings are read when app.core.config is imported, so the required ones get
+placeholders here; the unit tests never reach OpenAI or Qdrant.
+"""
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
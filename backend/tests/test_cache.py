@@ -0,0 +1,95 @@
+"""Tests for the cache backends and namespaces."""
+import time
+
+import pytest
+
+from app.services.cache import CacheNamespace, MemoryCacheBackend, SQLiteCacheBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemoryCacheBackend(1000)
+    return SQLiteCacheBackend(str(tmp_path / "cache.sqlite"), 1000)
+
+
+def _stored_total(backend: SQLiteCacheBackend) -> int:
+    return backend._connection().execute("SELECT bytes FROM totals WHERE id = 0").fetchone()[0]
+
+
+def test_get_set_and_replace(backend):
+    assert backend.get("a") is None
+    backend.set("a", b"x" * 10)
+    backend.set("a", b"y" * 20)
+    assert backend.get("a") == b"y" * 20
+    assert backend.usage() == (1, 20)
+
+
+def test_expired_entries_are_misses(backend):
+    backend.set("short", b"x", ttl=0.05)
+    backend.set("long", b"x", ttl=60)
+    time.sleep(0.1)
+    assert backend.get("short") is None
+    assert backend.get("long") == b"x"
+
+
+def test_values_larger_than_the_budget_are_not_stored(backend):
+    backend.set("huge", b"x" * 1001)
+    assert backend.get("huge") is None
+    assert backend.usage() == (0, 0)
+
+
+def test_clear_by_prefix(backend):
+    backend.set("embedding:1", b"x")
+    backend.set("embedding:2", b"x")
+    backend.set("retrieval:1", b"x")
+    assert backend.clear("embedding:") == 2
+    assert backend.usage() == (1, 1)
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryCacheBackend(300)
+    for key in "abc":
+        backend.set(key, b"x" * 100)
+    backend.get("a")
+    backend.set("d", b"x" * 100)
+    assert backend.get("b") is None
+    assert [backend.get(key) is not None for key in "acd"] == [True, True, True]
+    assert backend.evictions == 1
+
+
+def test_sqlite_eviction_keeps_totals_in_step(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.sqlite"), 1000)
+    for i in range(25):
+        backend.set(f"k{i}", b"x" * 100)
+        entries, size = backend.usage()
+        assert size <= 1000
+        assert _stored_total(backend) == size
+    # Evicts down to 90% of the budget, oldest first
+    assert backend.evictions > 0
+    assert backend.get("k24") is not None
+    assert backend.get("k0") is None
+    backend.set("k24", b"x" * 50)
+    backend.clear("k2")
+    assert _stored_total(backend) == backend.usage()[1]
+
+
+def test_sqlite_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    SQLiteCacheBackend(path, 1000).set("a", b"value")
+    assert SQLiteCacheBackend(path, 1000).get("a") == b"value"
+
+
+def test_namespace_codecs_and_hit_counts():
+    backend = MemoryCacheBackend(10_000)
+    vectors = CacheNamespace(backend, "embedding", ttl=60, codec="vector")
+    vectors.set(["text-embedding-3-small", "hello"], [0.1, 0.2, 1 / 3])
+    assert vectors.get(["text-embedding-3-small", "hello"]) == [0.1, 0.2, 1 / 3]
+    assert vectors.get(["text-embedding-3-small", "other"]) is None
+
+    results = CacheNamespace(backend, "retrieval", ttl=60)
+    # Keys are canonical JSON: dict order does not matter
+    results.set({"query": "vat", "limit": 5}, [{"id": "1", "score": 0.5}])
+    assert results.get({"limit": 5, "query": "vat"}) == [{"id": "1", "score": 0.5}]
+    assert vectors.stats()["hits"] == 1 and vectors.stats()["misses"] == 1
+    assert results.key({"query": "vat"}).startswith("retrieval:")
@@ -0,0 +1,53 @@
+"""Tests for the JSONL chunk store."""
+import json
+import os
+
+import pytest
+
+from app.utils import chunk_store
+from app.utils.chunk_store import ChunkStore, build_chunk_record
+
+
+def _records(texts):
+    return [build_chunk_record(text, {"source": "docs/a.pdf", "start_index": i * 100}) for i, text in enumerate(texts)]
+
+
+def test_write_replaces_store_and_removes_old_chunk_file(tmp_path):
+    store = ChunkStore(str(tmp_path))
+    first = store.write(_records(["alpha", "beta"]))
+    second = store.write(_records(["gamma"]))
+
+    assert second["corpus_version"] != first["corpus_version"]
+    assert [record["text"] for record in store.read()] == ["gamma"]
+    assert store.manifest()["chunk_count"] == 1
+    assert sorted(os.listdir(tmp_path)) == sorted([second["chunks_file"], "manifest.json"])
+
+
+def test_crash_before_manifest_keeps_previous_store(tmp_path, monkeypatch):
+    store = ChunkStore(str(tmp_path))
+    first = store.write(_records(["alpha", "beta"]))
+    real_replace = os.replace
+
+    def crash_on_manifest(src, dst):
+        if dst == store.manifest_path:
+            raise OSError("disk full")
+        real_replace(src, dst)
+
+    monkeypatch.setattr(chunk_store.os, "replace", crash_on_manifest)
+    with pytest.raises(OSError):
+        store.write(_records(["gamma"]))
+
+    assert store.manifest() == first
+    assert [record["text"] for record in store.read()] == ["alpha", "beta"]
+
+
+def test_reads_format_1_store(tmp_path):
+    records = _records(["alpha"])
+    with open(tmp_path / "chunks.jsonl", "w", encoding="utf-8") as f:
+        f.write(json.dumps(records[0]) + "\n")
+    with open(tmp_path / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump({"format_version": 1, "corpus_version": "v1", "chunk_count": 1}, f)
+
+    store = ChunkStore(str(tmp_path))
+    assert store.exists()
+    assert store.read_all() == records
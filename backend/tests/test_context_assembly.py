@@ -0,0 +1,46 @@
+"""Tests for de-duplicating and merging retrieved chunks."""
+from app.services.context_assembly import assemble_context, render_context
+
+
+TEXT = "".join(f"Sentence {i} of the corporate income tax guide. " for i in range(40))
+
+
+def _result(text, source="guide.pdf", start=None, score=0.5, page=None):
+    metadata = {"source_filename": source}
+    if start is not None:
+        metadata.update(start_offset=start, end_offset=start + len(text))
+    if page is not None:
+        metadata["page"] = page
+    return {"score": score, "payload": {"page_content": text, "metadata": metadata}}
+
+
+def test_overlapping_chunks_merge_into_one_span():
+    results = [_result(TEXT[300:900], start=300, score=0.7), _result(TEXT[0:500], start=0, score=0.6)]
+    assert assemble_context(results) == [{"source": "guide.pdf", "page": None, "score": 0.7, "spans": [TEXT[0:900]]}]
+
+
+def test_adjacent_chunks_merge_and_distant_ones_stay_apart():
+    results = [_result(TEXT[0:200], start=0), _result(TEXT[202:400], start=202), _result(TEXT[1000:1200], start=1000)]
+    spans = assemble_context(results)[0]["spans"]
+    assert spans == [TEXT[0:200] + "\n" + TEXT[202:400], TEXT[1000:1200]]
+
+
+def test_duplicate_and_contained_chunks_are_dropped():
+    results = [_result(TEXT[0:600], start=0), _result(TEXT[0:600], start=0), _result(TEXT[100:300], start=100)]
+    assert assemble_context(results)[0]["spans"] == [TEXT[0:600]]
+
+
+def test_chunks_without_offsets_merge_on_shared_text():
+    results = [_result(TEXT[0:500]), _result(TEXT[300:800])]
+    assert assemble_context(results)[0]["spans"] == [TEXT[0:800]]
+
+
+def test_documents_and_pages_are_grouped_in_score_order():
+    results = [
+        _result(TEXT[0:100], source="a.pdf", start=0, score=0.9, page=1),
+        _result(TEXT[200:300], source="b.pdf", start=200, score=0.8),
+        _result(TEXT[500:600], source="a.pdf", start=500, score=0.7, page=2),
+    ]
+    assembled = assemble_context(results)
+    assert [(group["source"], group["page"]) for group in assembled] == [("a.pdf", 1), ("b.pdf", None), ("a.pdf", 2)]
+    assert render_context(assembled).startswith("Context 1 (Source: a.pdf, page 1):\n")
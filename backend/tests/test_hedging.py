@@ -0,0 +1,27 @@
+"""Tests for hedged requests."""
+import time
+
+from app.services.hedging import HedgingPolicy
+
+
+def test_latency_windows_are_per_route():
+    policy = HedgingPolicy(percentile=95, max_per_minute=10, min_samples=3)
+    for _ in range(3):
+        policy.run(lambda: time.sleep(0.05), key="gpt-4o:4000")
+        policy.run(lambda: None, key="gpt-4o-mini:1500")
+
+    assert policy.tracker("gpt-4o:4000").percentile(95) >= 0.05
+    assert policy.tracker("gpt-4o-mini:1500").percentile(95) < 0.05
+    assert policy.tracker("gpt-4o:2000").percentile(95) is None
+
+
+def test_slow_call_is_hedged_against_its_own_route():
+    policy = HedgingPolicy(percentile=50, max_per_minute=10, min_samples=3)
+    for _ in range(3):
+        policy.run(lambda: None, key="fast")
+    # Slower than every "fast" sample, but judged only against "slow" samples (none yet)
+    policy.run(lambda: time.sleep(0.05), key="slow")
+    assert policy.stats()["hedges_launched"] == 0
+
+    policy.run(lambda: time.sleep(0.05), key="fast")
+    assert policy.stats()["hedges_launched"] == 1
@@ -0,0 +1,21 @@
+"""Tests for maximal marginal relevance selection."""
+from app.services.mmr import mmr_select
+
+
+RELEVANCE = [0.9, 0.89, 0.7]
+# The two most relevant candidates are near-duplicates
+VECTORS = [[1.0, 0.0], [0.99, 0.01], [0.0, 1.0]]
+
+
+def test_lambda_one_is_top_k():
+    assert mmr_select(RELEVANCE, VECTORS, k=2, lambda_mult=1.0) == [0, 1]
+
+
+def test_low_lambda_skips_near_duplicates():
+    assert mmr_select(RELEVANCE, VECTORS, k=2, lambda_mult=0.5) == [0, 2]
+
+
+def test_k_is_capped_by_the_candidates():
+    assert sorted(mmr_select(RELEVANCE, VECTORS, k=10)) == [0, 1, 2]
+    assert mmr_select([], [], k=3) == []
+    assert mmr_select(RELEVANCE, VECTORS, k=0) == []
@@ -0,0 +1,59 @@
+"""Tests for the host-wide OpenAI rate governor."""
+import pytest
+
+from app.services.rate_governor import RateGovernor, estimate_chat_tokens
+
+
+LIMITS = {"gpt-4o": {"rpm": 2, "tpm": 600}}
+
+
+@pytest.fixture
+def governor(tmp_path):
+    return RateGovernor(str(tmp_path / "rate.sqlite"), LIMITS)
+
+
+def test_reservations_queue_at_the_configured_rate(governor):
+    waits = [governor.reserve("gpt-4o", 10) for _ in range(4)]
+    # Two requests per minute: the bucket refills one request every 30 seconds
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2] == pytest.approx(30, abs=0.5)
+    assert waits[3] == pytest.approx(60, abs=0.5)
+
+
+def test_token_bucket_limits_large_calls(governor):
+    assert governor.reserve("gpt-4o", 600) == 0.0
+    # 300 more tokens need half a minute of a 600 TPM refill
+    assert governor.reserve("gpt-4o", 300) == pytest.approx(30, abs=0.5)
+
+
+def test_wait_past_max_wait_reserves_nothing(governor):
+    governor.reserve("gpt-4o", 10)
+    governor.reserve("gpt-4o", 10)
+    assert governor.reserve("gpt-4o", 10, max_wait=5) is None
+    assert governor.reserve("gpt-4o", 10) == pytest.approx(30, abs=0.5)
+
+
+def test_snapshots_share_limits_and_other_models_are_not_governed(governor):
+    assert governor.limits_for("gpt-4o-2024-08-06") == ("gpt-4o", LIMITS["gpt-4o"])
+    assert governor.limits_for("gpt-4o-mini") == ("gpt-4o-mini", None)
+    governor.reserve("gpt-4o", 10)
+    governor.reserve("gpt-4o-2024-08-06", 10)
+    assert governor.reserve("gpt-4o", 10) == pytest.approx(30, abs=0.5)
+    assert governor.reserve("gpt-4o-mini", 10**6) == 0.0
+
+
+def test_budget_is_shared_through_the_database(governor, tmp_path):
+    other_process = RateGovernor(str(tmp_path / "rate.sqlite"), LIMITS)
+    governor.reserve("gpt-4o", 10)
+    other_process.reserve("gpt-4o", 10)
+    assert governor.reserve("gpt-4o", 10) == pytest.approx(30, abs=0.5)
+
+
+def test_throttle_empties_the_request_bucket(governor):
+    governor.throttle("gpt-4o-2024-08-06")
+    assert governor.reserve("gpt-4o", 10) == pytest.approx(30, abs=0.5)
+
+
+def test_chat_estimate_counts_messages_and_max_tokens():
+    request = {"messages": [{"role": "user", "content": "x" * 400}, {"role": "system", "content": None}], "max_tokens": 50}
+    assert estimate_chat_tokens(request) == 150
@@ -0,0 +1,102 @@
+"""Tests for the circuit breaker and its interaction with the rate governor."""
+import pytest
+
+from app.services import resilience
+from app.services.rate_governor import RateGovernor
+from app.services.resilience import (
+    CircuitBreaker,
+    DeadlineExceededError,
+    DependencyUnavailableError,
+    call_with_resilience,
+    request_deadline,
+)
+
+
+@pytest.fixture
+def breaker(monkeypatch):
+    """An open breaker for the "openai" dependency whose reset timeout has already passed."""
+    breaker = CircuitBreaker("openai", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    monkeypatch.setattr(resilience, "get_breaker", lambda dependency: breaker)
+    return breaker
+
+
+def test_rate_queue_past_deadline_releases_half_open_trial(breaker, tmp_path, monkeypatch):
+    governor = RateGovernor(str(tmp_path / "rate.sqlite"), {"gpt-4o": {"rpm": 1}})
+    assert governor.reserve("gpt-4o", 1) == 0.0  # Drain the only request of this minute
+    monkeypatch.setattr(resilience, "get_rate_governor", lambda: governor)
+    calls = []
+
+    with request_deadline(15):
+        with pytest.raises(DeadlineExceededError):
+            call_with_resilience("openai", calls.append, call_timeout=45, rate=("gpt-4o", 10))
+
+    assert calls == []
+    assert breaker.state == "open"
+    # The trial is free again: the next call probes the dependency and closes the breaker
+    assert call_with_resilience("openai", lambda timeout: "ok", call_timeout=45) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_half_open_admits_one_trial(breaker):
+    assert breaker.allow()
+    with pytest.raises(DependencyUnavailableError):
+        call_with_resilience("openai", lambda timeout: "ok", call_timeout=1)
+    breaker.record_success()
+    assert call_with_resilience("openai", lambda timeout: "ok", call_timeout=1) == "ok"
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed" and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+
+def test_failed_half_open_trial_reopens_the_breaker(breaker):
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_non_retryable_error_is_not_retried_and_keeps_breaker_closed(monkeypatch):
+    closed = CircuitBreaker("openai", failure_threshold=1, reset_timeout=60)
+    monkeypatch.setattr(resilience, "get_breaker", lambda dependency: closed)
+    calls = []
+
+    def bad_request(timeout):
+        calls.append(timeout)
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        call_with_resilience("openai", bad_request, call_timeout=1)
+    assert len(calls) == 1
+    assert closed.state == "closed"
+
+
+def test_retryable_errors_are_retried_until_success(monkeypatch):
+    closed = CircuitBreaker("qdrant", failure_threshold=5, reset_timeout=60)
+    monkeypatch.setattr(resilience, "get_breaker", lambda dependency: closed)
+    monkeypatch.setattr(resilience, "backoff_delay", lambda attempt: 0.0)
+    monkeypatch.setattr(resilience.settings, "retry_max_attempts", 3)
+    outcomes = [ConnectionError("reset"), ConnectionError("reset"), "ok"]
+
+    def flaky(timeout):
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert call_with_resilience("qdrant", flaky, call_timeout=1) == "ok"
+    assert closed.state == "closed" and closed.failures == 0
+
+
+def test_expired_deadline_fails_before_calling():
+    with request_deadline(0):
+        with pytest.raises(DeadlineExceededError):
+            call_with_resilience("qdrant", lambda timeout: pytest.fail("called"), call_timeout=1)
@@ -0,0 +1,67 @@
+"""Tests for the DAG scheduler."""
+import threading
+import time
+
+import pytest
+
+from app.services.scheduler import DAGScheduler, Node
+
+
+def _sleep_then(value, seconds=0.0):
+    def run(inputs):
+        time.sleep(seconds)
+        return value(inputs) if callable(value) else value
+    return run
+
+
+def test_dependents_receive_their_inputs():
+    nodes = [
+        Node("retrieval", _sleep_then("chunks")),
+        Node("tax", _sleep_then(lambda inputs: f"tax from {inputs['retrieval']}"), ("retrieval",)),
+        Node("summary", _sleep_then(lambda inputs: sorted(inputs)), ("retrieval", "tax")),
+    ]
+    schedule = DAGScheduler(max_workers=4).run(nodes)
+    assert schedule.results == {"retrieval": "chunks", "tax": "tax from chunks", "summary": ["retrieval", "tax"]}
+    assert schedule.errors == {}
+
+
+def test_independent_nodes_run_concurrently():
+    barrier = threading.Barrier(3, timeout=5)
+    nodes = [Node(key, lambda inputs: barrier.wait()) for key in "abc"]
+    schedule = DAGScheduler(max_workers=3).run(nodes)
+    assert set(schedule.results) == {"a", "b", "c"}
+
+
+def test_failed_dependency_is_recorded_and_dependents_still_run():
+    def fail(inputs):
+        raise RuntimeError("qdrant down")
+
+    nodes = [Node("retrieval", fail), Node("section", lambda inputs: dict(inputs), ("retrieval",))]
+    completed = []
+    schedule = DAGScheduler().run(nodes, on_complete=lambda node, result: completed.append(node.key))
+    assert isinstance(schedule.errors["retrieval"], RuntimeError)
+    assert schedule.results == {"section": {}}
+    assert completed == ["section"]
+
+
+def test_critical_path_follows_the_longest_chain():
+    nodes = [
+        Node("retrieval", _sleep_then(None, 0.02)),
+        Node("slow", _sleep_then(None, 0.1), ("retrieval",), label="slow section"),
+        Node("fast", _sleep_then(None, 0.01), ("retrieval",)),
+        Node("summary", _sleep_then(None, 0.02), ("slow", "fast")),
+    ]
+    schedule = DAGScheduler(max_workers=4).run(nodes)
+    seconds, path = schedule.critical_path()
+    assert path == ["retrieval", "slow", "summary"]
+    assert seconds == pytest.approx(0.14, abs=0.05)
+    summary = schedule.summary()
+    assert summary["critical_path"] == ["retrieval", "slow section", "summary"]
+    assert summary["serial_ms"] > summary["critical_path_ms"]
+
+
+def test_unknown_dependencies_and_cycles_are_rejected():
+    with pytest.raises(ValueError, match="unknown"):
+        DAGScheduler().run([Node("a", _sleep_then(None), ("missing",))])
+    with pytest.raises(ValueError, match="cycle"):
+        DAGScheduler().run([Node("a", _sleep_then(None), ("b",)), Node("b", _sleep_then(None), ("a",))])
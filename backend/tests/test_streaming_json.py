@@ -0,0 +1,69 @@
+"""Tests for the incremental JSON object parser."""
+import json
+
+from app.utils.streaming_json import StreamingJSONParser, parse_partial
+
+
+DOCUMENT = {
+    "title": "Entry into the Netherlands",
+    "steps": [{"name": "Register", "days": 5}, {"name": "Hire", "days": 30}],
+    "notes": "Quote \" and brace } inside a string",
+    "score": 0.8,
+    "glossary": {"BV": "private limited company"},
+}
+
+
+def _feed_in_chunks(text, size):
+    parser = StreamingJSONParser()
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return parser, events
+
+
+def test_events_do_not_depend_on_chunking():
+    text = json.dumps(DOCUMENT)
+    whole, whole_events = _feed_in_chunks(text, len(text))
+    for size in (1, 3, 17):
+        parser, events = _feed_in_chunks(text, size)
+        assert events == whole_events
+        assert parser.result() == DOCUMENT
+        assert parser.finished and parser.error is None
+    assert whole.result() == DOCUMENT
+
+
+def test_emits_items_then_the_field():
+    parser = StreamingJSONParser()
+    events = parser.feed(json.dumps({"steps": DOCUMENT["steps"], "score": 1}))
+    assert events == [
+        ("item", "steps", 0, {"name": "Register", "days": 5}),
+        ("item", "steps", 1, {"name": "Hire", "days": 30}),
+        ("field", "steps", None, DOCUMENT["steps"]),
+        ("field", "score", None, 1),
+    ]
+
+
+def test_nothing_is_emitted_before_a_value_completes():
+    parser = StreamingJSONParser()
+    assert parser.feed('{"title": "Entry in') == []
+    assert parser.feed('to", "steps": [{"name": "Reg') == [("field", "title", None, "Entry into")]
+    assert parser.feed('ister"}, ') == [("item", "steps", 0, {"name": "Register"})]
+
+
+def test_truncated_input_keeps_completed_fields_and_items():
+    text = json.dumps(DOCUMENT)
+    cut = text.index('{"name": "Hire"') + 10
+    assert parse_partial(text[:cut]) == {"title": DOCUMENT["title"], "steps": [DOCUMENT["steps"][0]]}
+
+
+def test_skips_code_fence_before_the_object():
+    assert parse_partial('```json\n{"a": 1, "b": [2]}\n```') == {"a": 1, "b": [2]}
+
+
+def test_malformed_tail_keeps_valid_prefix():
+    parser = StreamingJSONParser()
+    parser.feed('{"a": 1, "b" 2, "c": 3}')
+    assert parser.error is not None
+    assert not parser.finished
+    assert parser.result() == {"a": 1}
+    assert parser.feed(', "d": 4}') == []
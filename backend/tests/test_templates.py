@@ -0,0 +1,55 @@
+"""Tests for loading path templates."""
+import json
+
+from app.services import templates
+from app.services.templates import TEMPLATE_FORMAT_VERSION, TemplateSource, current_plan_hashes
+
+
+def _write_templates(path, plan_hashes, corpus_version="v1", format_version=TEMPLATE_FORMAT_VERSION):
+    document = {
+        "format_version": format_version,
+        "corpus_version": corpus_version,
+        "collection": "netherlands_pilot",
+        "model": "gpt-4o",
+        "plan_hashes": plan_hashes,
+        "plans": {"holding": {"tax_analysis": "tax"}},
+        "tasks": {"tax": {"structured": False, "data": {"summary": "Holding regime"}}},
+    }
+    path.write_text(json.dumps(document), encoding="utf-8")
+
+
+def _source(tmp_path):
+    store_dir = tmp_path / "chunk_store"
+    store_dir.mkdir()
+    (store_dir / "manifest.json").write_text(json.dumps({"corpus_version": "v1"}), encoding="utf-8")
+    (store_dir / "chunks.jsonl").write_text("", encoding="utf-8")
+    return TemplateSource("netherlands_pilot", path=str(tmp_path / "templates.json"), store_dir=str(store_dir))
+
+
+def test_templates_for_the_current_plans_are_served(tmp_path):
+    _write_templates(tmp_path / "templates.json", current_plan_hashes())
+    loaded = _source(tmp_path).current()
+    assert loaded is not None
+    assert loaded.sections_for("holding") == {"tax_analysis": {"summary": "Holding regime"}}
+
+
+def test_templates_for_changed_plans_are_rejected(tmp_path):
+    hashes = dict(current_plan_hashes())
+    hashes["holding"] = "0" * 16
+    _write_templates(tmp_path / "templates.json", hashes)
+    assert _source(tmp_path).current() is None
+
+
+def test_templates_of_another_corpus_or_format_are_rejected(tmp_path):
+    _write_templates(tmp_path / "templates.json", current_plan_hashes(), corpus_version="v0")
+    assert _source(tmp_path).current() is None
+    _write_templates(tmp_path / "templates.json", current_plan_hashes(), format_version=1)
+    assert templates.PathTemplates.load(str(tmp_path / "templates.json")) is None
+
+
+def test_plan_hash_changes_with_the_tasks():
+    from app.core.orchestrator import all_plan_keys, plan_for
+
+    plan = plan_for(all_plan_keys()[0])
+    assert templates.plan_hash(plan) == templates.plan_hash(list(plan))
+    assert templates.plan_hash(plan) != templates.plan_hash(plan[:-1])